@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from typing import Optional
+
+import yaml
+
+BASE_IMAGE = "nistariac/ariac2024:latest"
+CACHE_REPOSITORY = "ariac-build-cache"
+
+# Changes to the build procedure itself invalidate every cached build
+BUILD_SCRIPTS = ["container_scripts/build_environment.sh", "container_scripts/package_cache.sh",
+                 "container_scripts/build_competitor_code.py"]
+
+def get_automated_eval_folder() -> str:
+    return os.path.dirname(os.path.abspath(__file__))
+
+def load_team_config(team_name: str) -> dict:
+    with open(os.path.join(get_automated_eval_folder(), "competitor_configs", team_name + ".yaml")) as file:
+        return yaml.safe_load(file) or {}
+
+def resolve_commit(repository: str, token: str = "", tag: str = "") -> Optional[str]:
+
+    """Finds the commit a repository tag or branch points to without cloning
+
+    Args:
+        repository (str): repository url without the scheme, e.g. github.com/org/repo.git
+        token (str): personal access token for private repositories
+        tag (str): tag or branch, the default branch when empty
+
+    Returns:
+        Optional[str]: commit hash, None if it cannot be resolved
+    """
+
+    if re.fullmatch(r"[0-9a-f]{40}", tag or ""):
+        return tag
+
+    url = f"https://{token}@{repository}" if token else f"https://{repository}"
+    try:
+        output = subprocess.run(["git", "ls-remote", url] + ([tag] if tag else ["HEAD"]), capture_output=True,
+                                text=True, timeout=60, env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if output.returncode != 0:
+        return None
+
+    refs = {}
+    for line in output.stdout.splitlines():
+        commit, ref = line.split("\t", 1)
+        refs[ref] = commit
+
+    if not tag:
+        return refs.get("HEAD")
+    # Annotated tags are peeled to the commit they point to
+    for ref in (f"refs/tags/{tag}^{{}}", f"refs/tags/{tag}", f"refs/heads/{tag}"):
+        if ref in refs:
+            return refs[ref]
+    return None
+
+def get_image_id(image: str) -> Optional[str]:
+    try:
+        output = subprocess.run(["docker", "image", "inspect", "-f", "{{.Id}}", image], capture_output=True, text=True)
+    except OSError:
+        return None
+    return output.stdout.strip() if output.returncode == 0 else None
+
+def hash_files(paths: list[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as file:
+            digest.update(file.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def compute_cache_key(team_name: str, base_image: str = BASE_IMAGE) -> Optional[str]:
+
+    """Computes the build cache key of a team: the commit of its repository,
+    the contents of its pre-build scripts, the base image and the build
+    scripts. Builds with the same key produce the same container.
+
+    Args:
+        team_name (str): name of the team configuration
+        base_image (str): image the team container is created from
+
+    Returns:
+        Optional[str]: cache key, None if the commit or base image cannot be resolved
+    """
+
+    try:
+        data = load_team_config(team_name)
+        github = data["github"]
+        pre_build_scripts = data["build"]["pre_build_scripts"] or []
+    except (IOError, yaml.YAMLError, KeyError, TypeError) as e:
+        print(f"Unable to read the configuration of {team_name}: {e}", file=sys.stderr)
+        return None
+
+    commit = resolve_commit(github["repository"], github.get("personal_access_token") or "", github.get("tag") or "")
+    if commit is None:
+        print(f"Unable to resolve the commit of {team_name}, not using the build cache", file=sys.stderr)
+        return None
+
+    image_id = get_image_id(base_image)
+    if image_id is None:
+        print(f"Unable to find the id of {base_image}, not using the build cache", file=sys.stderr)
+        return None
+
+    folder = get_automated_eval_folder()
+    try:
+        scripts_hash = hash_files([os.path.join(folder, "competitor_configs", "competitor_build_scripts", script) for script in pre_build_scripts])
+        build_hash = hash_files([os.path.join(folder, script) for script in BUILD_SCRIPTS])
+    except IOError as e:
+        print(f"Unable to read the build scripts of {team_name}: {e}", file=sys.stderr)
+        return None
+
+    key = json.dumps({
+        "repository": github["repository"],
+        "commit": commit,
+        "pre_build_scripts": scripts_hash,
+        "base_image": image_id,
+        "build_scripts": build_hash
+    }, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def get_cache_image(team_name: str, key: str) -> str:
+    # Docker tags only allow letters, digits, underscores, periods and dashes
+    team_tag = re.sub(r"[^A-Za-z0-9_.-]", "-", team_name)
+    return f"{CACHE_REPOSITORY}:{team_tag}-{key[:24]}"
+
+def prune_cache_images(team_name: str, keep: str):
+
+    """Removes the cached builds of a team other than the current one
+
+    Args:
+        team_name (str): name of the team
+        keep (str): cache image to keep
+    """
+
+    team_tag = re.sub(r"[^A-Za-z0-9_.-]", "-", team_name)
+    output = subprocess.run(["docker", "image", "ls", CACHE_REPOSITORY, "--format", "{{.Repository}}:{{.Tag}}"], capture_output=True, text=True)
+    for image in output.stdout.split():
+        tag = image.split(":", 1)[1]
+        if image != keep and re.fullmatch(re.escape(team_tag) + r"-[0-9a-f]{24}", tag):
+            subprocess.run(["docker", "image", "rm", image], stdout=subprocess.DEVNULL)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed cache of built competitor containers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    key_parser = subparsers.add_parser("key", help="Print the build cache key of a team")
+    key_parser.add_argument("team_name")
+
+    image_parser = subparsers.add_parser("image", help="Print the cache image of a team's current build")
+    image_parser.add_argument("team_name")
+
+    prune_parser = subparsers.add_parser("prune", help="Remove a team's other cached builds")
+    prune_parser.add_argument("team_name")
+    prune_parser.add_argument("keep")
+
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        prune_cache_images(args.team_name, args.keep)
+        sys.exit(0)
+
+    key = compute_cache_key(args.team_name)
+    if key is None:
+        sys.exit(1)
+    print(key if args.command == "key" else get_cache_image(args.team_name, key))
@@ -10,12 +10,47 @@ teamName=$1
 #enable local connections to docker
 xhost +local:docker
 
+baseImage=nistariac/ariac2024:latest
+
+# Reuse a container built from the same commit, pre-build scripts and base image
+cacheImage=""
+if [[ "$ARIAC_BUILD_CACHE" != "0" ]]; then
+    cacheImage=$(python3 ./build_cache.py image $teamName)
+fi
+image=$baseImage
+cacheHit=0
+if [[ $cacheImage ]] && docker image inspect $cacheImage > /dev/null 2>&1; then
+    echo "==== Restoring $teamName from build cache $cacheImage"
+    image=$cacheImage
+    cacheHit=1
+fi
+
+# Compiler cache and colcon build state kept between builds with different keys
+mkdir -p $PWD/build_cache/$teamName
+cacheMount="-v $PWD/build_cache/$teamName:/build_cache:rw"
+
+# apt, pip and rosdep downloads shared by every team container on this host
+mkdir -p $PWD/package_cache
+cacheMount="$cacheMount -v $PWD/package_cache:/package_cache:rw"
+
+# Incrementally updated bare mirror of the team repository, cloned shallowly in the container
+if [[ $cacheHit == 0 ]]; then
+    mirrorArgs=""
+    if [[ "$ARIAC_OFFLINE" == "1" ]]; then
+        mirrorArgs="--offline"
+    fi
+    mirror=$(python3 ./git_mirror.py update $teamName $mirrorArgs)
+    if [[ $mirror ]]; then
+        cacheMount="$cacheMount -v $mirror:/git_mirror:ro"
+    fi
+fi
+
 if [[ "$2" == "nvidia" ]] ; then
     # Build the docker image
-    docker run -t -d --name $teamName -e DISPLAY=$DISPLAY -e LOCAL_USER_ID=1000  --gpus=all --runtime=nvidia -e "NVIDIA_DRIVER_CAPABILITIES=all" --network=host --pid=host --privileged -v /tmp/.X11-unix:/tmp/.X11-unix:rw nistariac/ariac2024:latest
+    docker run -t -d --name $teamName -e DISPLAY=$DISPLAY -e LOCAL_USER_ID=1000  --gpus=all --runtime=nvidia -e "NVIDIA_DRIVER_CAPABILITIES=all" --network=host --pid=host --privileged -v /tmp/.X11-unix:/tmp/.X11-unix:rw $cacheMount $image
 else
     # Build the docker image
-    docker run -t -d --name $teamName -e DISPLAY=$DISPLAY -e LOCAL_USER_ID=1000  --network=host --pid=host --privileged -v /tmp/.X11-unix:/tmp/.X11-unix:rw  nistariac/ariac2024:latest
+    docker run -t -d --name $teamName -e DISPLAY=$DISPLAY -e LOCAL_USER_ID=1000  --network=host --pid=host --privileged -v /tmp/.X11-unix:/tmp/.X11-unix:rw $cacheMount $image
 fi
 
 # Copy scripts directory and yaml file
@@ -24,5 +59,30 @@ docker cp ./competitor_configs/competitor_build_scripts/ $teamName:/
 docker cp ./trials/ $teamName:/
 docker cp ./competitor_configs/$1.yaml $teamName:/container_scripts
 
+if [[ $cacheHit == 1 ]]; then
+    # The cached workspace is already built, only the trials need updating
+    ./update_trials.sh $teamName
+    exit 0
+fi
+
 # Run build script
-docker exec -it $teamName bash -c ". /container_scripts/build_environment.sh $1"
+baseImageId=$(docker image inspect -f '{{.Id}}' $baseImage)
+# Only ask for a tty when there is a terminal, e.g. not when builds run in parallel
+ttyFlag=""
+if [ -t 0 ]; then
+    ttyFlag="-it"
+fi
+mirrorEnv=""
+if [[ $mirror ]]; then
+    mirrorEnv="-e ARIAC_GIT_MIRROR=/git_mirror"
+fi
+packageEnv="-e ARIAC_APT_PROXY -e ARIAC_PIP_INDEX_URL -e ARIAC_OFFLINE"
+docker exec $ttyFlag -e ARIAC_BASE_IMAGE=$baseImageId $mirrorEnv $packageEnv $teamName bash -c ". /container_scripts/build_environment.sh $1"
+buildStatus=$?
+
+if [[ $buildStatus == 0 ]] && [[ $cacheImage ]]; then
+    echo "==== Saving $teamName to build cache $cacheImage"
+    docker commit $teamName $cacheImage > /dev/null && python3 ./build_cache.py prune $teamName $cacheImage
+fi
+
+exit $buildStatus
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Optional
+
+BUILD_LOGS_FOLDER = "build_logs"
+
+class BuildJob():
+    def __init__(self, team_name: str, use_nvidia: bool = False, logs_folder: str = BUILD_LOGS_FOLDER):
+        self.team_name = team_name
+        self.command = ["./build_container.sh", team_name] + (["nvidia"] if use_nvidia else [])
+        self.log_file = os.path.join(logs_folder, f"{team_name}.log")
+        self.exit_code: Optional[int] = None
+        self.duration = 0.0
+
+    def run(self) -> int:
+
+        """Runs build_container.sh for the team, writing its output to the build log
+
+        Returns:
+            int: exit code of the build
+        """
+
+        start = time()
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        with open(self.log_file, "w") as log:
+            try:
+                # No terminal on stdin, so build_container.sh runs docker exec without a tty
+                self.exit_code = subprocess.run(self.command, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT).returncode
+            except OSError as e:
+                log.write(f"Unable to run {self.command[0]}: {e}\n")
+                self.exit_code = 127
+        self.duration = time() - start
+        return self.exit_code
+
+def run_builds(team_names: list[str], use_nvidia: bool = False, max_parallel: int = 4,
+               logs_folder: str = BUILD_LOGS_FOLDER) -> list[BuildJob]:
+
+    """Builds team containers with a bounded number of builds running at once,
+    then prints a summary of the build durations and failures
+
+    Args:
+        team_names (list[str]): teams to build containers for
+        use_nvidia (bool): build the containers with NVIDIA support
+        max_parallel (int): maximum number of builds running at once
+        logs_folder (str): folder the build log of each team is written to
+
+    Returns:
+        list[BuildJob]: the builds, with their exit code and duration set
+    """
+
+    jobs = [BuildJob(team, use_nvidia, logs_folder) for team in team_names]
+    print(f'Building {len(jobs)} container(s) with up to {max_parallel} at once, logs in {logs_folder}/')
+
+    lock = threading.Lock()
+    completed = [0]
+
+    def run_job(job: BuildJob):
+        exit_code = job.run()
+        with lock:
+            completed[0] += 1
+            status = "done" if exit_code == 0 else f"FAILED (exit code {exit_code})"
+            print(f'[{completed[0]}/{len(jobs)}] {job.team_name}: {status} in {job.duration:.1f}s')
+
+    start = time()
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+        list(executor.map(run_job, jobs))
+
+    print("="*50)
+    print("Build summary")
+    for job in sorted(jobs, key=lambda job: -job.duration):
+        status = "ok" if job.exit_code == 0 else f"FAILED, see {job.log_file}"
+        print(f'{job.team_name:<30} {job.duration:>8.1f}s  {status}')
+    failed = [job for job in jobs if job.exit_code != 0]
+    total = sum(job.duration for job in jobs)
+    print(f'Built {len(jobs) - len(failed)} of {len(jobs)} container(s) in {time() - start:.1f}s ({total:.1f}s of build time)')
+    print("="*50)
+
+    return jobs
@@ -2,9 +2,57 @@
 
 import os
 import sys
+import shutil
 import subprocess
 import yaml
 
+# Bind mounted by build_container.sh, kept between builds of a team
+BUILD_CACHE = "/build_cache"
+BUILD_STATE = os.path.join(BUILD_CACHE, "colcon")
+# Only build/ is kept, colcon installs every package again from it, so a package
+# removed from the competitor's sources does not linger in install/
+BUILD_FOLDERS = ["build"]
+
+
+def restore_build_state():
+    # The saved state is only valid on top of the image it was built in
+    base_image = os.environ.get("ARIAC_BASE_IMAGE", "")
+    base_image_file = os.path.join(BUILD_STATE, "base_image")
+    if not base_image or not os.path.isfile(base_image_file):
+        return
+    with open(base_image_file) as file:
+        if file.read().strip() != base_image:
+            print("==== Build state is from another base image, building from scratch")
+            return
+
+    print("==== Restoring colcon build state from the previous build")
+    for folder in BUILD_FOLDERS:
+        if os.path.isdir(os.path.join(BUILD_STATE, folder)):
+            subprocess.run(f"cp -a {BUILD_STATE}/{folder}/. /workspace/{folder}/", shell=True)
+
+
+def save_build_state():
+    base_image = os.environ.get("ARIAC_BASE_IMAGE", "")
+    if not base_image or not os.path.isdir(BUILD_CACHE):
+        return
+
+    print("==== Saving colcon build state")
+    for folder in BUILD_FOLDERS:
+        shutil.rmtree(os.path.join(BUILD_STATE, folder), ignore_errors=True)
+        os.makedirs(os.path.join(BUILD_STATE, folder))
+        subprocess.run(f"cp -a /workspace/{folder}/. {BUILD_STATE}/{folder}/", shell=True)
+    with open(os.path.join(BUILD_STATE, "base_image"), "w") as file:
+        file.write(base_image)
+
+
+def get_compiler_cache_args() -> str:
+    if not os.path.isdir(BUILD_CACHE) or shutil.which("ccache") is None:
+        return ""
+    os.environ["CCACHE_DIR"] = os.path.join(BUILD_CACHE, "ccache")
+    # Sources are cloned fresh on every build, so compare contents rather than mtimes
+    os.environ["CCACHE_SLOPPINESS"] = "include_file_mtime,include_file_ctime,time_macros"
+    return " --cmake-args -DCMAKE_C_COMPILER_LAUNCHER=ccache -DCMAKE_CXX_COMPILER_LAUNCHER=ccache"
+
 
 def main():
     # Get yaml file name
@@ -60,7 +108,23 @@ def main():
         else:
             clone_cmd = f"git clone https://{token}@{repository} /workspace/src/{team_name} --branch {tag}"
     
-    subprocess.run(clone_cmd, shell=True)
+    # Shallow checkout of the requested tag from the host mirror, when one is mounted
+    cloned = False
+    mirror = os.environ.get("ARIAC_GIT_MIRROR", "")
+    if mirror and os.path.isdir(mirror):
+        mirror_clone_cmd = f"git clone --depth 1 --single-branch file://{mirror} /workspace/src/{team_name}"
+        if tag:
+            mirror_clone_cmd += f" --branch {tag}"
+        print("==== Cloning from the host repository mirror")
+        cloned = subprocess.run(mirror_clone_cmd, shell=True).returncode == 0
+        if cloned:
+            subprocess.run(f"git -C /workspace/src/{team_name} remote set-url origin https://{repository}", shell=True)
+        else:
+            print("==== Unable to clone from the mirror, cloning the repository")
+            subprocess.run(f"rm -rf /workspace/src/{team_name}", shell=True)
+
+    if not cloned:
+        subprocess.run(clone_cmd, shell=True)
 
     # Run custom build scripts
     os.chdir('/competitor_build_scripts')
@@ -73,13 +137,22 @@ def main():
     rosdep_cmd = "rosdep install --from-paths src --ignore-src -y"
     rosdep_update_cmd = "rosdep update --include-eol-distros"
     rosdep_fix_cmd = " sudo apt-get update"
-    subprocess.run(rosdep_fix_cmd, shell=True)
-    subprocess.run(rosdep_update_cmd, shell=True)
+    if os.environ.get("ARIAC_OFFLINE") == "1":
+        print("==== Offline, installing rosdep packages from the package cache")
+    else:
+        subprocess.run(rosdep_fix_cmd, shell=True)
+        subprocess.run(rosdep_update_cmd, shell=True)
     subprocess.run(rosdep_cmd, shell=True)
 
-    # Build the workspace
+    # Build the workspace, reusing the state and compiler cache of the previous build
+    if os.path.isdir(BUILD_CACHE):
+        restore_build_state()
     build_cmd = "colcon build --packages-skip ariac_controllers ariac_description ariac_gui ariac_moveit_config ariac_msgs ariac_plugins ariac_sensors"
-    subprocess.run(build_cmd, shell=True)
+    build_cmd += get_compiler_cache_args()
+    result = subprocess.run(build_cmd, shell=True)
+    if result.returncode == 0:
+        save_build_state()
+    sys.exit(result.returncode)
 
 
 if __name__=="__main__":
@@ -7,4 +7,5 @@ chmod +x build_competitor_code.py
 mv /trials  /workspace/src/ARIAC/ariac_gazebo/config/
 
 source /opt/ros/iron/setup.bash
+source /container_scripts/package_cache.sh
 python3 build_competitor_code.py $1
\ No newline at end of file
@@ -0,0 +1,38 @@
+#!/bin/bash
+
+#---------------------------------------------------------
+# Writes the artifacts of the last run to stdout as a single gzip compressed
+# tar stream, laid out like a run folder, with a SHA256SUMS manifest first
+#---------------------------------------------------------
+
+manifest=/tmp/SHA256SUMS
+
+files=()
+for file in trial_log.txt sensor_cost.txt state.log readiness.json; do
+    if [ -f /tmp/$file ]; then
+        files+=($file)
+    fi
+done
+
+# Checksums use the paths the files have in the run folder. Without any files
+# sha256sum would read stdin, a run that left nothing still gets an empty manifest
+if [ ${#files[@]} -gt 0 ]; then
+    (cd /tmp && sha256sum "${files[@]}") > $manifest
+else
+    : > $manifest
+fi
+if [ -d /root/.ros/log ]; then
+    (cd /root/.ros && find log -type f -exec sha256sum {} +) | sed 's,  log/,  ros_log/,' >> $manifest
+fi
+
+compressor="gzip -1"
+if command -v pigz > /dev/null; then
+    compressor="pigz -1"
+fi
+
+rosLog=()
+if [ -d /root/.ros/log ]; then
+    rosLog=(-C /root/.ros --transform "s,^log,ros_log," log)
+fi
+
+tar -cf - -C /tmp SHA256SUMS "${files[@]}" "${rosLog[@]}" | $compressor
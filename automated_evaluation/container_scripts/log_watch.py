@@ -0,0 +1,217 @@
+import os
+import time
+import errno
+import select
+import ctypes
+import struct
+import subprocess
+from typing import Optional
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# Time a file's size has to stay the same before it counts as written, when no close event can tell
+STABLE_INTERVAL = 0.5
+
+class PollingWatcher():
+    """Fallback watcher that wakes up on a fixed interval"""
+
+    reports_writes = False
+
+    def __init__(self, folder: str, interval: float = 0.5):
+        self.folder = folder
+        self.interval = interval
+        self.written: set[str] = set()
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(max(0.0, min(timeout, self.interval)))
+        return True
+
+    def close(self):
+        pass
+
+class InotifyWatcher():
+    """Wakes up when a file is created, moved into or finished being written in a folder"""
+
+    reports_writes = True
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        # Names of the files that were closed after writing or moved into the folder
+        self.written: set[str] = set()
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(folder), IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"Unable to watch {folder}")
+
+    def wait(self, timeout: float) -> bool:
+        readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not readable:
+            return False
+
+        # Drain the events, the caller checks the files it is waiting for
+        while True:
+            try:
+                data = os.read(self._fd, 64 * EVENT_HEADER.size + 4096)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+            self._read_events(data)
+        return True
+
+    def _read_events(self, data: bytes):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and name:
+                self.written.add(os.fsdecode(name))
+
+    def close(self):
+        os.close(self._fd)
+
+def create_watcher(folder: str):
+    try:
+        return InotifyWatcher(folder)
+    except (OSError, AttributeError) as e:
+        print(f"inotify is not available ({e}), polling {folder}")
+        return PollingWatcher(folder)
+
+def gazebo_running() -> bool:
+    try:
+        output = subprocess.check_output("gz topic -l", shell=True, timeout=5).decode("utf-8")
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return False
+    return output != '' and output.count('An instance of Gazebo is not running') == 0
+
+class HealthCheck():
+    """Runs a check on its own interval, backing off while it keeps passing"""
+
+    def __init__(self, check, interval: float = 2.0, max_interval: float = 30.0, backoff: float = 2.0):
+        self.check = check
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.checks = 0
+        self._next = time.monotonic() + interval
+
+    def time_until_due(self) -> float:
+        return max(0.0, self._next - time.monotonic())
+
+    def run_if_due(self) -> bool:
+        if time.monotonic() < self._next:
+            return True
+        self.checks += 1
+        healthy = self.check()
+        if healthy:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self._next = time.monotonic() + self.interval
+        return healthy
+
+def wait_for_file(path: str, health_check: HealthCheck) -> bool:
+
+    """Waits for a file to be written, waking up on file system events and
+    running the health check whenever it is due. A file counts as written
+    once it is closed after writing or moved in. A file that was already there
+    before the watch started, or that is only polled for, counts as written
+    once its size stops changing.
+
+    Args:
+        path (str): file to wait for
+        health_check (HealthCheck): check that ends the wait when it fails
+
+    Returns:
+        bool: True if the file was written, False if the health check failed first
+    """
+
+    name = os.path.basename(path)
+    watcher = create_watcher(os.path.dirname(path))
+    try:
+        existed = os.path.exists(path)
+        last_size = None
+        while True:
+            if name in watcher.written:
+                return True
+            if os.path.exists(path) and (existed or not watcher.reports_writes):
+                size = os.path.getsize(path)
+                if size == last_size:
+                    return True
+                last_size = size
+            if not health_check.run_if_due():
+                return os.path.exists(path)
+            timeout = health_check.time_until_due()
+            if last_size is not None:
+                timeout = min(timeout, STABLE_INTERVAL)
+            watcher.wait(timeout)
+    finally:
+        watcher.close()
+
+def wait_for_new_folder(parent: str, existing: set[str], timeout: float) -> Optional[str]:
+
+    """Waits for a folder that was not in existing to be created in parent
+
+    Args:
+        parent (str): folder the new folder is created in
+        existing (set[str]): names of the entries of parent before the launch
+        timeout (float): maximum time to wait in seconds
+
+    Returns:
+        Optional[str]: path of the new folder, None if none was created in time
+    """
+
+    deadline = time.monotonic() + timeout
+    watcher = create_watcher(parent) if os.path.isdir(parent) else PollingWatcher(parent)
+    try:
+        while True:
+            if os.path.isdir(parent):
+                created = [entry.path for entry in os.scandir(parent) if entry.is_dir() and entry.name not in existing]
+                if created:
+                    return max(created, key=lambda path: os.stat(path).st_mtime)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            watcher.wait(remaining)
+    finally:
+        watcher.close()
+
+def wait_until(check, timeout: float, interval: float = 1.0) -> bool:
+
+    """Runs a check until it passes
+
+    Args:
+        check (Callable[[], bool]): readiness check
+        timeout (float): maximum time to wait in seconds
+        interval (float): time between checks in seconds
+
+    Returns:
+        bool: True if the check passed before the timeout
+    """
+
+    deadline = time.monotonic() + timeout
+    while True:
+        if check():
+            return True
+        if time.monotonic() + interval > deadline:
+            return False
+        time.sleep(interval)
+
+def ros_service_available(service: str) -> bool:
+    try:
+        output = subprocess.check_output(["ros2", "service", "list"], timeout=10).decode("utf-8")
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return False
+    return service in output.split()
@@ -0,0 +1,70 @@
+#!/bin/bash
+
+#---------------------------------------------------------
+# Points apt, pip and rosdep at the host-side package cache bind mounted at
+# /package_cache by build_container.sh, so packages are downloaded once per host.
+# Sourced by build_environment.sh before the competitor build.
+#
+# ARIAC_APT_PROXY      apt proxy, e.g. a local apt-cacher-ng standing in for the mirrors
+# ARIAC_PIP_INDEX_URL  local package index standing in for PyPI
+# ARIAC_OFFLINE=1      skip index updates and install from what is cached
+#---------------------------------------------------------
+
+packageCache=/package_cache
+
+if [ ! -d $packageCache ]; then
+    return 0
+fi
+
+mkdir -p $packageCache/apt/archives/partial $packageCache/apt/lists/partial $packageCache/pip $packageCache/rosdep
+
+# The image deletes downloaded packages after every install, keep them instead
+rm -f /etc/apt/apt.conf.d/docker-clean
+
+cat > /etc/apt/apt.conf.d/90ariac-package-cache << EOF
+Dir::Cache::Archives "$packageCache/apt/archives/";
+Dir::State::Lists "$packageCache/apt/lists/";
+APT::Keep-Downloaded-Packages "true";
+Binary::apt::APT::Keep-Downloaded-Packages "true";
+EOF
+
+if [[ $ARIAC_APT_PROXY ]]; then
+    echo "Acquire::http::Proxy \"$ARIAC_APT_PROXY\";" >> /etc/apt/apt.conf.d/90ariac-package-cache
+fi
+
+# apt does not wait for the archives and lists locks, it fails when another
+# container holds them, so every apt call takes a host-wide lock first.
+# /usr/local/sbin comes before /usr/bin on the PATH, also for sudo and rosdep.
+aptLock=$packageCache/apt/host.lock
+for command in apt-get apt; do
+    cat > /usr/local/sbin/$command << EOF
+#!/bin/bash
+if [ -d $packageCache/apt ]; then
+    exec flock $aptLock /usr/bin/$command "\$@"
+fi
+exec /usr/bin/$command "\$@"
+EOF
+    chmod +x /usr/local/sbin/$command
+done
+hash -r
+
+# Start from the package lists of the image until the first apt-get update
+(
+    flock 9
+    if [ -z "$(find $packageCache/apt/lists -maxdepth 1 -type f -name '*_Packages*' -print -quit)" ]; then
+        find /var/lib/apt/lists -maxdepth 1 -type f ! -name lock -exec cp -p {} $packageCache/apt/lists/ \;
+    fi
+) 9> $aptLock
+
+export PIP_CACHE_DIR=$packageCache/pip
+if [[ $ARIAC_PIP_INDEX_URL ]]; then
+    export PIP_INDEX_URL=$ARIAC_PIP_INDEX_URL
+    export PIP_TRUSTED_HOST=$(echo $ARIAC_PIP_INDEX_URL | sed -E 's,^[a-z]+://([^/:]+).*,\1,')
+fi
+
+# rosdep keeps its sources cache in ~/.ros/rosdep
+mkdir -p /root/.ros
+rm -rf /root/.ros/rosdep
+ln -s $packageCache/rosdep /root/.ros/rosdep
+
+echo "==== Using the shared package cache in $packageCache"
@@ -9,6 +9,22 @@ import time
 import glob
 import subprocess
 import shutil
+import json
+from log_watch import (
+    HealthCheck,
+    gazebo_running,
+    ros_service_available,
+    wait_for_file,
+    wait_for_new_folder,
+    wait_until
+)
+
+ARIAC_LOG_FOLDER = "/workspace/src/ARIAC/ariac_log"
+READINESS_FILE = "/tmp/readiness.json"
+
+LOG_FOLDER_TIMEOUT = 60.0
+SERVICES_TIMEOUT = 120.0
+START_SERVICE = "/ariac/start_competition"
 
 
 def main():
@@ -47,56 +63,67 @@ def main():
         shutil.rmtree('/root/.ros/log/')
     
     # Clears the tmp directory
-    for file_path in ["/tmp/"+file_name for file_name in ["trial_log.txt","sensor_cost.txt","state.log"]]:
+    for file_path in ["/tmp/"+file_name for file_name in ["trial_log.txt","sensor_cost.txt","state.log","readiness.json"]]:
         if os.path.exists(file_path):
             os.remove(file_path)
 
     trial_name = sys.argv[2]
 
-    process = Popen(["ros2", "launch", package_name, launch_file, f"trial_name:={trial_name}", '--noninteractive'])
+    # Log folders that exist before the launch belong to earlier runs
+    existing_logs = set(os.listdir(ARIAC_LOG_FOLDER)) if os.path.isdir(ARIAC_LOG_FOLDER) else set()
 
-    # Continue execution of trial until log file is generated
-    time.sleep(10)
+    launch_time = time.monotonic()
+    process = Popen(["ros2", "launch", package_name, launch_file, f"trial_name:={trial_name}", '--noninteractive'])
 
-    files = glob.glob(os.path.expanduser("/workspace/src/ARIAC/ariac_log/*"))
-    current_log_path = sorted(files, key=lambda t: -os.stat(t).st_mtime)[0]
+    readiness = {"timed_out": []}
+
+    # Wait for the log folder of this launch
+    current_log_path = wait_for_new_folder(ARIAC_LOG_FOLDER, existing_logs, LOG_FOLDER_TIMEOUT)
+    readiness["log_folder"] = round(time.monotonic() - launch_time, 3)
+    if current_log_path is None:
+        print(f"No new log folder after {LOG_FOLDER_TIMEOUT:.0f}s, using the most recent one")
+        readiness["timed_out"].append("log_folder")
+        files = glob.glob(os.path.expanduser(ARIAC_LOG_FOLDER + "/*"))
+        current_log_path = sorted(files, key=lambda t: -os.stat(t).st_mtime)[0]
+
+    # Wait for Gazebo and the ARIAC services to be up
+    if not wait_until(gazebo_running, SERVICES_TIMEOUT - (time.monotonic() - launch_time)):
+        readiness["timed_out"].append("gazebo")
+    readiness["gazebo"] = round(time.monotonic() - launch_time, 3)
+    if not wait_until(lambda: ros_service_available(START_SERVICE), SERVICES_TIMEOUT - (time.monotonic() - launch_time)):
+        readiness["timed_out"].append("services")
+    readiness["services"] = round(time.monotonic() - launch_time, 3)
+
+    print(f"==== Ready after {readiness['services']:.1f}s: log folder {readiness['log_folder']:.1f}s, Gazebo {readiness['gazebo']:.1f}s")
+    with open(READINESS_FILE, "w") as file:
+        json.dump(readiness, file)
     
-    gazebo_error = False
+    health_check = HealthCheck(gazebo_running)
     try:
-        while True:
-            if os.path.exists(f'{current_log_path}/trial_log.txt'):
-                if os.path.exists('/tmp/trial_log.txt'):
-                    os.remove('/tmp/trial_log.txt')
-                if os.path.exists('/tmp/sensor_cost.txt'):
-                    os.remove('/tmp/sensor_cost.txt')
-                if os.path.exists('/tmp/state.log'):
-                    os.remove('/tmp/state.log')
-                shutil.copy(
-                    f'{current_log_path}/trial_log.txt', '/tmp/trial_log.txt')
-                shutil.copy(
-                    f'{current_log_path}/sensor_cost.txt', '/tmp/sensor_cost.txt')
-                state_log_files = glob.glob(os.path.expanduser("/root/.gazebo/log/*"))
-                current_gazebo_log_path = sorted(state_log_files, key=lambda t: -os.stat(t).st_mtime)[0]
-                if os.path.exists(current_gazebo_log_path + '/gzserver/state.log'):
-                    shutil.copy(
-                    f'{current_gazebo_log_path}/gzserver/state.log', '/tmp/state.log')
-                break
-            try:
-                output = subprocess.check_output(
-                    "gz topic -l", shell=True, timeout=5).decode("utf-8")
-
-                if output == '' or output.count('An instance of Gazebo is not running') > 0:
-                    gazebo_error = True
-            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-                gazebo_error = True
-            
-            if gazebo_error:
-                print('Gazebo not running')
-                create_score_cmd = "echo 'Gazebo Crashed score not recorded' > /tmp/trial_log.txt"
-                subprocess.run(create_score_cmd, shell=True)
+        # Wake up when files change in the log folder instead of spinning
+        if wait_for_file(f'{current_log_path}/trial_log.txt', health_check):
+            if os.path.exists('/tmp/trial_log.txt'):
+                os.remove('/tmp/trial_log.txt')
+            if os.path.exists('/tmp/sensor_cost.txt'):
+                os.remove('/tmp/sensor_cost.txt')
+            if os.path.exists('/tmp/state.log'):
+                os.remove('/tmp/state.log')
+            shutil.copy(
+                f'{current_log_path}/trial_log.txt', '/tmp/trial_log.txt')
+            shutil.copy(
+                f'{current_log_path}/sensor_cost.txt', '/tmp/sensor_cost.txt')
+            state_log_files = glob.glob(os.path.expanduser("/root/.gazebo/log/*"))
+            current_gazebo_log_path = sorted(state_log_files, key=lambda t: -os.stat(t).st_mtime)[0]
+            if os.path.exists(current_gazebo_log_path + '/gzserver/state.log'):
                 shutil.copy(
-                    f'{current_log_path}/sensor_cost.txt', '/tmp/sensor_cost.txt')
-                break
+                f'{current_gazebo_log_path}/gzserver/state.log', '/tmp/state.log')
+        else:
+            print('Gazebo not running')
+            create_score_cmd = "echo 'Gazebo Crashed score not recorded' > /tmp/trial_log.txt"
+            subprocess.run(create_score_cmd, shell=True)
+            shutil.copy(
+                f'{current_log_path}/sensor_cost.txt', '/tmp/sensor_cost.txt')
+        print(f"==== Ran {health_check.checks} Gazebo health checks")
     except KeyboardInterrupt:
         if not os.path.exists(f'{current_log_path}/trial_log.txt'):
             with open("/tmp/trial_log.txt", "w") as file:
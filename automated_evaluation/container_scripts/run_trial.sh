@@ -7,4 +7,12 @@ chmod +x run_trial.py
 source /opt/ros/iron/setup.bash
 source /workspace/install/setup.bash
 
+# Set by the host scheduler when several trials run at the same time
+if [[ $ARIAC_ROS_DOMAIN_ID ]]; then
+    export ROS_DOMAIN_ID=$ARIAC_ROS_DOMAIN_ID
+fi
+if [[ $ARIAC_GAZEBO_MASTER_URI ]]; then
+    export GAZEBO_MASTER_URI=$ARIAC_GAZEBO_MASTER_URI
+fi
+
 python3 run_trial.py $1 $2
\ No newline at end of file
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import shutil
+import hashlib
+import tarfile
+import tempfile
+import argparse
+import subprocess
+from typing import BinaryIO, Iterator
+
+MANIFEST = "SHA256SUMS"
+
+EXPORT_SCRIPT = "/container_scripts/export_logs.sh"
+
+class ExportError(Exception):
+    pass
+
+def safe_members(archive: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+    for member in archive:
+        path = os.path.normpath(member.name)
+        if os.path.isabs(path) or path.startswith(".."):
+            raise ExportError(f"Refusing to extract {member.name} outside of the run folder")
+        if not (member.isfile() or member.isdir()):
+            continue
+        yield member
+
+def read_manifest(manifest: str) -> dict[str, str]:
+    checksums = {}
+    with open(manifest, "r") as file:
+        for line in file:
+            if line.strip():
+                checksum, name = line.rstrip("\n").split("  ", 1)
+                checksums[name] = checksum
+    return checksums
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def verify_checksums(folder: str):
+
+    """Checks every file listed in the manifest of an unpacked export
+
+    Args:
+        folder (str): folder the export was unpacked into
+
+    Raises:
+        ExportError: if the manifest is missing, or a file is missing or does not match its checksum
+    """
+
+    manifest = os.path.join(folder, MANIFEST)
+    if not os.path.exists(manifest):
+        raise ExportError("The export has no checksum manifest")
+
+    for name, checksum in read_manifest(manifest).items():
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            raise ExportError(f"{name} is listed in the manifest but missing from the export")
+        if sha256_file(path) != checksum:
+            raise ExportError(f"Checksum mismatch for {name}")
+
+def unpack_export(stream: BinaryIO, run_folder: str) -> int:
+
+    """Unpacks a compressed export stream into a run folder. The stream is
+    unpacked into a staging folder and only moved into the run folder once
+    every checksum matches.
+
+    Args:
+        stream (BinaryIO): gzip compressed tar stream written by export_logs.sh
+        run_folder (str): logs/<team>/<trial>_<n> folder to fill
+
+    Returns:
+        int: number of files unpacked
+
+    Raises:
+        ExportError: if the stream is not a valid export or a checksum does not match
+    """
+
+    # Staged outside the logs folder so a partial export never looks like a run
+    staging = tempfile.mkdtemp(prefix="ariac_export_")
+
+    try:
+        try:
+            with tarfile.open(fileobj=stream, mode="r|gz") as archive:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extraction_filter = tarfile.data_filter
+                for member in safe_members(archive):
+                    archive.extract(member, staging, set_attrs=False)
+        except (tarfile.TarError, EOFError, OSError) as e:
+            raise ExportError(f"Unable to read the export stream: {e}")
+
+        verify_checksums(staging)
+        count = len(read_manifest(os.path.join(staging, MANIFEST)))
+        os.remove(os.path.join(staging, MANIFEST))
+
+        os.makedirs(run_folder, exist_ok=True)
+        for entry in os.scandir(staging):
+            target = os.path.join(run_folder, entry.name)
+            if os.path.isdir(target) and entry.is_dir():
+                shutil.rmtree(target)
+            shutil.move(entry.path, target)
+        return count
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def export_run_logs(team_name: str, run_folder: str) -> int:
+
+    """Pulls the artifacts of the last run out of a team container as a
+    single compressed stream and unpacks them into a run folder
+
+    Args:
+        team_name (str): name of the team container
+        run_folder (str): logs/<team>/<trial>_<n> folder to fill
+
+    Returns:
+        int: number of files exported
+
+    Raises:
+        ExportError: if the export fails or a checksum does not match
+    """
+
+    process = subprocess.Popen(["docker", "exec", team_name, "bash", EXPORT_SCRIPT], stdout=subprocess.PIPE)
+    try:
+        count = unpack_export(process.stdout, run_folder)
+    finally:
+        process.stdout.close()
+        exit_code = process.wait()
+
+    if exit_code != 0:
+        raise ExportError(f"{EXPORT_SCRIPT} exited with code {exit_code}")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the logs of the last run from a team container")
+
+    parser.add_argument("team_name", help="Name of the team container")
+    parser.add_argument("run_folder", help="Run folder to unpack the logs into")
+
+    args = parser.parse_args()
+
+    try:
+        count = export_run_logs(args.team_name, args.run_folder)
+    except (ExportError, OSError) as e:
+        print(f'Unable to export logs from {args.team_name}: {e}')
+        sys.exit(1)
+
+    print(f'Exported {count} file(s) from {args.team_name} to {args.run_folder}')
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import fcntl
+import argparse
+import subprocess
+from typing import Optional
+
+import yaml
+
+MIRRORS_FOLDER = "git_mirrors"
+
+def get_automated_eval_folder() -> str:
+    return os.path.dirname(os.path.abspath(__file__))
+
+def get_mirror_path(repository: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", repository.removesuffix(".git"))
+    return os.path.join(get_automated_eval_folder(), MIRRORS_FOLDER, name + ".git")
+
+def run_git(args: list[str]) -> bool:
+    # Never prompt for credentials, a missing token should fail the update
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+    return subprocess.run(["git"] + args, env=env, stdout=sys.stderr).returncode == 0
+
+def get_default_branch(url: str) -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "ls-remote", "--symref", url, "HEAD"], capture_output=True, text=True,
+                                env=dict(os.environ, GIT_TERMINAL_PROMPT="0"), timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    for line in output.stdout.splitlines():
+        if line.startswith("ref: ") and line.endswith("\tHEAD"):
+            return line[len("ref: "):-len("\tHEAD")]
+    return None
+
+def update_mirror(repository: str, token: str = "", offline: bool = False) -> Optional[str]:
+
+    """Creates or updates a bare mirror of a repository on the host. Updates
+    only fetch the objects that are new since the last update. The token is
+    only used for the fetch and never stored in the mirror.
+
+    Args:
+        repository (str): repository url without the scheme, e.g. github.com/org/repo.git
+        token (str): personal access token for private repositories
+        offline (bool): use the mirror as it is, without fetching
+
+    Returns:
+        Optional[str]: path of the mirror, None if it could not be updated
+    """
+
+    mirror = get_mirror_path(repository)
+    os.makedirs(os.path.dirname(mirror), exist_ok=True)
+    url = f"https://{token}@{repository}" if token else f"https://{repository}"
+
+    # Builds of teams sharing a repository may update the mirror at the same time
+    with open(mirror + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        if offline:
+            return mirror if os.path.isdir(mirror) else None
+
+        if not os.path.isdir(mirror) and not run_git(["init", "--bare", "--quiet", mirror]):
+            return None
+
+        if not run_git(["-C", mirror, "fetch", "--prune", "--quiet", url,
+                        "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"]):
+            return None
+
+        # Point HEAD at the default branch, so clones without a tag check it out
+        default_branch = get_default_branch(url)
+        if default_branch is not None:
+            run_git(["-C", mirror, "symbolic-ref", "HEAD", default_branch])
+        return mirror
+
+def update_team_mirror(team_name: str, offline: bool = False) -> Optional[str]:
+    try:
+        with open(os.path.join(get_automated_eval_folder(), "competitor_configs", team_name + ".yaml")) as file:
+            github = (yaml.safe_load(file) or {})["github"]
+    except (IOError, yaml.YAMLError, KeyError, TypeError) as e:
+        print(f"Unable to read the repository of {team_name}: {e}", file=sys.stderr)
+        return None
+    return update_mirror(github["repository"], github.get("personal_access_token") or "", offline)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host side bare mirrors of competitor repositories")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = subparsers.add_parser("update", help="Create or update the mirror of a team's repository and print its path")
+    update_parser.add_argument("team_name")
+    update_parser.add_argument("--offline", action="store_true", help="Use the existing mirror without fetching")
+
+    args = parser.parse_args()
+
+    mirror = update_team_mirror(args.team_name, args.offline)
+    if mirror is None:
+        print(f"Unable to update the repository mirror of {args.team_name}", file=sys.stderr)
+        sys.exit(1)
+    print(mirror)
@@ -1,7 +1,15 @@
 teamName=$1
 trial=$2 
 
-docker cp $PWD/logs/$teamName/$trial/state.log $teamName:/home
+stateLog=$PWD/logs/$teamName/$trial/state.log
+
+# Export a raw state log if the run only has the seekable compressed one
+if [ ! -f $stateLog ] && [ -f $stateLog.sz ]; then
+    python3 $PWD/scoring/seekable_log.py export $stateLog.sz /tmp/$teamName\_$trial\_state.log
+    stateLog=/tmp/$teamName\_$trial\_state.log
+fi
+
+docker cp $stateLog $teamName:/home/state.log
 
 docker exec -it $teamName bash -c ". /container_scripts/playback_trial.sh"
         
\ No newline at end of file
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import shutil
+import threading
+from time import time
+from typing import Optional
+
+import yaml
+
+JOURNAL_FILE = ".run_journal.jsonl"
+
+JOB_DEFAULTS = {
+    "teams": [],
+    "trials": [],
+    "iterations": 1,
+    "max_iterations": None,
+    "max_parallel": 1,
+    "max_builds": 4,
+    "use_nvidia": False,
+    "rebuild_containers": False,
+    "update_trials": False,
+    "early_stop": False,
+    "warm_runs": False
+}
+
+# Settings that change which runs make up the competition, a journal is only resumed if they match
+JOB_KEYS = ["teams", "trials", "iterations", "max_iterations", "early_stop"]
+
+class JobFileError(Exception):
+    pass
+
+def load_job_file(job_file: str, team_names: list[str], trial_names: list[str]) -> dict:
+
+    """Reads a batch job file. Teams and trials are lists of names, or "all"
+    for every team configuration or trial.
+
+    Args:
+        job_file (str): path of the yaml job file
+        team_names (list[str]): available team configurations
+        trial_names (list[str]): available trials
+
+    Returns:
+        dict: the job, with defaults filled in
+
+    Raises:
+        JobFileError: if the job file cannot be read or names unknown teams or trials
+    """
+
+    try:
+        with open(job_file, "r") as file:
+            data = yaml.safe_load(file) or {}
+    except (IOError, yaml.YAMLError) as e:
+        raise JobFileError(f"Unable to read {job_file}: {e}")
+    if not isinstance(data, dict):
+        raise JobFileError(f"{job_file} is not a mapping of job settings")
+
+    unknown = [key for key in data if key not in JOB_DEFAULTS]
+    if unknown:
+        raise JobFileError(f"Unknown job settings in {job_file}: {', '.join(unknown)}")
+
+    job = dict(JOB_DEFAULTS, **data)
+    for key, available in (("teams", team_names), ("trials", trial_names)):
+        if job[key] == "all":
+            job[key] = list(available)
+        if isinstance(job[key], str):
+            job[key] = [job[key]]
+        missing = [name for name in job[key] if name not in available]
+        if missing:
+            raise JobFileError(f"Unknown {key} in {job_file}: {', '.join(missing)}")
+        if not job[key]:
+            raise JobFileError(f"No {key} selected in {job_file}")
+        # Same order as the GUI, so a job and its journal always line up
+        job[key] = [name for name in available if name in job[key]]
+
+    if job["max_iterations"] is None:
+        job["max_iterations"] = job["iterations"]
+    job["max_iterations"] = max(job["iterations"], job["max_iterations"])
+    return job
+
+class TrialProgress():
+    def __init__(self):
+        self.completed_runs = 0
+        self.trial_runs = 0
+        self.run_folders: list[str] = []
+        self.done = False
+        self.stopped_early = False
+
+class RunJournal():
+    """Append-only record of the runs of a competition, kept next to the logs.
+    Every line is flushed and synced to disk before the scheduler moves on, so
+    a run is either in the journal with its log folder, or is run again.
+    """
+
+    def __init__(self, logs_folder: str):
+        self.logs_folder = logs_folder
+        self.path = os.path.join(logs_folder, JOURNAL_FILE)
+        self.job: Optional[dict] = None
+        self.progress: dict[tuple[str, str], TrialProgress] = {}
+        self.unreadable_lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash, the run it describes is run again
+                    self.unreadable_lines += 1
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry: dict):
+        if entry["event"] == "start":
+            self.job = entry["job"]
+            return
+
+        progress = self.get_progress(entry["team"], entry["trial"])
+        if entry["event"] == "run":
+            progress.trial_runs += 1
+            if entry["succeeded"]:
+                progress.completed_runs += 1
+                progress.run_folders.append(entry["run_folder"])
+        elif entry["event"] == "trial_done":
+            progress.done = True
+            progress.stopped_early = entry["stopped_early"]
+
+    def _append(self, entry: dict):
+        entry["time"] = round(time(), 3)
+        with self._lock:
+            os.makedirs(self.logs_folder, exist_ok=True)
+            with open(self.path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self._apply(entry)
+
+    def get_progress(self, team_name: str, trial_name: str) -> TrialProgress:
+        return self.progress.setdefault((team_name, trial_name), TrialProgress())
+
+    def check_resume(self, job: dict) -> tuple[bool, str]:
+
+        """Checks if a job can resume from this journal
+
+        Args:
+            job (dict): job about to run
+
+        Returns:
+            tuple[bool, str]: True if the job can resume, and the reason why or why not
+        """
+
+        if not os.path.exists(self.path):
+            return False, f"there is no run journal in {self.logs_folder}"
+        if self.job is None:
+            return False, f"{self.path} has no readable job, its first line may have been cut short"
+        differing = [key for key in JOB_KEYS if self.job.get(key) != job.get(key)]
+        if differing:
+            return False, f"{self.path} is from a job with different {', '.join(differing)}"
+        return True, f"{self.path} is from the same job"
+
+    def matches(self, job: dict) -> bool:
+        return self.check_resume(job)[0]
+
+    def outstanding(self, team_names: list[str], trial_names: list[str]) -> list[tuple[str, str]]:
+        return [(team, trial) for team in team_names for trial in trial_names if not self.get_progress(team, trial).done]
+
+    def start(self, job: dict):
+        self._append({"event": "start", "job": {key: job.get(key) for key in JOB_DEFAULTS}})
+
+    def record_run(self, team_name: str, trial_name: str, run_folder: Optional[str], succeeded: bool):
+        self._append({"event": "run", "team": team_name, "trial": trial_name,
+                      "run_folder": os.path.basename(run_folder) if run_folder else None, "succeeded": succeeded})
+
+    def record_trial_done(self, team_name: str, trial_name: str, stopped_early: bool = False):
+        self._append({"event": "trial_done", "team": team_name, "trial": trial_name, "stopped_early": stopped_early})
+
+    def discard_unrecorded_runs(self, team_name: str, trial_name: str) -> int:
+
+        """Removes the run folders of a team/trial that are not in the journal,
+        left behind by a run that was interrupted before it was recorded
+
+        Args:
+            team_name (str): name of the team
+            trial_name (str): name of the trial
+
+        Returns:
+            int: number of run folders removed
+        """
+
+        team_folder = os.path.join(self.logs_folder, team_name)
+        if not os.path.isdir(team_folder):
+            return 0
+        recorded = set(self.get_progress(team_name, trial_name).run_folders)
+        pattern = re.compile(re.escape(trial_name) + r"_\d+")
+        removed = 0
+        for entry in os.scandir(team_folder):
+            if entry.is_dir() and pattern.fullmatch(entry.name) and entry.name not in recorded:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
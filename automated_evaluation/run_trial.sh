@@ -25,13 +25,28 @@ function run_trial() {
         done
         mkdir -p /$PWD/logs/$teamname/$trialname\_$j/;
     fi
-    docker exec -it $teamname bash -c ". /container_scripts/run_trial.sh $teamname $trialname"
+    # Only ask for a tty when there is a terminal, e.g. not when run by the parallel scheduler
+    local ttyFlag=""
+    if [ -t 0 ]; then
+        ttyFlag="-it"
+    fi
+    # Separate ROS domain and Gazebo master port for trials running at the same time
+    docker exec $ttyFlag -e ARIAC_ROS_DOMAIN_ID=$ARIAC_ROS_DOMAIN_ID -e ARIAC_GAZEBO_MASTER_URI=$ARIAC_GAZEBO_MASTER_URI $teamname bash -c ". /container_scripts/run_trial.sh $teamname $trialname"
     echo "==== Copying logs to"
     
-    docker cp $teamname:/tmp/trial_log.txt $PWD/logs/$teamname/$trialname\_$j/trial_log.txt
-    docker cp $teamname:/tmp/sensor_cost.txt $PWD/logs/$teamname/$trialname\_$j/sensor_cost.txt
-    docker cp $teamname:/tmp/state.log $PWD/logs/$teamname/$trialname\_$j/state.log
-    docker cp $teamname:/root/.ros/log/. $PWD/logs/$teamname/$trialname\_$j/ros_log/
+    # Pull every artifact in one compressed, checksummed stream, falling back to
+    # separate copies for containers built before export_logs.sh existed
+    if ! python3 $PWD/export_logs.py $teamname $PWD/logs/$teamname/$trialname\_$j; then
+        docker cp $teamname:/tmp/trial_log.txt $PWD/logs/$teamname/$trialname\_$j/trial_log.txt
+        docker cp $teamname:/tmp/sensor_cost.txt $PWD/logs/$teamname/$trialname\_$j/sensor_cost.txt
+        docker cp $teamname:/tmp/readiness.json $PWD/logs/$teamname/$trialname\_$j/readiness.json
+        docker cp $teamname:/tmp/state.log $PWD/logs/$teamname/$trialname\_$j/state.log
+        docker cp $teamname:/root/.ros/log/. $PWD/logs/$teamname/$trialname\_$j/ros_log/
+    fi
+    if [[ "$ARIAC_COMPRESS_STATE_LOGS" == "1" ]]; then
+        # Store the state log in the seekable compressed format
+        python3 $PWD/scoring/seekable_log.py compress $PWD/logs/$teamname/$trialname\_$j/state.log && rm $PWD/logs/$teamname/$trialname\_$j/state.log
+    fi
 }
 
 if [[ "$2" != "run-all" ]] ; then
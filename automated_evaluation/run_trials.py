@@ -1,4 +1,6 @@
 import os
+import sys
+import argparse
 from copy import copy
 import customtkinter as ctk
 from tkinter import *
@@ -10,47 +12,20 @@ import docker.models
 from docker.models.containers import Container as DockerContainer
 from typing import Optional
 import shutil
+from trial_scheduler import (
+    bcolors,
+    trial_succeeded,
+    get_most_recent_trial_log,
+    get_most_recent_trial_folder,
+    delete_most_recent_trial_folder,
+    DockerContainerBackend,
+    EarlyStopPolicy,
+    TrialScheduler
+)
+from container_builds import run_builds
+from run_journal import RunJournal, JobFileError, load_job_file
 
 
-class bcolors:
-    HEADER = "\033[95m"
-    OKBLUE = "\033[94m"
-    OKCYAN = "\033[96m"
-    OKGREEN = "\033[92m"
-    WARNING = "\033[93m"
-    FAIL = "\033[91m"
-    ENDC = "\033[0m"
-    BOLD = "\033[1m"
-    UNDERLINE = "\033[4m"
-
-def trial_succeeded(trial_log: str) -> bool:   
-    if os.path.exists(trial_log):
-        with open(trial_log, "r") as file:
-            if len(file.readlines()) > 1:
-                return True
-            else:
-                return False
-    
-    print(bcolors.FAIL+"Unable to find most log file for most recent run"+bcolors.ENDC)
-    return False
-
-def get_most_recent_trial_log(team_name: str, trial_name: str) -> str:
-    most_recent_trial_folder = get_most_recent_trial_folder(team_name, trial_name)
-    
-    trial_log = os.path.join(most_recent_trial_folder, "trial_log.txt")
-    
-    return trial_log
-
-def get_most_recent_trial_folder(team_name: str, trial_name: str):
-    folders = [file.path for file in os.scandir(os.path.join(os.getcwd(), "logs", team_name))]
-    
-    trial_folders = filter(lambda x: trial_name in x, folders)
-    
-    return sorted(trial_folders, key=lambda x: int(x.split("_")[-1]))[-1]
-
-def delete_most_recent_trial_folder(team_name: str, trial_name: str):
-    os.system(f"rm -rf {get_most_recent_trial_folder(team_name, trial_name)}")
-
 class Options_GUI(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -81,20 +56,32 @@ class Options_GUI(ctk.CTk):
         self.num_iter_var.set(1)
         self.max_iter_var = ctk.IntVar()
         self.max_iter_var.set(1)
+        self.max_parallel_var = ctk.IntVar()
+        self.max_parallel_var.set(1)
+        self.max_builds_var = ctk.IntVar()
+        self.max_builds_var.set(4)
         self.use_nvidia_var = ctk.StringVar()
         self.use_nvidia_var.set("1" if nvidia_present else "0")
         self.rebuild_containers_var = ctk.StringVar()
         self.rebuild_containers_var.set("0")
         self.update_trials_var = ctk.StringVar()
         self.update_trials_var.set("0")
+        self.early_stop_var = ctk.StringVar()
+        self.early_stop_var.set("0")
+        self.warm_runs_var = ctk.StringVar()
+        self.warm_runs_var.set("0")
 
         self.team_selections = []
         self.trial_selections = []
         self.num_iter_selection = 0
         self.max_iter_selection = 0
+        self.max_parallel_selection = 1
+        self.max_builds_selection = 4
         self.use_nvidia = False
         self.rebuild_containers = False
         self.update_trials = False
+        self.early_stop = False
+        self.warm_runs = False
 
         for i in range(len(self.team_vars)):
             cb = ctk.CTkCheckBox(self, text=self.team_names[i], variable=self.team_vars[i], onvalue="1", offvalue="0", height=1, width=20)
@@ -118,6 +105,12 @@ class Options_GUI(ctk.CTk):
         self.max_iter_slider = ctk.CTkSlider(self,variable=self.max_iter_var,from_=1, to=20, number_of_steps=19, orientation="horizontal")
         self.max_iter_slider.grid(column = self.middle_column, row = 4)
 
+        max_parallel = max(2, min(len(self.team_names), os.cpu_count() or 1))
+        self.max_parallel_label = ctk.CTkLabel(self, text="Maximum number of containers running at once = "+str(self.max_parallel_var.get()))
+        self.max_parallel_label.grid(column = self.middle_column, row = 8)
+        self.max_parallel_slider = ctk.CTkSlider(self,variable=self.max_parallel_var,from_=1, to=max_parallel, number_of_steps=max_parallel-1, orientation="horizontal")
+        self.max_parallel_slider.grid(column = self.middle_column, row = 9)
+
         if nvidia_present:
             self.use_nvidia_cb = ctk.CTkCheckBox(self, variable=self.use_nvidia_var, onvalue="1", offvalue="0", state=NORMAL, text="Use NVIDIA in container")
             self.use_nvidia_cb.grid(column = self.middle_column, row = 5, sticky=NW, ipadx=15)
@@ -125,15 +118,28 @@ class Options_GUI(ctk.CTk):
         self.rebuild_containers_cb = ctk.CTkCheckBox(self, variable=self.rebuild_containers_var, onvalue="1", offvalue="0", state=NORMAL, text="Rebuild containers")
         self.rebuild_containers_cb.grid(column = self.middle_column, row = 6, sticky=NW, ipadx=15)
         
+        self.max_builds_label = ctk.CTkLabel(self, text="Maximum number of containers building at once = "+str(self.max_builds_var.get()))
+        self.max_builds_label.grid(column = self.middle_column, row = 13)
+        self.max_builds_slider = ctk.CTkSlider(self,variable=self.max_builds_var,from_=1, to=16, number_of_steps=15, orientation="horizontal")
+        self.max_builds_slider.grid(column = self.middle_column, row = 14)
+        
         self.update_trials_cb = ctk.CTkCheckBox(self, variable=self.update_trials_var, onvalue="1", offvalue="0", state=NORMAL, text="Update trials")
         self.update_trials_cb.grid(column = self.middle_column, row = 7, sticky=NW, ipadx=15)
         
+        self.early_stop_cb = ctk.CTkCheckBox(self, variable=self.early_stop_var, onvalue="1", offvalue="0", state=NORMAL, text="Stop iterating once a run reaches the max score")
+        self.early_stop_cb.grid(column = self.middle_column, row = 11, sticky=NW, ipadx=15)
+        
+        self.warm_runs_cb = ctk.CTkCheckBox(self, variable=self.warm_runs_var, onvalue="1", offvalue="0", state=NORMAL, text="Reuse running containers between runs")
+        self.warm_runs_cb.grid(column = self.middle_column, row = 12, sticky=NW, ipadx=15)
+        
         self.spacing_label = ctk.CTkLabel(self, text=" "*(len(self.max_iter_label._text)+50))
         self.spacing_label.grid(column = self.middle_column, row=10)
 
 
         self.num_iter_var.trace_add('write', self.update_num_iter_label)
         self.max_iter_var.trace_add('write', self.update_max_iter_label)
+        self.max_parallel_var.trace_add('write', self.update_max_parallel_label)
+        self.max_builds_var.trace_add('write', self.update_max_builds_label)
 
         self.save_button = ctk.CTkButton(self, text="Run Competition", command=self.save_selections)
         self.save_button.grid(column = self.middle_column, pady = 50)
@@ -148,6 +154,12 @@ class Options_GUI(ctk.CTk):
             self.max_iter_var.set(self.num_iter_var.get())
         self.max_iter_label.configure(text = "Maximum number of iterations per trial per team = "+str(self.max_iter_var.get()))
     
+    def update_max_parallel_label(self,_,__,___):
+        self.max_parallel_label.configure(text = "Maximum number of containers running at once = "+str(self.max_parallel_var.get()))
+    
+    def update_max_builds_label(self,_,__,___):
+        self.max_builds_label.configure(text = "Maximum number of containers building at once = "+str(self.max_builds_var.get()))
+    
     def select_all(self, l):
         for v in l:
             v.set("1")
@@ -159,30 +171,36 @@ class Options_GUI(ctk.CTk):
         self.trial_selections = [name for name in self.trial_names if name in temp_trials_selected]
         self.num_iter_selection = self.num_iter_var.get()
         self.max_iter_selection = self.max_iter_var.get()
+        self.max_parallel_selection = self.max_parallel_var.get()
+        self.max_builds_selection = self.max_builds_var.get()
         self.use_nvidia = self.use_nvidia_var.get()=="1"
         self.rebuild_containers = self.rebuild_containers_var.get()=="1"
         self.update_trials = self.update_trials_var.get()=="1"
+        self.early_stop = self.early_stop_var.get()=="1"
+        self.warm_runs = self.warm_runs_var.get()=="1"
         self.destroy()
 
-if __name__ == "__main__":
-    # print(bcolors.OKCYAN + "ARIAC logs for this trial can be found at:" + bcolors.ENDC)
-    # Get options from GUI
+def get_job_from_gui() -> Optional[dict]:
     setup_gui = Options_GUI()
     setup_gui.mainloop()
 
     if 0 in [len(setup_gui.team_selections),len(setup_gui.trial_selections), setup_gui.num_iter_selection]:
-        print("Exited out of GUI. Not running any trials.")
-        quit()
-    else:
-        team_names = setup_gui.team_selections
-        trial_names = setup_gui.trial_selections
-        num_iter_per_trial = setup_gui.num_iter_selection
-        max_iter_per_trial = setup_gui.max_iter_selection
-        use_nvidia = setup_gui.use_nvidia
-        rebuild_containers = setup_gui.rebuild_containers
-        update_trials = (setup_gui.update_trials if not rebuild_containers else False)
-    
-    # Move existing log files
+        return None
+    return {
+        "teams": setup_gui.team_selections,
+        "trials": setup_gui.trial_selections,
+        "iterations": setup_gui.num_iter_selection,
+        "max_iterations": setup_gui.max_iter_selection,
+        "max_parallel": setup_gui.max_parallel_selection,
+        "max_builds": setup_gui.max_builds_selection,
+        "use_nvidia": setup_gui.use_nvidia,
+        "rebuild_containers": setup_gui.rebuild_containers,
+        "update_trials": setup_gui.update_trials,
+        "early_stop": setup_gui.early_stop,
+        "warm_runs": setup_gui.warm_runs
+    }
+
+def move_existing_logs():
     if os.path.exists(os.path.join(os.getcwd(), "logs")) and len(os.listdir(os.path.join(os.getcwd(),"logs")))>0:
         num = 1
         if not os.path.exists(os.path.join(os.getcwd(),"old_logs")):
@@ -193,9 +211,65 @@ if __name__ == "__main__":
             for folder in os.listdir(os.path.join(os.getcwd(),"old_logs")):
                 if "competition_run_" in folder:
                     used_nums.append(int(folder.split("_")[-1]))
-            os.mkdir(os.path.join(os.getcwd(),"old_logs", f"competition_run_{max(used_nums)+1}"))
-            num = max(used_nums)+1
+            os.mkdir(os.path.join(os.getcwd(),"old_logs", f"competition_run_{max(used_nums, default=0)+1}"))
+            num = max(used_nums, default=0)+1
+        print(bcolors.WARNING+f"Moving the existing logs to old_logs/competition_run_{num}"+bcolors.ENDC)
         shutil.move(f"{os.getcwd()}/logs", f"{os.getcwd()}/old_logs/competition_run_{num}")    
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ARIAC trials for competitor containers")
+    parser.add_argument("--job", help="Run headless from a yaml job file, resuming the previous run of the same job")
+    parser.add_argument("--fresh", action="store_true", help="Start the job from scratch instead of resuming it")
+    args = parser.parse_args()
+
+    if args.job:
+        available_teams = sorted([file.replace(".yaml","") for file in os.listdir(os.getcwd()+"/competitor_configs") if ".yaml" in file])
+        available_trials = sorted([file.replace(".yaml","") for file in os.listdir(os.getcwd()+"/trials") if ".yaml" in file])
+        try:
+            job = load_job_file(args.job, available_teams, available_trials)
+        except JobFileError as e:
+            print(bcolors.FAIL+str(e)+bcolors.ENDC)
+            sys.exit(1)
+    else:
+        # Get options from GUI
+        job = get_job_from_gui()
+        if job is None:
+            print("Exited out of GUI. Not running any trials.")
+            quit()
+
+    team_names = job["teams"]
+    trial_names = job["trials"]
+    num_iter_per_trial = job["iterations"]
+    max_iter_per_trial = job["max_iterations"]
+    max_parallel = job["max_parallel"]
+    max_builds = job["max_builds"]
+    use_nvidia = job["use_nvidia"]
+    rebuild_containers = job["rebuild_containers"]
+    update_trials = (job["update_trials"] if not rebuild_containers else False)
+    early_stop = job["early_stop"]
+    warm_runs = job["warm_runs"]
+
+    # Resume a job from its journal, otherwise move existing log files and start a new journal
+    logs_folder = os.path.join(os.getcwd(), "logs")
+    journal = RunJournal(logs_folder)
+    if not args.job:
+        resume, reason = False, "runs started from the GUI always start fresh, use --job to resume"
+    elif args.fresh:
+        resume, reason = False, "--fresh was given"
+    else:
+        resume, reason = journal.check_resume(job)
+    if resume:
+        outstanding = journal.outstanding(team_names, trial_names)
+        print(bcolors.OKCYAN+f"Resuming the job as {reason}, {len(outstanding)} team/trial(s) outstanding"+bcolors.ENDC)
+        if journal.unreadable_lines:
+            print(bcolors.WARNING+f"Skipped {journal.unreadable_lines} unreadable line(s) of {journal.path}, their runs are run again"+bcolors.ENDC)
+        if not outstanding:
+            quit()
+    else:
+        print(bcolors.OKCYAN+f"Starting a new competition run as {reason}"+bcolors.ENDC)
+        move_existing_logs()
+        journal = RunJournal(logs_folder)
+        journal.start(job)
         
     # Build/Rebuild all containers
     docker_client = docker.DockerClient()
@@ -208,20 +282,24 @@ if __name__ == "__main__":
                 team_containers[team] = container
                 break
             
-    if rebuild_containers:
-        for team in team_names:
-            # Remove existing containers
+    teams_to_build = team_names if rebuild_containers else []
+    if resume:
+        # The containers were built and updated when the job started, only build the ones that are missing
+        outstanding_teams = {team for team, _ in journal.outstanding(team_names, trial_names)}
+        teams_to_build = [team for team in team_names if team in outstanding_teams and team_containers[team] is None]
+        update_trials = False
+
+    if teams_to_build:
+        # Remove existing containers
+        for team in teams_to_build:
             if team_containers[team] is not None:
-                container.remove(force=True)
-            
-            # Build new container
-            build_command = ["./build_container.sh", team,]
-            if use_nvidia:
-                build_command.append("nvidia")
-            process = subprocess.run(build_command)
-            
-            all_containers = docker_client.containers.list(all=True)
-            
+                team_containers[team].remove(force=True)
+        
+        # Build new containers, several at once
+        run_builds(teams_to_build, use_nvidia, max_builds)
+        
+        all_containers = docker_client.containers.list(all=True)
+        for team in teams_to_build:
             try:
                 team_containers[team] = [c for c in all_containers if c.name == team][0]
             except IndexError:
@@ -234,48 +312,17 @@ if __name__ == "__main__":
             if not team_containers[team] is None:
                 process = subprocess.run(["./update_trials.sh",team])
 
+    # Teams whose container failed to build are not run
+    team_containers = {team: container for team, container in team_containers.items() if container is not None}
+    team_names = [team for team in team_names if team in team_containers]
+    
     # Stop all containers
     for container in team_containers.values():
         print(bcolors.OKGREEN+"Stopping container",container.name,bcolors.ENDC)
         container.stop()
     
-    # Run trials
-    for team_name, container in team_containers.items():
-        for trial_name in trial_names:
-            trial_runs = 0
-            completed_runs = 0
-            
-            while completed_runs < num_iter_per_trial:
-                print(bcolors.OKGREEN+"Restarting container",team_name,container.name,bcolors.ENDC)
-                container.restart()
-                
-                # Start trial
-                print(bcolors.OKGREEN+f"On trial {trial_runs} of {max_iter_per_trial} for "+container.name,bcolors.ENDC)
-                print(bcolors.OKGREEN+f"Completed runs: {completed_runs} out of {num_iter_per_trial} for "+container.name,bcolors.ENDC)
-                run_command = ["./run_trial.sh", team_name, trial_name]
-                p = subprocess.Popen(run_command)
-                p.wait()
-                
-                sleep(2)
-                
-                most_recent_trial_log = get_most_recent_trial_log(team_name, trial_name)
-                if os.path.exists(most_recent_trial_log):
-                    if trial_succeeded(most_recent_trial_log):
-                        completed_runs+=1
-                    else:
-                        print(bcolors.FAIL+"Trial did not run correctly. Trying again"+bcolors.ENDC)
-                        delete_most_recent_trial_folder(team_name, trial_name)
-                else:
-                    print(bcolors.FAIL+"Unable to find log file. Running again"+container.name,bcolors.ENDC)
-                    delete_most_recent_trial_folder(team_name, trial_name)
-                
-                trial_runs+=1
-                
-                if trial_runs >= max_iter_per_trial:
-                    break
-        
-        container.stop()
-                
-        print(bcolors.OKCYAN+"="*50)
-        print("Completed all trials for team: "+team_name)
-        print("="*50+bcolors.ENDC)
\ No newline at end of file
+    # Run trials, several containers at once when their declared resources fit on the host
+    scheduler = TrialScheduler(DockerContainerBackend(team_containers), team_names, trial_names,
+                               num_iter_per_trial, max_iter_per_trial, max_parallel,
+                               early_stop=(EarlyStopPolicy() if early_stop else None), warm=warm_runs, journal=journal)
+    scheduler.run()
@@ -0,0 +1,238 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from structs import (
+    OrderInfo,
+    TrialInfo
+)
+
+from score_trial import (
+    score_trial,
+    get_order_information,
+    get_logs_store,
+    create_trial_graphs
+)
+
+from score_engine import (
+    TrialScoreMatrix,
+    Weights,
+    sweep_weights
+)
+
+from score_store import reset_score_stores
+
+from trial_manifest import (
+    TrialManifest,
+    load_trial_manifests
+)
+
+def _score_trial_worker(args: tuple[str, float, float, list[str], list[OrderInfo]]) -> TrialInfo:
+    trial, wc, wt, team_names, order_info = args
+    return score_trial(trial, wc, wt, team_names=team_names, order_info=order_info)
+
+class CompetitionScorer():
+    """Scoring session for a whole competition.
+
+    Every trial config is parsed once when the session starts and every
+    trial is scored at most once per session. The leaderboard, the
+    score breakdown, the graphs and the best log selection are all served
+    from the same memoized set of TrialInfo results. With more than one
+    worker, trials that have not been scored yet are fanned out over a
+    process pool and merged back in trial order.
+    """
+
+    def __init__(self, team_names: list[str], trial_names: list[str], wc: float = 1.0, wt: float = 1.0, workers: int = 1,
+                 manifests: Optional[dict[str, TrialManifest]] = None):
+        self.team_names = team_names
+        self.trial_names = trial_names
+        self.wc = wc
+        self.wt = wt
+        self.workers = workers
+        self.manifests = manifests if manifests is not None else load_trial_manifests()
+
+        self._trial_info: dict[str, TrialInfo] = {}
+
+    def get_order_information(self, trial: str) -> list[OrderInfo]:
+
+        """Get the order information for a trial from the manifests parsed for the session
+
+        Args:
+            trial (str): trial name
+
+        Returns:
+            list[OrderInfo]: list of information about each order in the given trial
+        """
+
+        manifest = self.manifests.get(trial)
+        if manifest is None:
+            # Reports the missing or invalid trial config
+            return get_order_information(trial)
+        return manifest.order_information()
+
+    def get_trial_info(self, trial: str) -> TrialInfo:
+
+        """Get the scoring results for a trial, scoring it on first use
+
+        Args:
+            trial (str): trial name
+
+        Returns:
+            TrialInfo: scoring results for the trial
+        """
+
+        if trial not in self._trial_info:
+            self._trial_info[trial] = score_trial(trial, self.wc, self.wt, team_names=self.team_names,
+                                                  order_info=self.get_order_information(trial))
+
+        return self._trial_info[trial]
+
+    def score_all(self) -> dict[str, TrialInfo]:
+
+        """Scores every trial in the session that has not been scored yet
+
+        Returns:
+            dict[str, TrialInfo]: scoring results for each trial
+        """
+
+        pending = [trial for trial in self.trial_names if trial not in self._trial_info]
+
+        if self.workers > 1 and len(pending) > 1:
+            # Sync the score index once here so the workers only read from it
+            get_logs_store()
+
+            jobs = [(trial, self.wc, self.wt, self.team_names, self.get_order_information(trial)) for trial in pending]
+            # Each worker opens its own connection instead of the one inherited from this process
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending)), initializer=reset_score_stores) as executor:
+                for trial, trial_info in zip(pending, executor.map(_score_trial_worker, jobs)):
+                    self._trial_info[trial] = trial_info
+
+        return {trial: self.get_trial_info(trial) for trial in self.trial_names}
+
+    def get_total_scores(self) -> dict[str, float]:
+
+        """Sums the trial scores of each team
+
+        Returns:
+            dict[str,float]: team names and their final scores, sorted from highest to lowest score
+        """
+
+        final_scores_by_team = {team: 0 for team in self.team_names}
+        for trial_info in self.score_all().values():
+            for team in self.team_names:
+                final_scores_by_team[team] += trial_info.trial_scores.get(team, 0)
+        return {k: v for k, v in sorted(final_scores_by_team.items(), key=lambda item: -item[1])}
+
+    def get_trial_scores_by_team(self) -> dict[str, list[float]]:
+
+        """Gets the individual trial scores for each team
+
+        Returns:
+            dict[str,list[float]]: team names and a list of their trial scores in trial order
+        """
+
+        all_trial_scores = {team: [] for team in self.team_names}
+        for trial_info in self.score_all().values():
+            for team in self.team_names:
+                all_trial_scores[team].append(trial_info.trial_scores.get(team, 0))
+        return all_trial_scores
+
+    def get_total_raw_scores_by_team(self) -> dict[str, int]:
+
+        """Sums the raw score of every order submitted by each team
+
+        Returns:
+            dict[str,int]: team names and their total raw scores
+        """
+
+        total_raw_scores = {team: 0 for team in self.team_names}
+        for trial, trial_info in self.score_all().items():
+            order_ids = [order.order_id for order in self.get_order_information(trial)]
+            for team in self.team_names:
+                if team not in trial_info.team_submissions:
+                    continue
+                order_submissions = trial_info.team_submissions[team].order_submissions
+                for order_id in order_ids:
+                    submission = order_submissions.get(order_id)
+                    if submission is not None:
+                        total_raw_scores[team] += submission.raw_score
+        return total_raw_scores
+
+    def get_best_trial_logs(self) -> dict[str, dict[str, Optional[str]]]:
+
+        """Gets the best run folder of each team for each trial
+
+        Returns:
+            dict[str, dict[str, Optional[str]]]: best run folder by trial, then by team
+        """
+
+        return {trial: trial_info.team_best_file_logs for trial, trial_info in self.score_all().items()}
+
+    def get_score_matrices(self) -> list[TrialScoreMatrix]:
+
+        """Builds the array-backed score matrices of every trial
+
+        Returns:
+            list[TrialScoreMatrix]: score matrices in trial order
+        """
+
+        return [TrialScoreMatrix.from_submissions(self.get_order_information(trial), trial_info.team_submissions)
+                for trial, trial_info in self.score_all().items()]
+
+    def sweep_weights(self, wc: Weights, wt: Weights) -> tuple[np.ndarray, np.ndarray]:
+
+        """Calculates the final scores and rankings for many cost/time weight
+        combinations without re-scoring any trial
+
+        Args:
+            wc (Weights): cost weights
+            wt (Weights): time weights
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: final scores and team rankings (indices into team_names),
+            both shaped broadcast(wc, wt).shape + (number of teams,)
+        """
+
+        return sweep_weights(self.get_score_matrices(), self.team_names, wc, wt)
+
+    def create_graphs(self):
+        """Generates the raw score graphs of every trial for each team"""
+        for trial, trial_info in self.score_all().items():
+            create_trial_graphs(trial, self.get_order_information(trial), trial_info.team_submissions, self.team_names)
+
+    def write_results(self, file_path: str):
+
+        """Writes the leaderboard and the score breakdown of each trial to a csv file
+
+        Args:
+            file_path (str): path of the csv file
+        """
+
+        final_scores = self.get_total_scores()
+        with open(file_path, "w") as file:
+            file.write("Leaderboard:\n\n")
+            for team, score in final_scores.items():
+                file.write(f"{team},{score}\n")
+
+            file.write("\n\n\nScore Breakdown:\n\n")
+            for trial in self.trial_names:
+                file.write(f"{trial}:\n")
+                order_ids = [order.order_id for order in self.get_order_information(trial)]
+                file.write("Team,"+",".join([f"Order {order_ids.index(order_id)}({order_id}) Score,Order {order_ids.index(order_id)}({order_id}) Duration" for order_id in order_ids])+",trial_score\n")
+                trial_info = self.get_trial_info(trial)
+                for team in self.team_names:
+                    file.write(team+",")
+                    line = []
+                    for order_id in order_ids:
+                        try:
+                            line.append(str(trial_info.team_submissions[team].order_submissions[order_id].raw_score))
+                        except (KeyError, AttributeError):
+                            line.append("N/A")
+                        try:
+                            line.append(str(trial_info.team_submissions[team].order_submissions[order_id].completion_duration))
+                        except (KeyError, AttributeError):
+                            line.append("N/A")
+                    line.append(str(trial_info.trial_scores.get(team, "N/A")))
+                    file.write(",".join(line)+"\n")
+                file.write("\n\n")
@@ -0,0 +1,129 @@
+import os
+import json
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Optional
+
+from log_parser import file_fingerprint
+
+class FilterJob():
+    def __init__(self, team: str, trial: str, source: str, output: str, command: list[str]):
+        self.team = team
+        self.trial = trial
+        self.source = source
+        self.output = output
+        self.command = command
+        self.exit_code: Optional[int] = None
+        self.skipped = False
+
+    @property
+    def partial_output(self) -> str:
+        return self.output + ".partial"
+
+    @property
+    def source_stamp(self) -> str:
+        return self.output + ".source.json"
+
+    def get_source_stamp(self) -> Optional[dict]:
+        # The best run can switch to an older run folder, so the output records exactly what it was made from
+        fingerprint = file_fingerprint(self.source)
+        if fingerprint is None:
+            return None
+        return {"source": os.path.abspath(self.source), "mtime_ns": fingerprint[0], "size": fingerprint[1], "command": self.command}
+
+    def is_fresh(self) -> bool:
+
+        """Checks if the output of the job was made from the current source
+        state log, with the same command
+
+        Returns:
+            bool: True if the output exists and its source stamp matches the source and command
+        """
+
+        if not os.path.exists(self.output):
+            return False
+        try:
+            with open(self.source_stamp, "r") as file:
+                stamp = json.load(file)
+        except (IOError, ValueError):
+            return False
+        return stamp == self.get_source_stamp()
+
+    def run(self) -> int:
+
+        """Runs the filter command, writing to a partial file that is only
+        moved into place once the command succeeds
+
+        Returns:
+            int: exit code of the filter command
+        """
+
+        command = [self.partial_output if arg == self.output else arg for arg in self.command]
+        try:
+            self.exit_code = subprocess.run(command).returncode
+        except OSError as e:
+            print(f'Unable to run {command[0]}: {e}')
+            self.exit_code = 127
+
+        if self.exit_code == 0:
+            os.replace(self.partial_output, self.output)
+            stamp = self.get_source_stamp()
+            if stamp is not None:
+                with open(self.source_stamp, "w") as file:
+                    json.dump(stamp, file)
+        elif os.path.exists(self.partial_output):
+            os.remove(self.partial_output)
+
+        return self.exit_code
+
+def run_filter_jobs(jobs: list[FilterJob], max_workers: Optional[int] = None, force: bool = False) -> list[FilterJob]:
+
+    """Runs state log filtering jobs with a bounded number running at once.
+    Jobs whose output was made from the same source state log are skipped.
+
+    Args:
+        jobs (list[FilterJob]): jobs to run
+        max_workers (Optional[int]): maximum number of jobs running at once, defaults to the core count
+        force (bool): re-run jobs even if their output is up to date
+
+    Returns:
+        list[FilterJob]: the jobs, with their exit code or skipped flag set
+    """
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    pending = []
+    for job in jobs:
+        if not os.path.exists(job.source):
+            print(f'State log {job.source} does not exist, skipping {job.team}/{job.trial}')
+            job.exit_code = 1
+        elif not force and job.is_fresh():
+            job.skipped = True
+        else:
+            pending.append(job)
+
+    skipped = len([job for job in jobs if job.skipped])
+    print(f'Filtering {len(pending)} state log(s) with up to {max_workers} at once, {skipped} already up to date')
+
+    lock = threading.Lock()
+    completed = [0]
+
+    def run_job(job: FilterJob):
+        start = time()
+        exit_code = job.run()
+        with lock:
+            completed[0] += 1
+            status = "done" if exit_code == 0 else f"FAILED (exit code {exit_code})"
+            print(f'[{completed[0]}/{len(pending)}] {job.team}/{job.trial}: {status} in {time() - start:.1f}s')
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(run_job, pending))
+
+    failed = [job for job in jobs if not job.skipped and job.exit_code != 0]
+    if failed:
+        print(f'Unable to filter {len(failed)} state log(s): ' + ", ".join(f"{job.team}/{job.trial}" for job in failed))
+
+    return jobs
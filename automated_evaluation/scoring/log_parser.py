@@ -0,0 +1,155 @@
+import os
+from typing import Any, Callable, Optional
+
+from structs import (
+    OrderResult,
+    TrialLog
+)
+
+# Parsed results keyed on (path, mtime, size) so each file is only read once
+# per scoring session, however many helpers ask for it
+_parse_cache: dict[tuple[str, str, int, int], Any] = {}
+
+def file_fingerprint(path: str) -> Optional[tuple[int, int]]:
+
+    """Get the (mtime, size) fingerprint of a file
+
+    Args:
+        path (str): file path
+
+    Returns:
+        Optional[tuple[int, int]]: modification time in ns and size in bytes, None if the file does not exist
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _cached_parse(path: str, parser: Callable[[str], Any]) -> Any:
+    fingerprint = file_fingerprint(path)
+
+    if fingerprint is None:
+        print(f'Unable to open file: {path}')
+        return None
+
+    key = (os.path.abspath(path), parser.__name__, *fingerprint)
+    if key not in _parse_cache:
+        _parse_cache[key] = parser(path)
+
+    return _parse_cache[key]
+
+def parse_trial_log(trial_log: str) -> Optional[TrialLog]:
+
+    """Parses a trial log file in a single pass
+
+    Args:
+        trial_log (str): trial log file path
+
+    Returns:
+        Optional[TrialLog]: parsed trial log, None if the file cannot be read or does not contain a score summary
+    """
+
+    try:
+        with open(trial_log, "r") as file:
+            lines = file.readlines()
+    except IOError:
+        print(f'Unable to open file: {trial_log}')
+        return None
+
+    trial_duration = None
+    summary_start = None
+    summary_end = None
+    for i, line in enumerate(lines):
+        if i == 6:
+            try:
+                trial_duration = float(line.split(":")[-1])
+            except ValueError:
+                pass
+        if summary_start is None and "Order Summary" in line:
+            summary_start = i + 2
+        elif summary_start is not None and "Order Details" in line:
+            summary_end = i - 2
+            break
+
+    if trial_duration is None or summary_start is None or summary_end is None:
+        print(f'Unable to parse trial log: {trial_log}')
+        return None
+
+    # Each order in the summary is a block of 8 lines
+    summary = lines[summary_start:summary_end]
+    orders: list[OrderResult] = []
+    for i in range(len(summary)//8):
+        block = summary[i * 8:(i + 1) * 8]
+        order_id = block[0].split(":")[-1].strip()
+
+        try:
+            max_score = int(block[4].split(":")[-1])
+        except ValueError:
+            max_score = None
+
+        try:
+            raw_score = int(block[5].split(":")[-1])
+        except ValueError:
+            raw_score = None
+
+        try:
+            completion_duration = float(block[7].split(":")[-1])
+        except ValueError:
+            completion_duration = None
+
+        orders.append(OrderResult(order_id, raw_score, max_score, completion_duration))
+
+    return TrialLog(trial_duration, orders)
+
+def parse_sensor_cost(sensor_file: str) -> Optional[int]:
+
+    """Parses a sensor cost file
+
+    Args:
+        sensor_file (str): sensor cost file path
+
+    Returns:
+        Optional[int]: sensor cost, None if the file cannot be read
+    """
+
+    try:
+        with open(sensor_file) as file:
+            lines = file.readlines()
+    except IOError:
+        print(f'Unable to open file: {sensor_file}')
+        return None
+
+    try:
+        return int(lines[15].split("$")[-1])
+    except (ValueError, IndexError):
+        print(f'Unable to read cost from file')
+        return None
+
+def read_trial_log(trial_log: str) -> Optional[TrialLog]:
+
+    """Cached version of parse_trial_log
+
+    Args:
+        trial_log (str): trial log file path
+
+    Returns:
+        Optional[TrialLog]: parsed trial log without sensor cost
+    """
+
+    return _cached_parse(trial_log, parse_trial_log)
+
+def read_sensor_cost(sensor_file: str) -> Optional[int]:
+
+    """Cached version of parse_sensor_cost
+
+    Args:
+        sensor_file (str): sensor cost file path
+
+    Returns:
+        Optional[int]: sensor cost
+    """
+
+    return _cached_parse(sensor_file, parse_sensor_cost)
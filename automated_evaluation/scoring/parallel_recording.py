@@ -0,0 +1,264 @@
+import os
+import subprocess
+import threading
+from time import monotonic, sleep
+from typing import Callable, Optional
+
+import numpy as np
+
+from recording import (
+    FrameSource,
+    RecordingPipeline,
+    RecordingStats,
+    PlaybackDeadline,
+    get_playback_length,
+    mux_variable_rate
+)
+
+X11_SOCKET_FOLDER = "/tmp/.X11-unix"
+
+GAZEBO_MASTER_PORT = 11345
+
+class XvfbDisplay():
+    """Virtual X display running in an Xvfb process"""
+
+    def __init__(self, number: int, resolution: tuple[int, int] = (1920, 1080), timeout: float = 10.0):
+        self.number = number
+        self.resolution = resolution
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def name(self) -> str:
+        return f":{self.number}"
+
+    def start(self):
+        width, height = self.resolution
+        self._process = subprocess.Popen(["Xvfb", self.name, "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # Wait for the display socket so clients do not connect too early
+        socket = os.path.join(X11_SOCKET_FOLDER, f"X{self.number}")
+        start = monotonic()
+        while not os.path.exists(socket):
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Xvfb exited with code {self._process.returncode} on display {self.name}")
+            if monotonic() - start > self.timeout:
+                self.stop()
+                raise RuntimeError(f"Timed out waiting for Xvfb on display {self.name}")
+            sleep(0.1)
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            self._process.wait()
+
+    def __enter__(self) -> "XvfbDisplay":
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+class DisplayAllocator():
+    """Hands out X display numbers that are not used by any running X server"""
+
+    def __init__(self, first: int = 100):
+        self.first = first
+        self._used: set[int] = set()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        with self._lock:
+            number = self.first
+            while (number in self._used or os.path.exists(os.path.join(X11_SOCKET_FOLDER, f"X{number}"))
+                   or os.path.exists(f"/tmp/.X{number}-lock")):
+                number += 1
+            self._used.add(number)
+            return number
+
+    def release(self, number: int):
+        with self._lock:
+            self._used.discard(number)
+
+class X11GrabFrameSource(FrameSource):
+    """Captures an X display directly with ffmpeg's x11grab"""
+
+    def __init__(self, display: str, resolution: tuple[int, int] = (1920, 1080), fps: float = 30.0):
+        super().__init__(resolution)
+        width, height = resolution
+        self._frame_size = width * height * 3
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-f", "x11grab", "-video_size", f"{width}x{height}",
+             "-framerate", str(fps), "-i", display, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+            stdout=subprocess.PIPE, bufsize=self._frame_size)
+
+    def grab(self) -> np.ndarray:
+        data = self._process.stdout.read(self._frame_size)
+        if len(data) < self._frame_size:
+            raise EOFError("ffmpeg stopped capturing the display")
+        width, height = self.resolution
+        return np.frombuffer(data, dtype=np.uint8).reshape((height, width, 3))
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.terminate()
+            self._process.wait()
+
+class PlaybackBackend():
+    """Starts and stops the playback of a filtered state log on a display"""
+
+    def start_playback(self, team: str, trial: str, display: str, slot: int) -> subprocess.Popen:
+        raise NotImplementedError
+
+    def stop_playback(self, team: str, process: subprocess.Popen):
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+class DockerPlaybackBackend(PlaybackBackend):
+    """Plays back a state log in the team's container. The display socket is
+    shared with the container through the /tmp/.X11-unix mount and every
+    slot gets its own Gazebo master port, as the containers share the host
+    network.
+    """
+
+    def __init__(self):
+        import docker
+        self.client = docker.DockerClient()
+
+    def start_playback(self, team: str, trial: str, display: str, slot: int) -> subprocess.Popen:
+        container = self.client.containers.get(team)
+        container.restart()
+
+        state_log = os.path.join(os.getcwd(), "filtered_state_logs", team, trial, "state.log")
+        subprocess.run(["docker", "cp", state_log, f"{team}:/home/state.log"], check=True)
+
+        return subprocess.Popen(["docker", "exec", "-e", f"DISPLAY={display}",
+                                 "-e", f"GAZEBO_MASTER_URI=http://localhost:{GAZEBO_MASTER_PORT + slot}",
+                                 team, "bash", "-c", ". /container_scripts/unpaused_playback.sh"])
+
+    def stop_playback(self, team: str, process: subprocess.Popen):
+        super().stop_playback(team, process)
+        self.client.containers.get(team).stop()
+
+class LocalPlaybackBackend(PlaybackBackend):
+    """Runs a local command in place of a container, so the scheduler can be
+    tested without Docker or Gazebo"""
+
+    def __init__(self, command_factory: Callable[[str, str, str], list[str]]):
+        self.command_factory = command_factory
+
+    def start_playback(self, team: str, trial: str, display: str, slot: int) -> subprocess.Popen:
+        env = dict(os.environ, DISPLAY=display)
+        return subprocess.Popen(self.command_factory(team, trial, display), env=env)
+
+class RecordingJob():
+    def __init__(self, team: str, trial: str, state_log: str, output: str):
+        self.team = team
+        self.trial = trial
+        self.state_log = state_log
+        self.output = output
+        self.stats: Optional[RecordingStats] = None
+        self.error: Optional[str] = None
+
+def record_in_parallel(jobs: list[RecordingJob], backend: PlaybackBackend, max_parallel: int = 2,
+                       resolution: tuple[int, int] = (1920, 1080), fps: float = 30.0, startup_timeout: float = 60.0,
+                       frame_source_factory: Callable[[str, tuple[int, int], float], FrameSource] = X11GrabFrameSource,
+                       output_resolution: Optional[tuple[int, int]] = None, dedupe: bool = False,
+                       display_factory: Callable[[int, tuple[int, int]], XvfbDisplay] = XvfbDisplay) -> list[RecordingJob]:
+
+    """Records playbacks on their own virtual displays, up to max_parallel at
+    once. Playbacks of the same team never overlap as they share a container.
+
+    Args:
+        jobs (list[RecordingJob]): playbacks to record
+        backend (PlaybackBackend): starts and stops each playback
+        max_parallel (int): maximum number of recordings at once
+        resolution (tuple[int, int]): resolution of the virtual displays and videos
+        fps (float): frame rate of the videos
+        startup_timeout (float): longest time to wait for a playback to be seen starting
+        frame_source_factory (Callable): creates the frame source for a display name
+        output_resolution (Optional[tuple[int, int]]): resolution of the videos, defaults to the display resolution
+        dedupe (bool): skip unchanged frames and mux the videos with their timecodes
+        display_factory (Callable): creates the virtual display for a display number and resolution
+
+    Returns:
+        list[RecordingJob]: the jobs, with their recording statistics or error set
+    """
+
+    max_parallel = max(1, max_parallel)
+    displays = DisplayAllocator()
+    pending = list(jobs)
+    busy_teams: set[str] = set()
+    free_slots = list(range(max_parallel))
+    condition = threading.Condition()
+
+    def next_job() -> Optional[tuple[RecordingJob, int]]:
+        # Take the first job whose team container is not already playing back
+        with condition:
+            while True:
+                if not pending:
+                    return None
+                for i, job in enumerate(pending):
+                    if job.team not in busy_teams:
+                        busy_teams.add(job.team)
+                        return pending.pop(i), free_slots.pop()
+                condition.wait()
+
+    def finish_job(job: RecordingJob, slot: int):
+        with condition:
+            busy_teams.discard(job.team)
+            free_slots.append(slot)
+            condition.notify_all()
+
+    def record(job: RecordingJob, slot: int):
+        number = displays.acquire()
+        try:
+            with display_factory(number, resolution) as display:
+                deadline = PlaybackDeadline(get_playback_length(job.state_log), startup_timeout)
+                if deadline.playback_time is None:
+                    raise RuntimeError(f"Unable to find the length of {job.state_log}")
+
+                print(f"Recording {job.team}/{job.trial} on display {display.name} for {deadline.playback_time:.1f}s after playback starts")
+                process = backend.start_playback(job.team, job.trial, display.name, slot)
+                try:
+                    source = frame_source_factory(display.name, resolution, fps)
+                    pipeline = RecordingPipeline(source, job.output, fps, stop_condition=deadline,
+                                                 resolution=output_resolution, dedupe=dedupe)
+                    job.stats = pipeline.record()
+                finally:
+                    backend.stop_playback(job.team, process)
+            if dedupe:
+                mux_variable_rate(job.output)
+            print(f"Recorded {job.team}/{job.trial}: {job.stats}")
+        except Exception as e:
+            job.error = str(e)
+            print(f"Unable to record {job.team}/{job.trial}: {e}")
+        finally:
+            displays.release(number)
+
+    def worker():
+        while True:
+            item = next_job()
+            if item is None:
+                return
+            job, slot = item
+            try:
+                record(job, slot)
+            finally:
+                finish_job(job, slot)
+
+    start = monotonic()
+    workers = [threading.Thread(target=worker) for _ in range(max(1, min(max_parallel, len(jobs))))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    failed = [job for job in jobs if job.error is not None]
+    print(f"Recorded {len(jobs) - len(failed)} of {len(jobs)} playbacks in {monotonic() - start:.1f}s")
+    return jobs
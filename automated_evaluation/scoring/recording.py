@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+
+import os
+import queue
+import shutil
+import hashlib
+import argparse
+import threading
+import subprocess
+from time import monotonic, sleep
+from typing import Callable, Optional
+
+import numpy as np
+import cv2
+
+from state_log import get_sim_time_span
+
+# Pause button of the Gazebo toolbar in a 1920x1080 capture, as (rows, columns)
+PAUSE_BUTTON_REGION = (slice(960, 1010), slice(530, 580))
+
+class FrameSource():
+    """Source of RGB frames for a recording"""
+
+    def __init__(self, resolution: tuple[int, int]):
+        self.resolution = resolution
+
+    def grab(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class ScreenFrameSource(FrameSource):
+    """Captures the screen with pyautogui"""
+
+    def __init__(self, resolution: tuple[int, int] = (1920, 1080)):
+        super().__init__(resolution)
+        # Imported here as pyautogui needs a display as soon as it is imported
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def grab(self) -> np.ndarray:
+        return np.array(self._pyautogui.screenshot())
+
+class SyntheticFrameSource(FrameSource):
+    """Generates frames without a display, to benchmark the pipeline"""
+
+    def __init__(self, resolution: tuple[int, int] = (1920, 1080), capture_time: float = 0.0, change_every: int = 1,
+                 window_delay: Optional[float] = None):
+        super().__init__(resolution)
+        self.capture_time = capture_time
+        self.change_every = change_every
+        self.window_delay = window_delay
+        self.count = 0
+        self._frame = np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+        self._first_grab: Optional[float] = None
+
+    def grab(self) -> np.ndarray:
+        if self.capture_time > 0:
+            sleep(self.capture_time)
+        if self._first_grab is None:
+            self._first_grab = monotonic()
+        self.count += 1
+        frame = self._frame.copy()
+        # The Gazebo window, with its pause button, shows up window_delay seconds after the first frame
+        if self.window_delay is not None and monotonic() - self._first_grab >= self.window_delay:
+            frame[PAUSE_BUTTON_REGION] = 200
+        # The content only changes every change_every frames, like a mostly static playback
+        cv2.putText(frame, str(self.count // self.change_every), (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        return frame
+
+class RecordingStats():
+    def __init__(self):
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.held = 0
+        self.hold_time = 0.0
+        self.duration = 0.0
+
+    def __str__(self) -> str:
+        capture_fps = self.captured / self.duration if self.duration > 0 else 0.0
+        summary = (f"{self.duration:.1f}s recorded, {self.captured} frames captured ({capture_fps:.1f} fps), "
+                   f"{self.written} written, {self.duplicated} duplicated, {self.dropped} dropped")
+        if self.held > 0:
+            summary += f", {self.held} unchanged frames held for {self.hold_time:.1f}s"
+        return summary
+
+class PauseChangeDetector():
+    """Stop condition that ends a recording when the pause button region of
+    the Gazebo window changes between two frames, after a warm-up period"""
+
+    def __init__(self, warmup: float = 25.0, region: tuple[slice, slice] = PAUSE_BUTTON_REGION):
+        self.warmup = warmup
+        self.region = region
+        self._previous: Optional[np.ndarray] = None
+
+    def __call__(self, frame: np.ndarray, elapsed: float) -> bool:
+        if elapsed < self.warmup:
+            return False
+
+        pause_frame = frame[self.region]
+        changed = self._previous is not None and not (self._previous == pause_frame).all()
+        self._previous = pause_frame.copy()
+        return changed
+
+class PlaybackStartDetector():
+    """Detects the start of an unpaused playback: the first frame in which
+    the pause button region differs from the first frame captured, before
+    the Gazebo window was shown"""
+
+    def __init__(self, region: tuple[slice, slice] = PAUSE_BUTTON_REGION):
+        self.region = region
+        self._initial: Optional[np.ndarray] = None
+
+    def __call__(self, frame: np.ndarray, elapsed: float) -> bool:
+        pause_frame = frame[self.region]
+        if self._initial is None:
+            self._initial = pause_frame.copy()
+            return False
+        return not (self._initial == pause_frame).all()
+
+class PlaybackDeadline():
+    """Stop condition that ends a recording once the playback of a state log
+    is expected to be over: the sim time span of the log, scaled by the
+    playback real time factor, counted from the frame the playback is seen
+    to start in. If no start is seen within startup_timeout, it is counted
+    from there. The pixel based detector is only used when the length of
+    the log is unknown.
+    """
+
+    def __init__(self, playback_length: Optional[float], startup_timeout: float = 60.0, real_time_factor: float = 1.0,
+                 margin: float = 2.0, fallback: Optional[Callable[[np.ndarray, float], bool]] = None,
+                 start_detector: Optional[Callable[[np.ndarray, float], bool]] = None):
+        self.playback_length = playback_length
+        self.startup_timeout = startup_timeout
+        self.real_time_factor = real_time_factor
+        self.margin = margin
+        self.fallback = fallback if fallback is not None else PauseChangeDetector()
+        self.start_detector = start_detector if start_detector is not None else PlaybackStartDetector()
+        self.started_at: Optional[float] = None
+
+    @property
+    def playback_time(self) -> Optional[float]:
+        if self.playback_length is None:
+            return None
+        return self.playback_length / self.real_time_factor + self.margin
+
+    @property
+    def deadline(self) -> Optional[float]:
+        if self.playback_time is None or self.started_at is None:
+            return None
+        return self.started_at + self.playback_time
+
+    def __call__(self, frame: np.ndarray, elapsed: float) -> bool:
+        if self.playback_time is None:
+            return self.fallback(frame, elapsed)
+
+        if self.started_at is None:
+            if self.start_detector(frame, elapsed):
+                self.started_at = elapsed
+            elif elapsed >= self.startup_timeout:
+                print(f'Playback not seen to start within {self.startup_timeout:.0f}s, counting from now')
+                self.started_at = elapsed
+            else:
+                return False
+
+        return elapsed >= self.deadline
+
+def get_playback_length(state_log: str) -> Optional[float]:
+
+    """Get the length of the playback of a state log from its sim time span
+
+    Args:
+        state_log (str): path of the raw or seekable state log
+
+    Returns:
+        Optional[float]: sim time covered by the log in seconds, None if it cannot be read
+    """
+
+    try:
+        span = get_sim_time_span(state_log)
+    except (IOError, ValueError) as e:
+        print(f'Unable to read sim time span of {state_log}: {e}')
+        return None
+
+    if span is None:
+        return None
+    return span[1] - span[0]
+
+def create_video_writer(filename: str, fps: float, resolution: tuple[int, int]) -> cv2.VideoWriter:
+    return cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*"XVID"), fps, resolution)
+
+def frame_hash(frame: np.ndarray, size: tuple[int, int] = (64, 36)) -> bytes:
+
+    """Hashes a downscaled copy of a frame, so identical screens are found
+    without comparing every pixel of the full frame
+
+    Args:
+        frame (np.ndarray): captured frame
+        size (tuple[int, int]): width and height the frame is downscaled to before hashing
+
+    Returns:
+        bytes: digest of the downscaled frame
+    """
+
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return hashlib.blake2b(small.tobytes(), digest_size=16).digest()
+
+def get_timecodes_path(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".timecodes.txt"
+
+def write_timecodes(filename: str, timestamps: list[float]):
+
+    """Writes frame timestamps in the mkvmerge timecode format v2
+
+    Args:
+        filename (str): timecodes file to write
+        timestamps (list[float]): presentation time of every written frame in seconds
+    """
+
+    with open(filename, "w") as file:
+        file.write("# timecode format v2\n")
+        for timestamp in timestamps:
+            file.write(f"{timestamp * 1000:.3f}\n")
+
+def mux_variable_rate(filename: str, output: Optional[str] = None) -> Optional[str]:
+
+    """Muxes a deduplicated recording with its timecodes into a variable frame
+    rate mkv, so held frames play back for their full duration
+
+    Args:
+        filename (str): video written by a deduplicating pipeline
+        output (Optional[str]): mkv file to write, defaults to the video name with a .mkv extension
+
+    Returns:
+        Optional[str]: path of the mkv, None if mkvmerge is not installed or failed
+    """
+
+    if shutil.which("mkvmerge") is None:
+        print(f"mkvmerge is not installed, keeping {filename} with its timecodes file")
+        return None
+
+    timecodes = get_timecodes_path(filename)
+    output = output if output is not None else os.path.splitext(filename)[0] + ".mkv"
+    result = subprocess.run(["mkvmerge", "-q", "-o", output, "--timestamps", f"0:{timecodes}", filename])
+    if result.returncode != 0:
+        print(f"Unable to mux {filename} with its timecodes (exit code {result.returncode})")
+        return None
+
+    os.remove(filename)
+    os.remove(timecodes)
+    return output
+
+class RecordingPipeline():
+    """Screen recording split into a capture stage and an encode stage
+    connected by a bounded queue.
+
+    Each captured frame carries the wall time it was taken at. The encoder
+    places every frame at the output slot matching its timestamp, repeating
+    the previous frame to fill gaps and dropping frames captured faster than
+    the output frame rate, so the video plays back at wall time speed.
+
+    With dedupe set, frames whose downscaled hash matches the last written
+    frame are not written at all. The timestamp of every written frame goes
+    to a timecodes file next to the video instead, so each frame is held
+    until the screen changes once muxed with mux_variable_rate.
+    """
+
+    def __init__(self, source: FrameSource, filename: str, fps: float = 60.0, queue_size: int = 120,
+                 writer_factory: Callable[[str, float, tuple[int, int]], cv2.VideoWriter] = create_video_writer,
+                 stop_condition: Optional[Callable[[np.ndarray, float], bool]] = None,
+                 resolution: Optional[tuple[int, int]] = None, dedupe: bool = False):
+        self.source = source
+        self.filename = filename
+        self.fps = fps
+        self.writer_factory = writer_factory
+        self.stop_condition = stop_condition
+        self.resolution = resolution if resolution is not None else source.resolution
+        self.dedupe = dedupe
+
+        self.stats = RecordingStats()
+
+        self._frames: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture, daemon=True)
+        self._encode_thread = threading.Thread(target=self._encode, daemon=True)
+        self._start_time = 0.0
+        self._stop_time: Optional[float] = None
+
+    def start(self):
+        self._start_time = monotonic()
+        self._encode_thread.start()
+        self._capture_thread.start()
+
+    def stop(self) -> RecordingStats:
+
+        """Stops capturing, waits for every queued frame to be encoded and closes the video
+
+        Returns:
+            RecordingStats: statistics of the recording
+        """
+
+        self._stop.set()
+        self._capture_thread.join()
+        self._encode_thread.join()
+        self.source.close()
+        return self.stats
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+
+        """Waits until the stop condition ends the recording
+
+        Args:
+            timeout (Optional[float]): maximum time to wait in seconds
+
+        Returns:
+            bool: True if the recording has stopped
+        """
+
+        return self._stop.wait(timeout)
+
+    def record(self, duration: Optional[float] = None) -> RecordingStats:
+
+        """Records until the stop condition is met or the duration has passed
+
+        Args:
+            duration (Optional[float]): maximum length of the recording in seconds
+
+        Returns:
+            RecordingStats: statistics of the recording
+        """
+
+        self.start()
+        self.wait(duration)
+        return self.stop()
+
+    def _capture(self):
+        try:
+            while not self._stop.is_set():
+                frame = self.source.grab()
+                timestamp = monotonic()
+
+                if self.stop_condition is not None and self.stop_condition(frame, timestamp - self._start_time):
+                    self._stop.set()
+
+                while True:
+                    try:
+                        self._frames.put((timestamp, frame), timeout=0.5)
+                        break
+                    except queue.Full:
+                        if not self._encode_thread.is_alive():
+                            return
+        finally:
+            self._stop_time = monotonic()
+            self._stop.set()
+            while self._encode_thread.is_alive():
+                try:
+                    self._frames.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    pass
+
+    def _encode(self):
+        writer = self.writer_factory(self.filename, self.fps, self.resolution)
+        previous: Optional[np.ndarray] = None
+        previous_hash: Optional[bytes] = None
+        timestamps: list[float] = []
+        last_slot = -1
+        written = 0
+
+        try:
+            while True:
+                item = self._frames.get()
+                if item is None:
+                    break
+
+                timestamp, frame = item
+                self.stats.captured += 1
+
+                slot = int((timestamp - self._start_time) * self.fps)
+
+                if self.dedupe:
+                    key = frame_hash(frame)
+                    if key == previous_hash:
+                        self.stats.held += 1
+                        continue
+                    # Only one frame per output slot, like the constant rate path
+                    if slot <= last_slot:
+                        self.stats.dropped += 1
+                        continue
+                    previous_hash = key
+
+                frame = self._convert(frame)
+
+                if self.dedupe:
+                    if last_slot >= 0:
+                        self.stats.hold_time += (slot - last_slot - 1) / self.fps
+                    writer.write(frame)
+                    timestamps.append(slot / self.fps)
+                    last_slot = slot
+                    written += 1
+                    previous = frame
+                    continue
+
+                while previous is not None and written < slot:
+                    writer.write(previous)
+                    written += 1
+                    self.stats.duplicated += 1
+
+                if written <= slot:
+                    writer.write(frame)
+                    written += 1
+                else:
+                    self.stats.dropped += 1
+
+                previous = frame
+
+            # Hold the last frame until the recording was stopped
+            end_slot = int(((self._stop_time or monotonic()) - self._start_time) * self.fps)
+            if self.dedupe:
+                if previous is not None and end_slot > last_slot:
+                    self.stats.hold_time += (end_slot - last_slot - 1) / self.fps
+                    writer.write(previous)
+                    timestamps.append(end_slot / self.fps)
+                    written += 1
+                    self.stats.duplicated += 1
+            else:
+                while previous is not None and written < end_slot:
+                    writer.write(previous)
+                    written += 1
+                    self.stats.duplicated += 1
+        finally:
+            writer.release()
+            if self.dedupe:
+                write_timecodes(get_timecodes_path(self.filename), timestamps)
+            self.stats.written = written
+            self.stats.duration = (self._stop_time or monotonic()) - self._start_time
+
+    def _convert(self, frame: np.ndarray) -> np.ndarray:
+        # pyautogui gives RGB frames, the video writer expects BGR
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        if (frame.shape[1], frame.shape[0]) != self.resolution:
+            frame = cv2.resize(frame, self.resolution, interpolation=cv2.INTER_AREA)
+        return frame
+
+def benchmark_pipeline(seconds: float, resolution: tuple[int, int] = (1920, 1080), fps: float = 60.0,
+                       capture_time: float = 0.0, filename: str = "benchmark.avi", change_every: int = 1,
+                       output_resolution: Optional[tuple[int, int]] = None, dedupe: bool = False) -> RecordingStats:
+
+    """Records a synthetic source for a fixed time to measure the pipeline throughput
+
+    Args:
+        seconds (float): length of the recording
+        resolution (tuple[int, int]): frame resolution
+        fps (float): output frame rate
+        capture_time (float): simulated time taken to capture each frame
+        filename (str): output video file
+        change_every (int): number of captured frames between changes of the synthetic content
+        output_resolution (Optional[tuple[int, int]]): resolution of the video, defaults to the frame resolution
+        dedupe (bool): skip unchanged frames and write a timecodes file
+
+    Returns:
+        RecordingStats: statistics of the recording
+    """
+
+    source = SyntheticFrameSource(resolution, capture_time, change_every)
+    return RecordingPipeline(source, filename, fps, resolution=output_resolution, dedupe=dedupe).record(seconds)
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return (int(width), int(height))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the recording pipeline with a synthetic frame source")
+
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="Length of the recording in seconds")
+    parser.add_argument("-f", "--fps", type=float, default=60.0)
+    parser.add_argument("-c", "--capture-time", type=float, default=0.0, help="Simulated time to capture a frame in seconds")
+    parser.add_argument("-o", "--output", default="benchmark.avi")
+    parser.add_argument("-r", "--resolution", type=parse_resolution, default=None, help="Output resolution, e.g. 1280x720")
+    parser.add_argument("--change-every", type=int, default=1, help="Captured frames between changes of the synthetic content")
+    parser.add_argument("--dedupe", action="store_true", help="Skip unchanged frames and write a timecodes file")
+
+    args = parser.parse_args()
+
+    print(benchmark_pipeline(args.duration, fps=args.fps, capture_time=args.capture_time, filename=args.output,
+                             change_every=args.change_every, output_resolution=args.resolution, dedupe=args.dedupe))
@@ -3,7 +3,32 @@ from score_trial import (
     get_team_names,
     get_order_information
 )
+from log_parser import read_trial_log
+from competition_scorer import CompetitionScorer
+from filter_jobs import (
+    FilterJob,
+    run_filter_jobs
+)
+from recording import (
+    RecordingPipeline,
+    ScreenFrameSource,
+    PlaybackDeadline,
+    get_playback_length,
+    mux_variable_rate,
+    parse_resolution
+)
+from parallel_recording import (
+    RecordingJob,
+    DockerPlaybackBackend,
+    record_in_parallel
+)
+from seekable_log import (
+    SEEKABLE_SUFFIX,
+    find_state_log
+)
 import os
+import sys
+import argparse
 import matplotlib.pyplot as plt
 import numpy as np
 import subprocess
@@ -34,44 +59,30 @@ def get_trial_names(team_names: list[str]) -> list[str]:
                 trial_names.append("_".join(os.path.basename(file).split("_")[:-1]))
     return sorted(list(set(trial_names)))
 
-def get_total_scores(team_names: list[str],trial_names: list[str]) -> dict[str,float]:
+def get_total_scores(team_names: list[str],trial_names: list[str], scorer: Optional[CompetitionScorer] = None) -> dict[str,float]:
     """Scores all of the trials and finds the final scores for each team
 
     Returns:
         dict[str,float]: dictionary where the keys are the team names and the values are their scores
     """
-    final_scores_by_team = {team : 0 for team in team_names}
-    for trial in trial_names:
-        trial_info = score_trial(trial)
-        for team in team_names:
-            final_scores_by_team[team] += trial_info.trial_scores[team]
-    return {k: v for k, v in sorted(final_scores_by_team.items(), key=lambda item: -item[1])}
+    if scorer is None:
+        scorer = CompetitionScorer(team_names, trial_names)
+    return scorer.get_total_scores()
 
-def get_trial_scores_by_team(team_names: list[str],trial_names: list[str]) -> dict[str,list[float]]:
+def get_trial_scores_by_team(team_names: list[str],trial_names: list[str], scorer: Optional[CompetitionScorer] = None) -> dict[str,list[float]]:
     """Gets the individual trial scores for each team and saves them into a list inside of a dictionary
 
     Returns:
         dict[str,float]: dictionary where the keys are the team names and the values are lists of the teams trial scores
     """
-    all_trial_scores = {team: [] for team in team_names}
-    for trial in trial_names:
-        trial_info = score_trial(trial)
-        for team in team_names:
-            all_trial_scores[team].append(trial_info.trial_scores[team])
-    return all_trial_scores
+    if scorer is None:
+        scorer = CompetitionScorer(team_names, trial_names)
+    return scorer.get_trial_scores_by_team()
 
-def total_raw_scores_by_team(team_names, trial_names):
-    total_raw_scores = {team: 0 for team in team_names}
-    for trial in trial_names:
-        trial_info = score_trial(trial)
-        for team in team_names:
-            order_ids = [order.order_id for order in get_order_information(trial)]
-            for order_id in order_ids:
-                try:
-                    total_raw_scores[team] += trial_info.team_submissions[team].order_submissions[order_id].raw_score
-                except:
-                    pass
-    return total_raw_scores
+def total_raw_scores_by_team(team_names, trial_names, scorer: Optional[CompetitionScorer] = None):
+    if scorer is None:
+        scorer = CompetitionScorer(team_names, trial_names)
+    return scorer.get_total_raw_scores_by_team()
 
 def get_max_scores_for_trial(team_names, trial):
     order_ids = [order.order_id for order in get_order_information(trial)]
@@ -81,21 +92,13 @@ def get_max_scores_for_trial(team_names, trial):
         trial_log = os.path.join(automated_eval_folder,"logs",team_name,f"{trial}_1","trial_log.txt")
         if os.path.exists(trial_log):
             break
-    try:
-        with open(trial_log, "r") as file:
-            lines = file.readlines()
-    except IOError:
-        print(f'Unable to open file: {trial_log}')
+    log = read_trial_log(trial_log)
+    
+    if log is None:
         return None
-
-    # Get only order summary section of trial log
-    start = [("Order Summary" in line) for line in lines].index(True) + 2
-    end = [("Order Details" in line) for line in lines].index(True) - 2
-    summary = lines[start:end]
     
-    # Calculate the combined raw score for all orders
-    for i in range(len(summary)//8):
-        trial_max_scores[order_ids[i]] =  int(summary[(i * 8) + 4].split(":")[-1]) 
+    for i, order in enumerate(log.orders):
+        trial_max_scores[order_ids[i]] = order.max_score
         
     return trial_max_scores
 
@@ -104,8 +107,10 @@ def addlabels(x,y):
         plt.text(i, y[i], y[i], ha = 'center')
         
 
-def filter_best_trial_logs(team_names, trial_names):
-    commands = []
+def filter_best_trial_logs(team_names, trial_names, scorer: Optional[CompetitionScorer] = None, max_workers: Optional[int] = None, use_gz: bool = False):
+    if scorer is None:
+        scorer = CompetitionScorer(team_names, trial_names)
+    jobs = []
     if not os.path.exists("filtered_state_logs"):
         os.mkdir("filtered_state_logs")
     for team in team_names:
@@ -114,14 +119,18 @@ def filter_best_trial_logs(team_names, trial_names):
         for trial in trial_names:
             if not os.path.exists(os.path.join("filtered_state_logs", team, trial)):
                 os.mkdir(os.path.join("filtered_state_logs", team, trial))
-    for trial in trial_names:
-        trial_info = score_trial(trial)
+    for trial, best_logs in scorer.get_best_trial_logs().items():
         for team in team_names:
-            commands.append(["./filter_state_log.sh", os.path.join(f"{trial_info.team_best_file_logs[team]}","state.log"), os.path.join(os.getcwd(),"filtered_state_logs", team, trial,"state.log")])
-    subprocesses = [subprocess.Popen(command) for command in commands] # Runs each of the filtering commands in parallel
-    print("Filtering state.log" + ("" if len(commands)<=1 else "s") + "...")
-    end_codes = [s.wait() for s in subprocesses] # Waits until all of the best state logs are filtered
-    print(f"Saved state logs" + ("" if len(commands)<=1 else "s")+"\n\nTo find filtered state.logs, go to /filtered_state_logs/team/trial")
+            source = find_state_log(f"{best_logs[team]}") or os.path.join(f"{best_logs[team]}","state.log")
+            output = os.path.join(os.getcwd(),"filtered_state_logs", team, trial,"state.log")
+            if use_gz and not source.endswith(SEEKABLE_SUFFIX):
+                command = ["./filter_state_log.sh", source, output]
+            else:
+                # Native streaming filter, equivalent to gz log -e -z 100 --filter *.pose/*.pose
+                command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "state_log.py"), source, output, "-z", "100"]
+            jobs.append(FilterJob(team, trial, source, output, command))
+    run_filter_jobs(jobs, max_workers) # Runs the filtering commands in parallel, at most max_workers at once
+    print(f"Saved state log" + ("" if len(jobs)<=1 else "s")+"\n\nTo find filtered state.logs, go to /filtered_state_logs/team/trial")
 
 def screen_record(team, trial, recorder, l):
     print("In recorder process")
@@ -173,7 +182,8 @@ def detect_pause_change(l, sleep_time):
         
         
 
-def record_each_trial_log(team_names, trial_names):
+def record_each_trial_log(team_names, trial_names, fps: float = 60.0, resolution: Optional[tuple[int, int]] = None, dedupe: bool = False,
+                          startup_timeout: float = 60.0):
     # recorder = pyscreenrec.ScreenRecorder()
     docker_client = docker.DockerClient()
     all_containers: list[DockerContainer] = docker_client.containers.list(all=True)
@@ -196,109 +206,96 @@ def record_each_trial_log(team_names, trial_names):
             path = Path(os.path.join("recordings", team, trial))
             path.mkdir(parents=True, exist_ok=True)
     
+    frame_source = ScreenFrameSource((1920, 1080))
+    
     for trial in trial_names:
         for team, container in team_containers.items():
             if os.path.exists(os.path.join("filtered_state_logs", team, trial)):
                 container.restart()
                 
-                # Specify resolution
-                resolution = (1920, 1080)
-                
-                # Specify video codec
-                codec = cv2.VideoWriter_fourcc(*"XVID")
-                
                 # Specify name of Output file
                 filename = f"{team}_{trial}.avi"
                 
-                # Specify frames rate. We can choose 
-                # any value and experiment with it
-                fps = 60.0
-                
-                # Creating a VideoWriter object
-                out = cv2.VideoWriter(filename, codec, fps, resolution)
-
-                # screen_record_process = Process(target=screen_record, args=(team, trial, recorder, lock))
-                # detect_pause_change_process = Process(target=detect_pause_change, args=(lock, 25))
-                # screen_record_process.start()
-                # detect_pause_change_process.start()
-                # screen_record_process.join()
-                # recorder.start_recording(f"{team}_{trial}.mp4", 20)
-                # subprocess.Popen(["./scoring_playback.sh", team, trial])
-                # # Create an Empty window
+                # Stop once the playback of the filtered log should be over
+                playback_length = get_playback_length(os.path.join("filtered_state_logs", team, trial, "state.log"))
+                deadline = PlaybackDeadline(playback_length, startup_timeout)
+                if deadline.playback_time is None:
+                    print(f"Unable to find the length of {team}/{trial}, detecting the end of playback from the screen")
+                else:
+                    print(f"Recording {team}/{trial} for {deadline.playback_time:.1f}s after playback starts")
                 
-                # sleep(25)
-                keep_recording = True
-                first = True
+                # Capture and encode on separate threads so the video matches wall time
+                pipeline = RecordingPipeline(frame_source, filename, fps=fps, stop_condition=deadline,
+                                             resolution=resolution, dedupe=dedupe)
                 
                 subprocess.Popen(["./scoring_playback.sh", team, trial])
                 
-                start_time = time()
-                while keep_recording:
-                    # Take screenshot using PyAutoGUI
-                    img = pyautogui.screenshot()
-                
-                    # Convert the screenshot to a numpy array
-                    frame = np.array(img)
-                    
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    
-                    pause_frame = frame[960:1010, 530:580]
-                    
-                    if time() - start_time >= 25:
-                        if not first:
-                            comparison = prev == pause_frame
-                            
-                            keep_recording = comparison.all()
-                        else:
-                            print("first")
-                            first = False
-                        prev = pause_frame
-                    
-                    out.write(frame)
-                    # # Optional: Display the recording screen
-                    # cv2.imshow('Live', frame)
-                    
-                    # if cv2.waitKey(1) == ord('q'):
-                    #     break
-                # recorder.stop_recording()
+                pipeline.start()
+                pipeline.wait()
+                print(f"Recorded {team}/{trial}: {pipeline.stop()}")
+                if dedupe:
+                    muxed = mux_variable_rate(filename)
+                    if muxed is not None:
+                        os.system(f"mv {muxed} {os.path.join('recordings', team, trial, muxed)}")
+                        continue
+                    os.system(f"mv {team}_{trial}.timecodes.txt {os.path.join('recordings', team, trial, f'{team}_{trial}.timecodes.txt')}")
                 os.system(f"mv {team}_{trial}.avi {os.path.join('recordings', team, trial, f'{team}_{trial}.avi')}")
     for container in team_containers.values():
         print("Stopping container",container.name)
         container.stop()
     print("Done recording trials")
+
+def record_trial_logs_headless(team_names, trial_names, max_parallel: int = 2, fps: float = 30.0,
+                               resolution: Optional[tuple[int, int]] = None, dedupe: bool = False, startup_timeout: float = 60.0):
+
+    """Records the playback of every filtered state log on its own virtual
+    display, with up to max_parallel teams playing back at once
+
+    Args:
+        team_names (list[str]): teams to record
+        trial_names (list[str]): trials to record
+        max_parallel (int): maximum number of recordings at once
+        fps (float): frame rate of the videos
+        resolution (Optional[tuple[int, int]]): resolution of the videos, defaults to 1920x1080
+        dedupe (bool): skip unchanged frames and record how long each frame is held
+        startup_timeout (float): longest time to wait for a playback to be seen starting
+    """
+
+    jobs: list[RecordingJob] = []
+    for trial in trial_names:
+        for team in team_names:
+            state_log = os.path.join("filtered_state_logs", team, trial, "state.log")
+            if not os.path.exists(state_log):
+                continue
+            path = Path(os.path.join("recordings", team, trial))
+            path.mkdir(parents=True, exist_ok=True)
+            jobs.append(RecordingJob(team, trial, state_log, os.path.join(path, f"{team}_{trial}.avi")))
+
+    record_in_parallel(jobs, DockerPlaybackBackend(), max_parallel, fps=fps, startup_timeout=startup_timeout,
+                       output_resolution=resolution, dedupe=dedupe)
+    print("Done recording trials")
                 
                 
 
 def main():
+    parser = argparse.ArgumentParser(description="Score all trials for all competitors and record the best runs")
+    
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Number of processes used to score trials in parallel")
+    parser.add_argument("--headless", type=int, default=0, metavar="N",
+                        help="Record on virtual displays with up to N playbacks at once instead of on the current display")
+    parser.add_argument("--fps", type=float, default=None, help="Frame rate of the recordings, 60 on the current display and 30 headless by default")
+    parser.add_argument("--resolution", type=parse_resolution, default=None, help="Resolution of the recordings, e.g. 1280x720")
+    parser.add_argument("--startup-timeout", type=float, default=60.0,
+                        help="Longest time to wait for a playback to be seen starting before counting its length")
+    parser.add_argument("--dedupe", action="store_true", help="Skip unchanged frames and play the recordings back at a variable frame rate")
+    
+    args = parser.parse_args()
+    
     team_names = get_team_names()
     trial_names = get_trial_names(team_names)
-    final_scores = get_total_scores(team_names, trial_names)
-    with open("ARIAC_results.csv", "w") as file:
-        file.write("Leaderboard:\n\n")
-        for team,score in final_scores.items():
-            file.write(f"{team},{score}\n")
-
-        file.write("\n\n\nScore Breakdown:\n\n")
-        for trial in trial_names:
-            file.write(f"{trial}:\n")
-            order_ids = [order.order_id for order in get_order_information(trial)]
-            file.write("Team,"+",".join([f"Order {order_ids.index(order_id)}({order_id}) Score,Order {order_ids.index(order_id)}({order_id}) Duration" for order_id in order_ids])+",trial_score\n")
-            trial_info = score_trial(trial, create_graphs=True)
-            for team in team_names:
-                file.write(team+",")
-                line = []
-                for order_id in order_ids:
-                    try:
-                        line.append(str(trial_info.team_submissions[team].order_submissions[order_id].raw_score))
-                    except:
-                        line.append("N/A")
-                    try:
-                        line.append(str(trial_info.team_submissions[team].order_submissions[order_id].completion_duration))
-                    except:
-                        line.append("N/A")   
-                line.append(str(trial_info.trial_scores[team]))
-                file.write(",".join(line)+"\n")
-            file.write("\n\n")
+    scorer = CompetitionScorer(team_names, trial_names, workers=args.workers)
+    scorer.write_results("ARIAC_results.csv")
+    scorer.create_graphs()
      
     # # Visualizing results
     # if not os.path.exists("graphs"):
@@ -401,7 +398,11 @@ def main():
     #         plt.savefig(f"graphs/{team}/{trial}.png")
     #         plt.clf()
     # filter_best_trial_logs(team_names, trial_names)
-    record_each_trial_log(team_names, trial_names)
+    if args.headless > 0:
+        record_trial_logs_headless(team_names, trial_names, args.headless, args.fps or 30.0, args.resolution, args.dedupe,
+                                   args.startup_timeout)
+    else:
+        record_each_trial_log(team_names, trial_names, args.fps or 60.0, args.resolution, args.dedupe, args.startup_timeout)
     
     
 if __name__ == "__main__":
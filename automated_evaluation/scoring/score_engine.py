@@ -0,0 +1,153 @@
+from typing import Union
+
+import numpy as np
+
+from structs import (
+    OrderInfo,
+    TeamSubmission
+)
+
+Weights = Union[float, np.ndarray, list[float]]
+
+class TrialScoreMatrix():
+    """Array-backed scoring data for a single trial.
+
+    Holds teams x orders matrices of raw scores and completion durations,
+    the priority of each order and the sensor cost of each team. Orders a
+    team did not submit have a NaN duration.
+    """
+
+    def __init__(self, team_names: list[str], order_ids: list[str], raw_scores: np.ndarray,
+                 durations: np.ndarray, priorities: np.ndarray, sensor_costs: np.ndarray):
+        self.team_names = team_names
+        self.order_ids = order_ids
+        self.raw_scores = raw_scores
+        self.durations = durations
+        self.priorities = priorities
+        self.sensor_costs = sensor_costs
+
+    @classmethod
+    def from_submissions(cls, order_info: list[OrderInfo], submissions: dict[str, TeamSubmission]) -> "TrialScoreMatrix":
+
+        """Builds the score matrices from the team submissions of a trial
+
+        Args:
+            order_info (list[OrderInfo]): information about each order in the trial
+            submissions (dict[str, TeamSubmission]): submission of each team for the trial
+
+        Returns:
+            TrialScoreMatrix: score matrices for the trial
+        """
+
+        team_names = list(submissions.keys())
+        order_ids = [order.order_id for order in order_info]
+
+        raw_scores = np.zeros((len(team_names), len(order_ids)))
+        durations = np.full((len(team_names), len(order_ids)), np.nan)
+
+        for i, team in enumerate(team_names):
+            order_submissions = submissions[team].order_submissions
+            for j, order_id in enumerate(order_ids):
+                submission = order_submissions.get(order_id)
+                if submission is not None:
+                    raw_scores[i, j] = submission.raw_score
+                    durations[i, j] = submission.completion_duration
+
+        priorities = np.array([bool(order.priority) for order in order_info], dtype=bool)
+        sensor_costs = np.array([submissions[team].sensor_cost for team in team_names], dtype=float)
+
+        return cls(team_names, order_ids, raw_scores, durations, priorities, sensor_costs)
+
+    def score(self, wc: Weights = 1.0, wt: Weights = 1.0) -> np.ndarray:
+
+        """Calculates the trial score of every team for one or many weight combinations
+
+        Args:
+            wc (Weights): cost weight, either a scalar or an array of weights
+            wt (Weights): time weight, either a scalar or an array of weights
+
+        Returns:
+            np.ndarray: trial scores with shape broadcast(wc, wt).shape + (number of teams,)
+        """
+
+        wc, wt = np.broadcast_arrays(np.asarray(wc, dtype=float), np.asarray(wt, dtype=float))
+
+        submitted = ~np.isnan(self.durations)
+
+        # Average cost of teams that scored any points
+        scoring_teams = np.where(submitted, self.raw_scores, 0).sum(axis=1) != 0
+        average_cost = self.sensor_costs[scoring_teams].mean() if scoring_teams.any() else 0.0
+
+        # Average submission duration for each order
+        submission_counts = submitted.sum(axis=0)
+        duration_totals = np.where(submitted, self.durations, 0).sum(axis=0)
+        average_durations = np.divide(duration_totals, submission_counts,
+                                      out=np.zeros(len(self.order_ids)), where=submission_counts > 0)
+
+        # Orders submitted with a zero duration do not count towards the score
+        counted = submitted & (self.durations != 0)
+        duration_ratio = np.divide(average_durations, self.durations,
+                                   out=np.zeros_like(self.raw_scores), where=counted)
+
+        priority_multipliers = np.where(self.priorities, 3, 1)
+
+        efficiency_factors = wt[..., None, None] * duration_ratio
+        order_scores = np.where(counted, priority_multipliers * efficiency_factors * self.raw_scores, 0)
+
+        if (self.sensor_costs == 0).any():
+            raise ZeroDivisionError("Sensor cost of a team is zero")
+
+        cost_factors = wc[..., None] * (average_cost / self.sensor_costs)
+
+        return order_scores.sum(axis=-1) * cost_factors
+
+    def score_dict(self, wc: float = 1.0, wt: float = 1.0) -> dict[str, float]:
+
+        """Calculates the trial score of every team for a single weight combination
+
+        Args:
+            wc (float): cost weight
+            wt (float): time weight
+
+        Returns:
+            dict[str, float]: trial score of each team
+        """
+
+        scores = self.score(wc, wt)
+        return {team: float(scores[i]) for i, team in enumerate(self.team_names)}
+
+def rank_teams(scores: np.ndarray) -> np.ndarray:
+
+    """Ranks teams from highest to lowest score along the last axis
+
+    Args:
+        scores (np.ndarray): team scores, teams on the last axis
+
+    Returns:
+        np.ndarray: team indices ordered by descending score, ties keep the team order
+    """
+
+    return np.argsort(-scores, axis=-1, kind="stable")
+
+def sweep_weights(matrices: list[TrialScoreMatrix], team_names: list[str], wc: Weights, wt: Weights) -> tuple[np.ndarray, np.ndarray]:
+
+    """Scores a whole competition for many weight combinations in one batched pass
+
+    Args:
+        matrices (list[TrialScoreMatrix]): score matrices of each trial
+        team_names (list[str]): teams of the competition, teams missing from a trial score zero for it
+        wc (Weights): cost weights
+        wt (Weights): time weights
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: total scores and rankings, both shaped broadcast(wc, wt).shape + (number of teams,)
+    """
+
+    wc, wt = np.broadcast_arrays(np.asarray(wc, dtype=float), np.asarray(wt, dtype=float))
+
+    totals = np.zeros(wc.shape + (len(team_names),))
+    for matrix in matrices:
+        columns = [team_names.index(team) for team in matrix.team_names]
+        totals[..., columns] += matrix.score(wc, wt)
+
+    return totals, rank_teams(totals)
@@ -0,0 +1,250 @@
+import os
+import sqlite3
+from typing import Optional
+
+from structs import (
+    OrderResult,
+    TrialLog
+)
+
+from log_parser import (
+    file_fingerprint,
+    parse_trial_log,
+    parse_sensor_cost
+)
+
+SCHEMA_VERSION = 1
+
+INDEX_FILE_NAME = ".score_index.sqlite3"
+
+_MISSING = (-1, -1)
+
+class ScoreStore():
+    """On-disk index of parsed trial runs for a logs folder.
+
+    Each run folder (logs/<team>/<trial>_<n>) is stored with the fingerprint
+    of its trial_log.txt and sensor_cost.txt, so a sync only re-parses the
+    folders that are new or have changed since the last scoring session.
+    """
+
+    def __init__(self, logs_folder: str, db_path: Optional[str] = None):
+        self.logs_folder = os.path.abspath(logs_folder)
+
+        if db_path is None:
+            db_path = os.path.join(self.logs_folder, INDEX_FILE_NAME)
+
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self._create_tables()
+
+    def _create_tables(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+        with self.connection:
+            if version != SCHEMA_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS orders")
+                self.connection.execute("DROP TABLE IF EXISTS runs")
+
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    folder TEXT PRIMARY KEY,
+                    team TEXT NOT NULL,
+                    trial TEXT NOT NULL,
+                    log_mtime INTEGER NOT NULL,
+                    log_size INTEGER NOT NULL,
+                    cost_mtime INTEGER NOT NULL,
+                    cost_size INTEGER NOT NULL,
+                    valid INTEGER NOT NULL,
+                    trial_duration REAL,
+                    raw_score INTEGER,
+                    sensor_cost INTEGER
+                )""")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS orders (
+                    folder TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    order_id TEXT NOT NULL,
+                    raw_score INTEGER,
+                    max_score INTEGER,
+                    completion_duration REAL,
+                    PRIMARY KEY (folder, position)
+                )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS runs_team_trial ON runs (team, trial)")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def sync(self) -> tuple[int, int]:
+
+        """Walks the logs folder and ingests every run folder that is new or
+        has changed, and drops the ones that no longer exist
+
+        Returns:
+            tuple[int, int]: number of run folders ingested and removed
+        """
+
+        known = {row[0]: (row[1], row[2], row[3], row[4]) for row in
+                 self.connection.execute("SELECT folder, log_mtime, log_size, cost_mtime, cost_size FROM runs")}
+
+        seen = set()
+        ingested = 0
+
+        with self.connection:
+            for team_entry in os.scandir(self.logs_folder):
+                if not team_entry.is_dir():
+                    continue
+
+                for run_entry in os.scandir(team_entry.path):
+                    if not run_entry.is_dir():
+                        continue
+
+                    folder = os.path.join(team_entry.name, run_entry.name)
+                    seen.add(folder)
+
+                    log_fingerprint = file_fingerprint(os.path.join(run_entry.path, "trial_log.txt")) or _MISSING
+                    cost_fingerprint = file_fingerprint(os.path.join(run_entry.path, "sensor_cost.txt")) or _MISSING
+
+                    if known.get(folder) == (*log_fingerprint, *cost_fingerprint):
+                        continue
+
+                    self._ingest(folder, team_entry.name, run_entry.path, log_fingerprint, cost_fingerprint)
+                    ingested += 1
+
+            removed = [(folder,) for folder in known if folder not in seen]
+            self.connection.executemany("DELETE FROM orders WHERE folder = ?", removed)
+            self.connection.executemany("DELETE FROM runs WHERE folder = ?", removed)
+
+        return ingested, len(removed)
+
+    def _ingest(self, folder: str, team: str, run_path: str, log_fingerprint: tuple[int, int], cost_fingerprint: tuple[int, int]):
+        # Remove suffix i.e. {_n}
+        run_name = os.path.basename(run_path)
+        trial = run_name[:-(len(run_name.split("_")[-1]) + 1)]
+
+        log = None
+        if log_fingerprint != _MISSING:
+            log = parse_trial_log(os.path.join(run_path, "trial_log.txt"))
+
+        sensor_cost = None
+        if cost_fingerprint != _MISSING:
+            sensor_cost = parse_sensor_cost(os.path.join(run_path, "sensor_cost.txt"))
+
+        self.connection.execute("DELETE FROM orders WHERE folder = ?", (folder,))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (folder, team, trial, *log_fingerprint, *cost_fingerprint, log is not None,
+             None if log is None else log.trial_duration,
+             None if log is None else log.raw_score,
+             sensor_cost))
+
+        if log is not None:
+            self.connection.executemany(
+                "INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)",
+                [(folder, i, order.order_id, order.raw_score, order.max_score, order.completion_duration)
+                 for i, order in enumerate(log.orders)])
+
+    def get_best_run(self, team: str, trial: str) -> Optional[str]:
+
+        """Get the path of the best run folder for a trial. Runs are ranked
+        initially based on score, then by completion time.
+
+        Args:
+            team (str): team name
+            trial (str): trial name
+
+        Returns:
+            Optional[str]: path of folder for the best run, None if the team has no valid runs
+        """
+
+        row = self.connection.execute(
+            "SELECT folder FROM runs WHERE team = ? AND trial = ? AND valid "
+            "ORDER BY raw_score DESC, trial_duration ASC, folder ASC LIMIT 1",
+            (team, trial)).fetchone()
+
+        if row is None:
+            return None
+
+        return os.path.join(self.logs_folder, row[0])
+
+    def get_trial_log(self, run_folder: str) -> Optional[TrialLog]:
+
+        """Get the parsed trial log of a run folder from the index
+
+        Args:
+            run_folder (str): path of the run folder
+
+        Returns:
+            Optional[TrialLog]: parsed trial log including the sensor cost, None if the run is not indexed or invalid
+        """
+
+        folder = os.path.relpath(os.path.abspath(run_folder), self.logs_folder)
+
+        row = self.connection.execute(
+            "SELECT trial_duration, sensor_cost FROM runs WHERE folder = ? AND valid", (folder,)).fetchone()
+
+        if row is None:
+            return None
+
+        orders = [OrderResult(*order) for order in self.connection.execute(
+            "SELECT order_id, raw_score, max_score, completion_duration FROM orders WHERE folder = ? ORDER BY position",
+            (folder,))]
+
+        return TrialLog(row[0], orders, row[1])
+
+    def find_sensor_cost(self, team: str) -> Optional[int]:
+
+        """Get the sensor cost from any run of a team
+
+        Args:
+            team (str): team name
+
+        Returns:
+            Optional[int]: sensor cost, None if no run of the team has one
+        """
+
+        row = self.connection.execute(
+            "SELECT sensor_cost FROM runs WHERE team = ? AND sensor_cost IS NOT NULL ORDER BY folder LIMIT 1",
+            (team,)).fetchone()
+
+        return None if row is None else row[0]
+
+_stores: dict[str, ScoreStore] = {}
+
+# Stores a forked process inherited from its parent, kept referenced so their connections are never used or closed
+_inherited_stores: list[ScoreStore] = []
+
+def get_score_store(logs_folder: str) -> ScoreStore:
+
+    """Get the score store for a logs folder, syncing it with the filesystem
+    the first time it is requested in this process. Later calls return the
+    same store without syncing again, so a long-lived process does not see
+    runs added after its first call unless it calls sync on the store.
+
+    Args:
+        logs_folder (str): path of the logs folder
+
+    Returns:
+        ScoreStore: synced score store
+    """
+
+    logs_folder = os.path.abspath(logs_folder)
+
+    if logs_folder not in _stores:
+        store = ScoreStore(logs_folder)
+        ingested, removed = store.sync()
+        if ingested or removed:
+            print(f'Score index: ingested {ingested} run folder(s), removed {removed}')
+        _stores[logs_folder] = store
+
+    return _stores[logs_folder]
+
+def reset_score_stores():
+
+    """Forgets the score stores of this process, so the next request opens its
+    own connection. SQLite connections must not be used across fork(), so
+    this runs first in every scoring worker process.
+    """
+
+    _inherited_stores.extend(_stores.values())
+    _stores.clear()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import json
+import zlib
+import struct
+import argparse
+from typing import Iterator, Optional
+
+# zstandard is optional, zlib is used when it is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from state_log import (
+    LOG_END,
+    SIM_TIME_PATTERN,
+    iter_log_parts,
+    decode_chunk,
+    get_chunk_root
+)
+
+MAGIC = b"ARIACSZ1"
+FOOTER = struct.Struct("<Q8s")
+
+FRAME_SIZE = 4 << 20
+
+SEEKABLE_SUFFIX = ".sz"
+
+class Frame():
+    def __init__(self, offset: int, length: int, start: Optional[float], end: Optional[float], chunks: int, changes: bool = True):
+        self.offset = offset
+        self.length = length
+        self.start = start
+        self.end = end
+        self.chunks = chunks
+        # Indexes written before this flag existed do not say, so their frames are assumed to change the world
+        self.changes = changes
+
+    def overlaps(self, start: Optional[float], end: Optional[float]) -> bool:
+        # Frames without states (the world description) are needed by every window
+        if self.start is None:
+            return True
+        return (start is None or self.end >= start) and (end is None or self.start <= end)
+
+def is_seekable_log(path: str) -> bool:
+
+    """Checks if a file is a seekable compressed state log
+
+    Args:
+        path (str): file path
+
+    Returns:
+        bool: True if the file starts with the seekable log magic
+    """
+
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except IOError:
+        return False
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 6)
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("State log is zstd compressed but the zstandard module is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+def compress_state_log(source: str, output: str, frame_size: int = FRAME_SIZE, codec: Optional[str] = None) -> int:
+
+    """Converts a Gazebo state log into independently compressed frames of
+    chunks, with an index of the simulation time covered by each frame
+
+    Args:
+        source (str): path of the raw state log
+        output (str): path of the seekable log to write
+        frame_size (int): uncompressed size at which a frame is closed
+        codec (Optional[str]): "zstd" or "zlib", defaults to zstd when available
+
+    Returns:
+        int: number of frames written
+    """
+
+    if codec is None:
+        codec = "zstd" if zstandard is not None else "zlib"
+
+    frames: list[Frame] = []
+    prologue = b""
+    epilogue = b""
+
+    with open(source, "rb") as src, open(output, "wb") as out:
+        out.write(MAGIC)
+
+        pending: list[bytes] = []
+        pending_size = 0
+        pending_static = False
+        pending_start: Optional[float] = None
+        pending_end: Optional[float] = None
+        pending_changes = False
+
+        def flush():
+            nonlocal pending, pending_size, pending_start, pending_end, pending_changes
+            if not pending:
+                return
+            data = _compress(codec, b"".join(pending))
+            frames.append(Frame(out.tell(), len(data), pending_start, pending_end, len(pending), pending_changes))
+            out.write(data)
+            pending, pending_size, pending_start, pending_end, pending_changes = [], 0, None, None, False
+
+        for kind, data in iter_log_parts(src):
+            if kind == "prologue":
+                prologue = data
+                continue
+            if kind == "epilogue":
+                epilogue = data
+                continue
+
+            decoded = decode_chunk(data)
+            # The world description can hold a <state> with a sim_time, it still belongs to every window
+            if get_chunk_root(decoded) == "state":
+                sim_times = [int(sec) + int(nsec) * 1e-9 for sec, nsec in SIM_TIME_PATTERN.findall(decoded)]
+            else:
+                sim_times = []
+
+            # Keep chunks without states in their own frames so they are never mixed with a time window
+            if pending and (not sim_times) != pending_static:
+                flush()
+            pending_static = not sim_times
+
+            pending.append(data + b"\n")
+            pending_size += len(data) + 1
+            pending_changes = pending_changes or (bool(sim_times) and ("<insertions" in decoded or "<deletions" in decoded))
+            if sim_times:
+                pending_start = sim_times[0] if pending_start is None else pending_start
+                pending_end = sim_times[-1]
+
+            if pending_size >= frame_size:
+                flush()
+
+        flush()
+
+        index = json.dumps({
+            "codec": codec,
+            "prologue": prologue.decode("utf-8"),
+            "epilogue": epilogue.decode("utf-8"),
+            "frames": [[f.offset, f.length, f.start, f.end, f.chunks, f.changes] for f in frames]
+        }).encode("utf-8")
+        index_offset = out.tell()
+        out.write(index)
+        out.write(FOOTER.pack(index_offset, MAGIC))
+
+    return len(frames)
+
+class SeekableStateLog():
+    """Reader for a seekable compressed state log. Only the frames that
+    overlap the requested simulation time window are read and decompressed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a seekable state log")
+            file.seek(-FOOTER.size, os.SEEK_END)
+            index_offset, magic = FOOTER.unpack(file.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} has no index, the file may be truncated")
+            file.seek(index_offset)
+            index = json.loads(file.read(os.path.getsize(path) - FOOTER.size - index_offset))
+
+        self.codec: str = index["codec"]
+        self.prologue: bytes = index["prologue"].encode("utf-8")
+        self.epilogue: bytes = index["epilogue"].encode("utf-8")
+        self.frames = [Frame(*frame) for frame in index["frames"]]
+
+    def sim_time_span(self) -> Optional[tuple[float, float]]:
+
+        """Get the first and last simulation time in the log from the index
+
+        Returns:
+            Optional[tuple[float, float]]: first and last simulation time, None if the log has no states
+        """
+
+        timed = [frame for frame in self.frames if frame.start is not None]
+        if not timed:
+            return None
+        return (min(frame.start for frame in timed), max(frame.end for frame in timed))
+
+    def iter_chunks(self, start: Optional[float] = None, end: Optional[float] = None, with_changes: bool = False) -> Iterator[bytes]:
+
+        """Reads the chunks of every frame overlapping a simulation time window
+
+        Args:
+            start (Optional[float]): start of the window in seconds, None for the beginning of the log
+            end (Optional[float]): end of the window in seconds, None for the end of the log
+            with_changes (bool): also read the frames before the window that insert or delete models
+
+        Yields:
+            bytes: each <chunk> element of the overlapping frames
+        """
+
+        with open(self.path, "rb") as file:
+            for frame in self.frames:
+                before_window = start is not None and frame.end is not None and frame.end < start
+                if not frame.overlaps(start, end) and not (with_changes and frame.changes and before_window):
+                    continue
+                file.seek(frame.offset)
+                data = _decompress(self.codec, file.read(frame.length))
+                for kind, chunk in iter_log_parts(io.BytesIO(data)):
+                    if kind == "chunk":
+                        yield chunk
+
+    def iter_log_parts(self, start: Optional[float] = None, end: Optional[float] = None,
+                       with_changes: bool = False) -> Iterator[tuple[str, bytes]]:
+
+        """Same parts as state_log.iter_log_parts, limited to a simulation time window
+
+        Args:
+            start (Optional[float]): start of the window in seconds
+            end (Optional[float]): end of the window in seconds
+            with_changes (bool): also read the frames before the window that insert or delete models
+
+        Yields:
+            tuple[str, bytes]: prologue, chunks, then epilogue
+        """
+
+        yield ("prologue", self.prologue)
+        for chunk in self.iter_chunks(start, end, with_changes):
+            yield ("chunk", chunk)
+        yield ("epilogue", self.epilogue)
+
+def export_state_log(source: str, output: str, start: Optional[float] = None, end: Optional[float] = None):
+
+    """Writes a raw state log, e.g. for playback, from the frames of a seekable
+    log that overlap a simulation time window
+
+    Args:
+        source (str): path of the seekable log
+        output (str): path of the raw state log to write
+        start (Optional[float]): start of the window in seconds
+        end (Optional[float]): end of the window in seconds
+    """
+
+    log = SeekableStateLog(source)
+    with open(output, "wb") as out:
+        for kind, data in log.iter_log_parts(start, end):
+            if kind == "chunk":
+                out.write(data + b"\n")
+            elif kind == "epilogue":
+                out.write(LOG_END + b"\n")
+            else:
+                out.write(data)
+
+def find_state_log(run_folder: str) -> Optional[str]:
+
+    """Get the state log of a run folder, raw or seekable
+
+    Args:
+        run_folder (str): log folder of a trial run
+
+    Returns:
+        Optional[str]: path of state.log, or of state.log.sz if only the compressed log exists
+    """
+
+    for name in ("state.log", "state.log" + SEEKABLE_SUFFIX):
+        path = os.path.join(run_folder, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def convert_logs(logs_folder: str, remove_original: bool = False) -> int:
+
+    """Converts the state.log of every run folder under a logs folder that
+    has not been converted yet
+
+    Args:
+        logs_folder (str): logs folder with a folder per team
+        remove_original (bool): delete each raw state.log once it has been converted
+
+    Returns:
+        int: number of state logs converted
+    """
+
+    converted = 0
+    for team_entry in os.scandir(logs_folder):
+        if not team_entry.is_dir():
+            continue
+        for run_entry in os.scandir(team_entry.path):
+            source = os.path.join(run_entry.path, "state.log")
+            output = source + SEEKABLE_SUFFIX
+            if not os.path.exists(source):
+                continue
+            if not os.path.exists(output) or os.path.getmtime(output) < os.path.getmtime(source):
+                frames = compress_state_log(source, output + ".partial")
+                os.replace(output + ".partial", output)
+                print(f'Converted {source} ({frames} frames)')
+                converted += 1
+            if remove_original:
+                os.remove(source)
+    return converted
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert Gazebo state logs to and from a seekable compressed format")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compress_parser = subparsers.add_parser("compress", help="Compress a state log")
+    compress_parser.add_argument("source")
+    compress_parser.add_argument("output", nargs="?")
+    compress_parser.add_argument("--frame-size", type=int, default=FRAME_SIZE)
+
+    export_parser = subparsers.add_parser("export", help="Write a raw state log from a compressed one")
+    export_parser.add_argument("source")
+    export_parser.add_argument("output")
+    export_parser.add_argument("-s", "--start", type=float, default=None, help="Start of the sim time window in seconds")
+    export_parser.add_argument("-e", "--end", type=float, default=None, help="End of the sim time window in seconds")
+
+    convert_parser = subparsers.add_parser("convert", help="Compress every state log under a logs folder")
+    convert_parser.add_argument("logs_folder")
+    convert_parser.add_argument("--remove-original", action="store_true")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "compress":
+            frames = compress_state_log(args.source, args.output or args.source + SEEKABLE_SUFFIX, args.frame_size)
+            print(f'Compressed {args.source} into {frames} frames')
+        elif args.command == "export":
+            export_state_log(args.source, args.output, args.start, args.end)
+        else:
+            print(f'Converted {convert_logs(args.logs_folder, args.remove_original)} state log(s)')
+    except (IOError, ValueError) as e:
+        print(f'Unable to {args.command} state log: {e}')
+        sys.exit(1)
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import bz2
+import zlib
+import base64
+import argparse
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterator, Optional
+
+BLOCK_SIZE = 1 << 20
+
+CHUNK_START = b"<chunk"
+CHUNK_END = b"]]></chunk>"
+LOG_END = b"</gazebo_log>"
+
+SIM_TIME_PATTERN = re.compile(r"<sim_time>\s*(\d+)\s+(\d+)\s*</sim_time>")
+ENCODING_PATTERN = re.compile(rb"encoding\s*=\s*['\"](\w+)['\"]")
+SDF_ROOT_PATTERN = re.compile(r"<sdf\b[^>]*>\s*(?:<!--.*?-->\s*)*<([\w:]+)", re.DOTALL)
+
+# Elements of a state that are kept in the filtered log
+STATE_HEADER_TAGS = ("sim_time", "real_time", "wall_time", "iterations")
+STATE_CHANGE_TAGS = ("insertions", "deletions")
+
+def iter_log_parts(stream: BinaryIO, block_size: int = BLOCK_SIZE) -> Iterator[tuple[str, bytes]]:
+
+    """Splits a Gazebo state log into its parts while reading it in fixed size
+    blocks, so memory use is bounded by the largest chunk instead of the file
+
+    Args:
+        stream (BinaryIO): state log opened in binary mode
+        block_size (int): number of bytes read at a time
+
+    Yields:
+        tuple[str, bytes]: ("prologue", bytes) for the xml declaration and header,
+        ("chunk", bytes) for each <chunk> element, then ("epilogue", bytes)
+    """
+
+    buffer = b""
+    # Parts before position are consumed, the buffer is only trimmed when a block is read
+    position = 0
+    prologue_done = False
+    eof = False
+
+    while True:
+        if not prologue_done:
+            start = buffer.find(CHUNK_START)
+            if start >= 0:
+                yield ("prologue", buffer[:start])
+                position = start
+                prologue_done = True
+                continue
+        else:
+            start = buffer.find(CHUNK_START, position)
+            if start >= 0:
+                end = buffer.find(CHUNK_END, start)
+                if end >= 0:
+                    end += len(CHUNK_END)
+                    yield ("chunk", buffer[start:end])
+                    position = end
+                    continue
+
+        if eof:
+            break
+
+        block = stream.read(block_size)
+        if not block:
+            eof = True
+        buffer = buffer[position:] + block
+        position = 0
+
+    if not prologue_done:
+        yield ("prologue", buffer)
+        buffer = b""
+
+    # Anything left is the closing tag, or a chunk cut off by a crash
+    end = buffer.find(LOG_END, position)
+    yield ("epilogue", buffer[end:].strip() if end >= 0 else b"")
+
+def open_seekable_log(path: str):
+
+    """Opens a state log as a seekable compressed log
+
+    Args:
+        path (str): path of the state log
+
+    Returns:
+        Optional[SeekableStateLog]: the opened log, None if it is a raw state log
+    """
+
+    # Imported here as seekable_log builds on the parsing functions of this module
+    from seekable_log import SeekableStateLog, is_seekable_log
+
+    if not is_seekable_log(path):
+        return None
+    return SeekableStateLog(path)
+
+def open_log_parts(path: str, start: Optional[float] = None, end: Optional[float] = None,
+                   with_changes: bool = False) -> Iterator[tuple[str, bytes]]:
+
+    """Reads the parts of a raw or seekable compressed state log. For a
+    seekable log only the frames overlapping the time window are read.
+
+    Args:
+        path (str): path of the state log
+        start (Optional[float]): start of the sim time window in seconds, None for the beginning of the log
+        end (Optional[float]): end of the sim time window in seconds, None for the end of the log
+        with_changes (bool): also read the frames before the window that insert or delete models
+
+    Yields:
+        tuple[str, bytes]: prologue, chunks, then epilogue
+    """
+
+    seekable_log = open_seekable_log(path)
+    if seekable_log is not None:
+        yield from seekable_log.iter_log_parts(start, end, with_changes)
+        return
+
+    with open(path, "rb") as stream:
+        yield from iter_log_parts(stream)
+
+def decode_chunk(chunk: bytes) -> str:
+
+    """Decodes the data of a <chunk> element
+
+    Args:
+        chunk (bytes): complete <chunk> element
+
+    Returns:
+        str: decoded chunk data
+    """
+
+    header_end = chunk.index(b">")
+    encoding = ENCODING_PATTERN.search(chunk[:header_end])
+    payload = chunk[chunk.index(b"<![CDATA[") + len(b"<![CDATA["):-len(CHUNK_END)]
+
+    if encoding is None or encoding.group(1) == b"txt":
+        return payload.decode("utf-8")
+    if encoding.group(1) == b"zlib":
+        return zlib.decompress(base64.b64decode(payload)).decode("utf-8")
+    if encoding.group(1) == b"bz2":
+        return bz2.decompress(base64.b64decode(payload)).decode("utf-8")
+
+    raise ValueError(f"Unknown chunk encoding: {encoding.group(1).decode()}")
+
+def encode_chunk(data: str) -> bytes:
+
+    """Creates a text encoded <chunk> element
+
+    Args:
+        data (str): chunk data
+
+    Returns:
+        bytes: <chunk> element followed by a newline
+    """
+
+    return b"<chunk encoding='txt'><![CDATA[" + data.encode("utf-8") + CHUNK_END + b"\n"
+
+def iter_sdf_blocks(data: str) -> Iterator[str]:
+
+    """Splits decoded chunk data into its <sdf> blocks
+
+    Args:
+        data (str): decoded chunk data
+
+    Yields:
+        str: each <sdf>...</sdf> block
+    """
+
+    position = 0
+    while True:
+        start = data.find("<sdf", position)
+        if start < 0:
+            return
+        end = data.find("</sdf>", start)
+        if end < 0:
+            return
+        position = end + len("</sdf>")
+        yield data[start:position]
+
+def get_chunk_root(data: str) -> Optional[str]:
+
+    """Get the element held by the first <sdf> block of decoded chunk data,
+    "world" for the world description and "state" for world states
+
+    Args:
+        data (str): decoded chunk data
+
+    Returns:
+        Optional[str]: tag of the element, None if the data has no <sdf> block
+    """
+
+    match = SDF_ROOT_PATTERN.search(data)
+    if match is None:
+        return None
+    return match.group(1)
+
+def parse_sim_time(data: str) -> Optional[float]:
+
+    """Reads the first simulation time in a block of state log data
+
+    Args:
+        data (str): decoded state data
+
+    Returns:
+        Optional[float]: simulation time in seconds, None if the data has no sim_time
+    """
+
+    match = SIM_TIME_PATTERN.search(data)
+    if match is None:
+        return None
+    return int(match.group(1)) + int(match.group(2)) * 1e-9
+
+def get_sim_time_span(path: str) -> Optional[tuple[float, float]]:
+
+    """Get the first and last simulation time of a raw or seekable state log.
+    Seekable logs are answered from their index without decompressing anything.
+
+    Args:
+        path (str): path of the state log
+
+    Returns:
+        Optional[tuple[float, float]]: first and last simulation time in seconds, None if the log has no states
+    """
+
+    seekable_log = open_seekable_log(path)
+    if seekable_log is not None:
+        return seekable_log.sim_time_span()
+
+    first: Optional[float] = None
+    last: Optional[float] = None
+    for kind, data in open_log_parts(path):
+        if kind != "chunk":
+            continue
+        for sec, nsec in SIM_TIME_PATTERN.findall(decode_chunk(data)):
+            sim_time = int(sec) + int(nsec) * 1e-9
+            if first is None:
+                first = sim_time
+            last = sim_time
+
+    if first is None:
+        return None
+    return (first, last)
+
+def filter_model(model: ET.Element) -> ET.Element:
+    filtered = ET.Element(model.tag, model.attrib)
+    for child in model:
+        if child.tag == "pose":
+            filtered.append(child)
+        elif child.tag == "model":
+            filtered.append(filter_model(child))
+        elif child.tag == "link":
+            link = ET.SubElement(filtered, "link", child.attrib)
+            for pose in child.findall("pose"):
+                link.append(pose)
+    return filtered
+
+def filter_state(sdf: ET.Element) -> ET.Element:
+
+    """Keeps only the pose of every model and link of a world state, the
+    equivalent of a *.pose/*.pose filter
+
+    Args:
+        sdf (ET.Element): <sdf> element holding a <state>
+
+    Returns:
+        ET.Element: filtered <sdf> element
+    """
+
+    filtered = ET.Element(sdf.tag, sdf.attrib)
+    for state in sdf.findall("state"):
+        filtered_state = ET.SubElement(filtered, "state", state.attrib)
+        for child in state:
+            if child.tag in STATE_HEADER_TAGS or child.tag in STATE_CHANGE_TAGS:
+                filtered_state.append(child)
+            elif child.tag == "model":
+                filtered_state.append(filter_model(child))
+    return filtered
+
+class PendingChanges():
+    """Insertions and deletions of the states skipped before a time window.
+    They are carried into the first state written, so models inserted before
+    the window still exist, and deleted ones are gone, during playback.
+    """
+
+    def __init__(self):
+        self.insertions: dict[tuple[str, Optional[str]], ET.Element] = {}
+        self.deletions: list[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.insertions or self.deletions)
+
+    def add(self, sdf: ET.Element):
+        for inserted in sdf.findall("state/insertions/*"):
+            self.insertions[(inserted.tag, inserted.get("name"))] = inserted
+        for deleted in sdf.findall("state/deletions/name"):
+            # A model inserted and deleted before the window never needs to exist
+            matches = [key for key in self.insertions if key[1] == deleted.text]
+            for key in matches:
+                del self.insertions[key]
+            if not matches and deleted.text not in self.deletions:
+                self.deletions.append(deleted.text)
+
+    def apply(self, sdf: ET.Element):
+
+        """Adds the pending changes to a state, before the changes of the state itself
+
+        Args:
+            sdf (ET.Element): <sdf> element holding a <state>
+        """
+
+        state = sdf.find("state")
+        if state is None:
+            return
+
+        deletions = []
+        for name in self.deletions:
+            deleted = ET.Element("name")
+            deleted.text = name
+            deletions.append(deleted)
+
+        # Changes follow the sim_time, real_time, wall_time and iterations of the state
+        position = sum(1 for child in state if child.tag in STATE_HEADER_TAGS)
+        for tag, carried in (("insertions", list(self.insertions.values())), ("deletions", deletions)):
+            if not carried:
+                continue
+            changes = state.find(tag)
+            if changes is None:
+                changes = ET.Element(tag)
+                state.insert(position, changes)
+            changes[0:0] = carried
+            position += 1
+
+        self.insertions = {}
+        self.deletions = []
+
+def filter_state_log(source: str, output: str, hz: float = 100.0, start: Optional[float] = None, end: Optional[float] = None) -> tuple[int, int]:
+
+    """Streams a Gazebo state log, keeping only model and link poses and
+    resampling the states to a target rate. The output is a text encoded
+    state log that can be played back, like gz log -e -z <hz> --filter *.pose/*.pose
+
+    Args:
+        source (str): path of the raw or seekable state log to filter
+        output (str): path of the filtered state log
+        hz (float): maximum rate of states in the output, 0 keeps every state
+        start (Optional[float]): drop states before this sim time in seconds, their insertions
+            and deletions are carried into the first state written
+        end (Optional[float]): drop states after this sim time in seconds
+
+    Returns:
+        tuple[int, int]: number of states read and written
+    """
+
+    period = 1.0 / hz if hz > 0 else 0.0
+    last_written: Optional[float] = None
+    pending = PendingChanges()
+    states_read = 0
+    states_written = 0
+
+    with open(output, "wb") as out:
+        for kind, data in open_log_parts(source, start, end, with_changes=True):
+            if kind == "prologue":
+                out.write(data)
+                continue
+
+            if kind == "epilogue":
+                out.write(LOG_END + b"\n")
+                continue
+
+            decoded = decode_chunk(data)
+
+            # The world description chunk is copied as is, even when the world holds a <state> of its own
+            if get_chunk_root(decoded) != "state":
+                out.write(data + b"\n")
+                continue
+
+            kept = []
+            for block in iter_sdf_blocks(decoded):
+                states_read += 1
+
+                sim_time = parse_sim_time(block)
+                if sim_time is not None and start is not None and sim_time < start:
+                    if "<insertions" in block or "<deletions" in block:
+                        pending.add(ET.fromstring(block))
+                    continue
+                if sim_time is not None and end is not None and sim_time > end:
+                    continue
+
+                sdf = ET.fromstring(block)
+                if pending:
+                    pending.apply(sdf)
+                changes_world = any(sdf.find(f"state/{tag}") is not None for tag in STATE_CHANGE_TAGS)
+
+                # Insertions and deletions are always kept so playback spawns and removes models
+                if (not changes_world and sim_time is not None and last_written is not None
+                        and sim_time - last_written < period - 1e-9):
+                    continue
+
+                kept.append(ET.tostring(filter_state(sdf), encoding="unicode"))
+                if sim_time is not None:
+                    last_written = sim_time
+                states_written += 1
+
+            if kept:
+                out.write(encode_chunk("".join(kept)))
+
+    return states_read, states_written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter a Gazebo state log down to model and link poses")
+
+    parser.add_argument("source", help="The state log to filter")
+    parser.add_argument("output", help="Where to write the filtered state log")
+
+    parser.add_argument("-z", "--hz", type=float, default=100.0, help="Maximum rate of states in the output")
+    parser.add_argument("-s", "--start", type=float, default=None, help="Start of the sim time window in seconds")
+    parser.add_argument("-e", "--end", type=float, default=None, help="End of the sim time window in seconds")
+
+    args = parser.parse_args()
+
+    try:
+        states_read, states_written = filter_state_log(args.source, args.output, args.hz, args.start, args.end)
+    except (IOError, ValueError, ET.ParseError) as e:
+        print(f'Unable to filter state log {args.source}: {e}')
+        sys.exit(1)
+
+    print(f'Filtered {args.source}: kept {states_written} of {states_read} states')
@@ -21,4 +21,30 @@ class TrialInfo():
         self.trial_name = trial_name
         self.trial_scores = trial_scores
         self.team_submissions = team_submissions
-        self.team_best_file_logs = team_best_file_logs
\ No newline at end of file
+        self.team_best_file_logs = team_best_file_logs
+
+class OrderResult():
+    def __init__(self, order_id: str, raw_score: Optional[int], max_score: Optional[int], completion_duration: Optional[float]):
+        self.order_id = order_id
+        self.raw_score = raw_score
+        self.max_score = max_score
+        self.completion_duration = completion_duration
+
+class TrialLog():
+    def __init__(self, trial_duration: float, orders: list[OrderResult], sensor_cost: Optional[int] = None):
+        self.trial_duration = trial_duration
+        self.orders = orders
+        self.sensor_cost = sensor_cost
+
+    @property
+    def raw_score(self) -> int:
+        return sum(order.raw_score for order in self.orders if order.raw_score is not None)
+
+    def get_order(self, order_id: str) -> Optional[OrderResult]:
+        for order in self.orders:
+            if order.order_id == order_id:
+                return order
+        for order in self.orders:
+            if order_id in order.order_id:
+                return order
+        return None
@@ -0,0 +1,146 @@
+import os
+from typing import Optional
+
+import yaml
+
+# Use the libyaml backed loader when it is available
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+from structs import OrderInfo
+
+from log_parser import file_fingerprint
+
+class TrialManifest():
+    """Precomputed order metadata of a trial configuration"""
+
+    def __init__(self, trial: str, order_ids: tuple[str, ...], priorities: tuple[bool, ...], order_types: tuple[str, ...],
+                 product_counts: tuple[int, ...], max_scores: tuple[int, ...]):
+        self.trial = trial
+        self.order_ids = order_ids
+        self.priorities = priorities
+        self.order_types = order_types
+        self.product_counts = product_counts
+        self.max_scores = max_scores
+
+    @property
+    def max_score(self) -> int:
+        return sum(self.max_scores)
+
+    def order_information(self) -> list[OrderInfo]:
+
+        """Get the information about each order in the trial
+
+        Returns:
+            list[OrderInfo]: list of information about each order in the trial
+        """
+
+        return [OrderInfo(order_id, priority, max_score) for order_id, priority, max_score
+                in zip(self.order_ids, self.priorities, self.max_scores)]
+
+# Parsed manifests keyed on trial config path, with the (mtime, size) they were parsed at
+_manifests: dict[str, tuple[tuple[int, int], Optional[TrialManifest]]] = {}
+
+def get_trials_folder() -> str:
+    automated_eval_folder = os.path.abspath(os.path.join(__file__, "..", ".."))
+    return os.path.join(automated_eval_folder, 'trials')
+
+def calculate_order_max_score(order: dict) -> int:
+    try:
+        if order['type'] == 'kitting':
+            num_parts = len(order['kitting_task']['products'])
+            return 1 + 3 * num_parts + num_parts
+        elif order['type'] == 'assembly':
+            num_parts = len(order['assembly_task']['products'])
+            return 3 * num_parts + num_parts
+        elif order['type'] == 'combined':
+            num_parts = len(order['combined_task']['products'])
+            return 5 * num_parts + num_parts
+    except KeyError:
+        print('Unable to compute max score for order')
+
+    return 0
+
+def count_order_products(order: dict) -> int:
+    try:
+        return len(order[f"{order['type']}_task"]['products'])
+    except (KeyError, TypeError):
+        return 0
+
+def parse_trial_manifest(trial: str, trial_config: str) -> Optional[TrialManifest]:
+
+    """Parses a trial configuration file into a manifest
+
+    Args:
+        trial (str): trial name
+        trial_config (str): path of the trial configuration file
+
+    Returns:
+        Optional[TrialManifest]: manifest of the trial, None if the file cannot be parsed
+    """
+
+    try:
+        with open(trial_config) as f:
+            trial_info = yaml.load(f, Loader=SafeLoader)
+    except (IOError, yaml.YAMLError):
+        print(f'Unable to parse trial config: {trial_config}')
+        return None
+
+    try:
+        orders = trial_info['orders']
+    except (KeyError, TypeError):
+        print(f'No orders in trial config: {trial_config}')
+        return None
+
+    return TrialManifest(
+        trial,
+        tuple(str(order['id']) for order in orders),
+        tuple(bool(order.get('priority', False)) for order in orders),
+        tuple(str(order.get('type', '')) for order in orders),
+        tuple(count_order_products(order) for order in orders),
+        tuple(calculate_order_max_score(order) for order in orders))
+
+def get_trial_manifest(trial: str) -> Optional[TrialManifest]:
+
+    """Get the manifest of a trial, re-parsing the configuration only when it has changed
+
+    Args:
+        trial (str): trial name
+
+    Returns:
+        Optional[TrialManifest]: manifest of the trial, None if the configuration is missing or invalid
+    """
+
+    trial_config = os.path.join(get_trials_folder(), trial + '.yaml')
+    fingerprint = file_fingerprint(trial_config)
+
+    if fingerprint is None:
+        print(f'Trial config: {trial_config} not found')
+        _manifests.pop(trial_config, None)
+        return None
+
+    cached = _manifests.get(trial_config)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, parse_trial_manifest(trial, trial_config))
+        _manifests[trial_config] = cached
+
+    return cached[1]
+
+def load_trial_manifests() -> dict[str, TrialManifest]:
+
+    """Parses every trial configuration in the trials folder
+
+    Returns:
+        dict[str, TrialManifest]: manifest of each valid trial by trial name
+    """
+
+    manifests = {}
+    for file in sorted(os.listdir(get_trials_folder())):
+        if not file.endswith('.yaml'):
+            continue
+        manifest = get_trial_manifest(file[:-len('.yaml')])
+        if manifest is not None:
+            manifests[manifest.trial] = manifest
+    return manifests
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import time
+import hashlib
+import tarfile
+import argparse
+import subprocess
+
+# Trial configs of a built workspace, the installed copy is the one the competition loads
+INSTALLED_TRIALS = "/workspace/install/ariac_gazebo/share/ariac_gazebo/config/trials"
+SOURCE_TRIALS = "/workspace/src/ARIAC/ariac_gazebo/config/trials"
+
+class SyncError(Exception):
+    pass
+
+def get_automated_eval_folder() -> str:
+    return os.path.dirname(os.path.abspath(__file__))
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def read_host_trials(trials_folder: str) -> dict[str, bytes]:
+    trials = {}
+    for name in sorted(os.listdir(trials_folder)):
+        if name.endswith(".yaml"):
+            with open(os.path.join(trials_folder, name), "rb") as file:
+                trials[name] = file.read()
+    return trials
+
+def read_container_hashes(team_name: str, folder: str) -> dict[str, str]:
+
+    """Hashes the trial configs in a container folder. The folder is copied
+    out as a tar stream, which also works while the container is stopped.
+
+    Args:
+        team_name (str): name of the team container
+        folder (str): folder of trial configs in the container
+
+    Returns:
+        dict[str, str]: sha256 of each trial config by file name
+
+    Raises:
+        SyncError: if the folder cannot be read
+    """
+
+    output = subprocess.run(["docker", "cp", f"{team_name}:{folder}", "-"], capture_output=True)
+    if output.returncode != 0:
+        raise SyncError(f"Unable to read {folder} from {team_name}: {output.stderr.decode(errors='replace').strip()}")
+
+    hashes = {}
+    with tarfile.open(fileobj=io.BytesIO(output.stdout), mode="r:") as archive:
+        for member in archive:
+            # Members are trials/<name>, only the top level configs are trials
+            parts = member.name.split("/")
+            if member.isfile() and len(parts) == 2 and parts[1].endswith(".yaml"):
+                hashes[parts[1]] = hash_bytes(archive.extractfile(member).read())
+    return hashes
+
+def build_archive(files: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:") as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = int(time.time())
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def sync_folder(team_name: str, folder: str, trials: dict[str, bytes], dry_run: bool = False) -> tuple[list[str], list[str]]:
+
+    """Brings a container's trial config folder in line with the host trials,
+    copying in the configs whose content changed and removing the ones that
+    no longer exist on the host
+
+    Args:
+        team_name (str): name of the team container
+        folder (str): folder of trial configs in the container
+        trials (dict[str, bytes]): contents of the host trial configs by file name
+        dry_run (bool): only report the differences
+
+    Returns:
+        tuple[list[str], list[str]]: changed and removed trial configs
+
+    Raises:
+        SyncError: if the container folder cannot be read or updated
+    """
+
+    container_hashes = read_container_hashes(team_name, folder)
+    changed = [name for name, data in trials.items() if container_hashes.get(name) != hash_bytes(data)]
+    removed = [name for name in container_hashes if name not in trials]
+
+    if dry_run:
+        return changed, removed
+
+    if changed:
+        archive = build_archive({name: trials[name] for name in changed})
+        output = subprocess.run(["docker", "cp", "-", f"{team_name}:{folder}"], input=archive, capture_output=True)
+        if output.returncode != 0:
+            raise SyncError(f"Unable to copy trials to {team_name}: {output.stderr.decode(errors='replace').strip()}")
+
+    if removed:
+        output = subprocess.run(["docker", "exec", team_name, "rm", "-f"] + [os.path.join(folder, name) for name in removed],
+                                capture_output=True)
+        if output.returncode != 0:
+            raise SyncError(f"Unable to remove old trials from {team_name}, is the container running?")
+
+    return changed, removed
+
+def sync_trials(team_name: str, trials_folder: str = "", dry_run: bool = False) -> tuple[list[str], list[str]]:
+
+    """Syncs the trial configs of a team container with the trials folder
+    without rebuilding ariac_gazebo. The installed share folder is what the
+    competition loads, the source folder is kept in line for later builds.
+
+    Args:
+        team_name (str): name of the team container
+        trials_folder (str): host trials folder, automated_evaluation/trials when empty
+        dry_run (bool): only report the differences
+
+    Returns:
+        tuple[list[str], list[str]]: changed and removed trial configs of the installed share folder
+
+    Raises:
+        SyncError: if the container cannot be read or updated
+    """
+
+    trials = read_host_trials(trials_folder or os.path.join(get_automated_eval_folder(), "trials"))
+    changed, removed = sync_folder(team_name, INSTALLED_TRIALS, trials, dry_run)
+    sync_folder(team_name, SOURCE_TRIALS, trials, dry_run)
+    return changed, removed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy changed trial configs into a team container without rebuilding")
+
+    parser.add_argument("team_name", help="Name of the team container")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the trial configs that differ")
+
+    args = parser.parse_args()
+
+    try:
+        changed, removed = sync_trials(args.team_name, dry_run=args.dry_run)
+    except (SyncError, tarfile.TarError, OSError) as e:
+        print(f'Unable to sync trials for {args.team_name}: {e}')
+        sys.exit(1)
+
+    action = "Differs" if args.dry_run else "Synced"
+    for name in changed:
+        print(f'{action}: {name}')
+    for name in removed:
+        print(f'{"Extra" if args.dry_run else "Removed"}: {name}')
+    print(f'{len(changed)} changed and {len(removed)} removed trial config(s) for {args.team_name}')
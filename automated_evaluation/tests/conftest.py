@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+AUTOMATED_EVAL_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(AUTOMATED_EVAL_FOLDER, "container_scripts"))
+sys.path.insert(0, os.path.join(AUTOMATED_EVAL_FOLDER, "scoring"))
+sys.path.insert(0, AUTOMATED_EVAL_FOLDER)
+
+def make_trial_log(trial_name: str, duration: float, scores: list[int], max_score: int = 10) -> str:
+    # Same layout as the trial log the ARIAC competition writes
+    lines = ["=" * 20, f"Trial Name: {trial_name}", "", "", "", "", f"Trial Duration: {duration:.3f}", "", "Order Summary", "-" * 10]
+    for i, score in enumerate(scores):
+        lines += [f"Order ID: ORDER{i}", "Type: kitting", "Priority: False", "", f"Max Score: {max_score}",
+                  f"Score: {score}", "", f"Completion Duration: {duration / 2:.3f}"]
+    lines += ["", "", "Order Details", ""]
+    return "\n".join(lines) + "\n"
+
+def write_run(logs_folder: str, team_name: str, run_name: str, trial_log: str) -> str:
+    run_folder = os.path.join(logs_folder, team_name, run_name)
+    os.makedirs(run_folder, exist_ok=True)
+    with open(os.path.join(run_folder, "trial_log.txt"), "w") as file:
+        file.write(trial_log)
+    return run_folder
+
+class StubManifest():
+    def __init__(self, max_score: int):
+        self.max_score = max_score
+
+@pytest.fixture
+def trial_max_score(monkeypatch):
+    # Every trial gets the same max score, without trial configs on disk
+    def set_max_score(max_score: int):
+        import trial_scheduler
+        monkeypatch.setattr(trial_scheduler, "get_trial_manifest", lambda trial_name: StubManifest(max_score))
+    return set_max_score
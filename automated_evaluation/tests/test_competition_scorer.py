@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import random
+import shutil
+import subprocess
+
+import yaml
+
+from conftest import AUTOMATED_EVAL_FOLDER, make_trial_log, write_run
+
+TEAMS = ["alpha", "beta", "gamma"]
+TRIALS = [f"trial_{i}" for i in range(4)]
+
+# Scores a copy of the competition in a fresh process, so the pool forks from a parent with an open score index
+SCORE_SCRIPT = """
+import sys, json
+from competition_scorer import CompetitionScorer
+scorer = CompetitionScorer({teams}, {trials}, workers=int(sys.argv[1]))
+results = scorer.score_all()
+json.dump({{
+    "totals": scorer.get_total_scores(),
+    "trial_scores": {{trial: info.trial_scores for trial, info in results.items()}},
+    "best_logs": scorer.get_best_trial_logs(),
+    "raw_scores": scorer.get_total_raw_scores_by_team()
+}}, sys.stdout, sort_keys=True)
+"""
+
+def make_competition(root: str):
+    shutil.copytree(os.path.join(AUTOMATED_EVAL_FOLDER, "scoring"), os.path.join(root, "scoring"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(root, "trials"))
+
+    rng = random.Random(0)
+    for trial in TRIALS:
+        orders = [{"id": f"ORDER{i}", "type": "kitting", "priority": False,
+                   "kitting_task": {"products": [{"type": "battery"}] * 2}} for i in range(3)]
+        with open(os.path.join(root, "trials", trial + ".yaml"), "w") as file:
+            yaml.safe_dump({"orders": orders}, file)
+
+        for team in TEAMS:
+            for n in range(1, 4):
+                run_folder = write_run(os.path.join(root, "logs"), team, f"{trial}_{n}",
+                                       make_trial_log(trial, rng.uniform(100, 300), [rng.randint(0, 11) for _ in orders], 11))
+                with open(os.path.join(run_folder, "sensor_cost.txt"), "w") as file:
+                    file.write("\n" * 15 + f"Total cost: ${rng.choice([500, 1000, 1500])}\n")
+
+def score(root: str, workers: int) -> dict:
+    script = SCORE_SCRIPT.format(teams=TEAMS, trials=TRIALS)
+    output = subprocess.run([sys.executable, "-c", script, str(workers)], cwd=os.path.join(root, "scoring"),
+                            capture_output=True, text=True, check=True)
+    # Progress messages come before the results
+    return json.loads(output.stdout[output.stdout.index("{"):])
+
+def test_parallel_and_serial_scoring_agree(tmp_path):
+    root = str(tmp_path / "automated_evaluation")
+    make_competition(root)
+
+    serial = score(root, 1)
+    parallel = score(root, 3)
+
+    assert parallel == serial
+    assert set(serial["totals"]) == set(TEAMS)
+    assert all(log is not None for logs in serial["best_logs"].values() for log in logs.values())
@@ -0,0 +1,30 @@
+from conftest import make_trial_log, write_run
+from trial_scheduler import EarlyStopPolicy
+
+def test_single_max_score_run_does_not_stop(tmp_path, trial_max_score):
+    trial_max_score(10)
+    write_run(str(tmp_path), "team", "kitting_1", make_trial_log("kitting", 120.0, [10]))
+
+    assert not EarlyStopPolicy().should_stop("team", "kitting", str(tmp_path))
+    assert not EarlyStopPolicy(min_runs=1).should_stop("team", "kitting", str(tmp_path))
+
+def test_two_agreeing_max_score_runs_stop(tmp_path, trial_max_score):
+    trial_max_score(10)
+    write_run(str(tmp_path), "team", "kitting_1", make_trial_log("kitting", 120.0, [10]))
+    write_run(str(tmp_path), "team", "kitting_2", make_trial_log("kitting", 122.0, [10]))
+
+    assert EarlyStopPolicy().should_stop("team", "kitting", str(tmp_path))
+
+def test_runs_with_different_durations_do_not_stop(tmp_path, trial_max_score):
+    trial_max_score(10)
+    write_run(str(tmp_path), "team", "kitting_1", make_trial_log("kitting", 120.0, [10]))
+    write_run(str(tmp_path), "team", "kitting_2", make_trial_log("kitting", 150.0, [10]))
+
+    assert not EarlyStopPolicy().should_stop("team", "kitting", str(tmp_path))
+
+def test_runs_below_max_score_do_not_count(tmp_path, trial_max_score):
+    trial_max_score(10)
+    write_run(str(tmp_path), "team", "kitting_1", make_trial_log("kitting", 120.0, [10]))
+    write_run(str(tmp_path), "team", "kitting_2", make_trial_log("kitting", 120.0, [7]))
+
+    assert not EarlyStopPolicy().should_stop("team", "kitting", str(tmp_path))
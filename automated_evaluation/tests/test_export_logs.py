@@ -0,0 +1,64 @@
+import io
+import os
+import hashlib
+import tarfile
+from typing import Optional
+
+import pytest
+
+from export_logs import MANIFEST, ExportError, unpack_export
+
+def make_export(files: dict[str, bytes], manifest: Optional[str] = None) -> io.BytesIO:
+    # Same layout as export_logs.sh, the manifest first and paths relative to the run folder
+    if manifest is None:
+        manifest = "".join(f"{hashlib.sha256(data).hexdigest()}  {name}\n" for name, data in files.items())
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in [(MANIFEST, manifest.encode())] + list(files.items()):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+FILES = {"trial_log.txt": b"Trial Name: kitting\n", "state.log": b"<gazebo_log/>\n", "ros_log/launch.log": b"started\n"}
+
+def list_files(folder: str) -> dict[str, bytes]:
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as file:
+                files[os.path.relpath(path, folder)] = file.read()
+    return files
+
+def test_valid_export_is_unpacked_without_manifest(tmp_path):
+    run_folder = str(tmp_path / "kitting_1")
+
+    assert unpack_export(make_export(FILES), run_folder) == 3
+    assert list_files(run_folder) == FILES
+
+def test_checksum_mismatch_leaves_run_folder_untouched(tmp_path):
+    run_folder = tmp_path / "kitting_1"
+    run_folder.mkdir()
+    (run_folder / "trial_log.txt").write_bytes(b"previous\n")
+    manifest = "".join(f"{'0' * 64 if name == 'state.log' else hashlib.sha256(data).hexdigest()}  {name}\n"
+                       for name, data in FILES.items())
+
+    with pytest.raises(ExportError, match="Checksum mismatch for state.log"):
+        unpack_export(make_export(FILES, manifest), str(run_folder))
+    assert list_files(str(run_folder)) == {"trial_log.txt": b"previous\n"}
+
+def test_member_outside_the_run_folder_is_rejected(tmp_path):
+    run_folder = str(tmp_path / "logs" / "kitting_1")
+
+    with pytest.raises(ExportError, match="outside of the run folder"):
+        unpack_export(make_export({"../escaped.txt": b"x\n"}), run_folder)
+    assert not os.path.exists(tmp_path / "logs" / "escaped.txt")
+    assert not os.path.exists(run_folder)
+
+def test_empty_manifest_unpacks_nothing(tmp_path):
+    run_folder = str(tmp_path / "kitting_1")
+
+    assert unpack_export(make_export({}), run_folder) == 0
+    assert list_files(run_folder) == {}
@@ -0,0 +1,39 @@
+import os
+import sys
+
+from filter_jobs import FilterJob, run_filter_jobs
+
+def make_job(source: str, output: str) -> FilterJob:
+    command = [sys.executable, "-c", "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])", source, output]
+    return FilterJob("team", "kitting", source, output, command)
+
+def write(path: str, data: str, mtime: float):
+    with open(path, "w") as file:
+        file.write(data)
+    os.utime(path, (mtime, mtime))
+
+def test_output_is_reused_only_for_the_same_source(tmp_path):
+    old_run, new_run, output = str(tmp_path / "old.log"), str(tmp_path / "new.log"), str(tmp_path / "filtered.log")
+    write(old_run, "old run", 1_000_000)
+    write(new_run, "new run", 2_000_000)
+
+    run_filter_jobs([make_job(new_run, output)])
+    assert open(output).read() == "new run"
+
+    # Up to date for the same source
+    job = make_job(new_run, output)
+    run_filter_jobs([job])
+    assert job.skipped
+
+    # The best run switched to an older run folder, whose state log is older than the output
+    job = make_job(old_run, output)
+    run_filter_jobs([job])
+    assert not job.skipped and job.exit_code == 0
+    assert open(output).read() == "old run"
+
+    # The source changed after it was filtered
+    write(old_run, "old run, rewritten", 3_000_000)
+    job = make_job(old_run, output)
+    run_filter_jobs([job])
+    assert not job.skipped
+    assert open(output).read() == "old run, rewritten"
@@ -0,0 +1,40 @@
+import time
+import threading
+
+import pytest
+
+from log_watch import HealthCheck, InotifyWatcher, PollingWatcher, wait_for_file
+
+TRIAL_LOG = "Trial Name: kitting\nTrial Duration: 120.000\n"
+
+def write_slowly(path: str, delay: float):
+    with open(path, "w") as file:
+        file.write(TRIAL_LOG[:12])
+        file.flush()
+        time.sleep(delay)
+        file.write(TRIAL_LOG[12:])
+
+# inotify waits for the file to be closed, polling only sees pauses shorter than the stable interval
+@pytest.mark.parametrize("watcher, delay", [(InotifyWatcher, 1.0), (PollingWatcher, 0.3)])
+def test_wait_for_file_waits_until_written(tmp_path, monkeypatch, watcher, delay):
+    monkeypatch.setattr("log_watch.create_watcher", watcher)
+    path = str(tmp_path / "trial_log.txt")
+    writer = threading.Thread(target=write_slowly, args=(path, delay))
+
+    threading.Timer(0.2, writer.start).start()
+    assert wait_for_file(path, HealthCheck(lambda: True, interval=30.0))
+
+    with open(path) as file:
+        assert file.read() == TRIAL_LOG
+    writer.join()
+
+def test_wait_for_file_accepts_a_file_written_before_the_watch(tmp_path):
+    path = tmp_path / "trial_log.txt"
+    path.write_text(TRIAL_LOG)
+
+    start = time.monotonic()
+    assert wait_for_file(str(path), HealthCheck(lambda: True, interval=30.0))
+    assert time.monotonic() - start < 5.0
+
+def test_wait_for_file_ends_when_the_health_check_fails(tmp_path):
+    assert not wait_for_file(str(tmp_path / "trial_log.txt"), HealthCheck(lambda: False, interval=0.1))
@@ -0,0 +1,66 @@
+import sys
+import threading
+
+from parallel_recording import LocalPlaybackBackend, RecordingJob, record_in_parallel
+from recording import SyntheticFrameSource
+
+class FakeDisplay():
+    """Display that needs no X server, the synthetic frames do not come from it"""
+
+    def __init__(self, number: int, resolution: tuple[int, int]):
+        self.name = f":{number}"
+
+    def __enter__(self) -> "FakeDisplay":
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+class TrackingBackend(LocalPlaybackBackend):
+    def __init__(self):
+        super().__init__(lambda team, trial, display: [sys.executable, "-c", "import time; time.sleep(30)"])
+        self.lock = threading.Lock()
+        self.playing: list[str] = []
+        self.peak = 0
+        self.overlapping_teams = False
+        self.displays: list[str] = []
+        self.stopped = 0
+
+    def start_playback(self, team, trial, display, slot):
+        with self.lock:
+            self.overlapping_teams = self.overlapping_teams or team in self.playing
+            self.playing.append(team)
+            self.peak = max(self.peak, len(self.playing))
+            self.displays.append(display)
+        return super().start_playback(team, trial, display, slot)
+
+    def stop_playback(self, team, process):
+        super().stop_playback(team, process)
+        with self.lock:
+            self.playing.remove(team)
+            self.stopped += 1
+
+def write_state_log(path: str, seconds: float):
+    states = "".join(f"<sdf version='1.6'><state world_name='default'><sim_time>0 {int(t * 1e9)}</sim_time></state></sdf>"
+                     for t in (0.0, seconds))
+    with open(path, "w") as file:
+        file.write(f"<?xml version='1.0'?>\n<gazebo_log>\n<chunk encoding='txt'><![CDATA[{states}]]></chunk>\n</gazebo_log>\n")
+
+def test_record_in_parallel(tmp_path):
+    state_log = str(tmp_path / "state.log")
+    write_state_log(state_log, 0.3)
+    jobs = [RecordingJob(team, trial, state_log, str(tmp_path / f"{team}_{trial}.avi"))
+            for trial in ("kitting", "assembly") for team in ("alpha", "beta", "gamma")]
+    backend = TrackingBackend()
+
+    # The pause button the playback start is detected from is placed for 1920x1080 captures
+    record_in_parallel(jobs, backend, max_parallel=2, resolution=(1920, 1080), fps=30, startup_timeout=5.0,
+                       frame_source_factory=lambda display, resolution, fps: SyntheticFrameSource(resolution, 0.01, window_delay=0.1),
+                       output_resolution=(320, 180), display_factory=FakeDisplay)
+
+    assert all(job.error is None and job.stats is not None and job.stats.written > 0 for job in jobs)
+    assert all((tmp_path / f"{job.team}_{job.trial}.avi").exists() for job in jobs)
+    # Two at once, and never two playbacks in the same team container
+    assert backend.peak == 2
+    assert not backend.overlapping_teams
+    assert backend.stopped == len(jobs) and not backend.playing
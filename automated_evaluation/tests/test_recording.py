@@ -0,0 +1,83 @@
+import pytest
+
+from recording import PlaybackDeadline, RecordingPipeline, SyntheticFrameSource, get_timecodes_path
+
+class CountingWriter():
+    def __init__(self, filename: str, fps: float, resolution: tuple[int, int]):
+        self.frames = 0
+        self.released = False
+
+    def write(self, frame):
+        self.frames += 1
+
+    def release(self):
+        self.released = True
+
+def test_deadline_counts_from_playback_start():
+    source = SyntheticFrameSource(window_delay=0.0)
+    blank = SyntheticFrameSource().grab()
+    deadline = PlaybackDeadline(10.0, startup_timeout=60.0, margin=1.0)
+
+    # The window only shows up 30s into the recording, later than any fixed startup time would allow for
+    assert not deadline(blank, 0.0)
+    assert not deadline(blank, 30.0)
+    assert not deadline(source.grab(), 30.5)
+    assert deadline.started_at == 30.5
+    assert not deadline(source.grab(), 41.0)
+    assert deadline(source.grab(), 41.5)
+
+def test_deadline_counts_from_startup_timeout_without_a_window():
+    blank = SyntheticFrameSource().grab()
+    deadline = PlaybackDeadline(10.0, startup_timeout=5.0, margin=1.0)
+
+    assert not deadline(blank, 0.0)
+    assert not deadline(blank, 5.0)
+    assert deadline.started_at == 5.0
+    assert not deadline(blank, 15.5)
+    assert deadline(blank, 16.0)
+
+def test_deadline_uses_fallback_without_playback_length():
+    calls = []
+    deadline = PlaybackDeadline(None, fallback=lambda frame, elapsed: calls.append(elapsed) or elapsed > 1.0)
+
+    assert not deadline(SyntheticFrameSource().grab(), 0.5)
+    assert deadline(SyntheticFrameSource().grab(), 2.0)
+    assert calls == [0.5, 2.0]
+
+def test_pipeline_records_until_playback_ends(tmp_path):
+    source = SyntheticFrameSource(capture_time=0.01, window_delay=0.5)
+    deadline = PlaybackDeadline(0.5, startup_timeout=10.0, margin=0.1)
+    pipeline = RecordingPipeline(source, str(tmp_path / "recording.avi"), fps=30, stop_condition=deadline,
+                                 resolution=(320, 180))
+
+    stats = pipeline.record(duration=10.0)
+
+    assert deadline.started_at == pytest.approx(0.5, abs=0.2)
+    assert stats.duration == pytest.approx(1.1, abs=0.3)
+    assert stats.written > 0
+
+def test_dedupe_writes_changed_frames_with_timecodes(tmp_path):
+    writers = []
+    def writer_factory(filename, fps, resolution):
+        writers.append(CountingWriter(filename, fps, resolution))
+        return writers[-1]
+
+    filename = str(tmp_path / "recording.avi")
+    source = SyntheticFrameSource((320, 180), capture_time=0.005, change_every=8)
+    pipeline = RecordingPipeline(source, filename, fps=30, writer_factory=writer_factory, dedupe=True)
+
+    stats = pipeline.record(duration=1.0)
+
+    assert stats.held > 0
+    assert writers[0].released and writers[0].frames == stats.written
+
+    with open(get_timecodes_path(filename)) as file:
+        lines = file.read().splitlines()
+    assert lines[0] == "# timecode format v2"
+    timestamps = [float(line) for line in lines[1:]]
+    assert len(timestamps) == stats.written
+    assert all(a < b for a, b in zip(timestamps, timestamps[1:]))
+
+    # The last frame is held until the slot the recording stopped in
+    stop_slot = int((pipeline._stop_time - pipeline._start_time) * pipeline.fps)
+    assert timestamps[-1] == pytest.approx(stop_slot / pipeline.fps * 1000, abs=0.001)
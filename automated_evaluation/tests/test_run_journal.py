@@ -0,0 +1,84 @@
+import os
+import json
+
+from run_journal import RunJournal
+from trial_scheduler import FakeContainerBackend, ResourceBudget, TrialScheduler
+
+TEAMS = ["team0", "team1"]
+TRIALS = ["kitting", "assembly"]
+JOB = {"teams": TEAMS, "trials": TRIALS, "iterations": 2, "max_iterations": 3, "early_stop": False}
+
+class InterruptedBackend(FakeContainerBackend):
+    """Fake backend that fails every run after the first few, like a host going down mid competition"""
+
+    def __init__(self, logs_folder: str, interrupt_after: int):
+        super().__init__(logs_folder, run_time=0.0)
+        self.interrupt_after = interrupt_after
+
+    def run_trial(self, team_name: str, trial_name: str, env: dict[str, str]) -> int:
+        if self.runs >= self.interrupt_after:
+            raise RuntimeError("host went down")
+        return super().run_trial(team_name, trial_name, env)
+
+def make_scheduler(logs_folder: str, backend: FakeContainerBackend, journal: RunJournal) -> TrialScheduler:
+    budgets = {team: ResourceBudget(1, 1) for team in TEAMS}
+    return TrialScheduler(backend, TEAMS, TRIALS, JOB["iterations"], JOB["max_iterations"], 1, budgets=budgets,
+                          capacity=ResourceBudget(8, 64), logs_folder=logs_folder, log_timeout=0.5, journal=journal)
+
+def count_run_folders(logs_folder: str, team: str, trial: str) -> int:
+    team_folder = os.path.join(logs_folder, team)
+    if not os.path.isdir(team_folder):
+        return 0
+    return len([name for name in os.listdir(team_folder) if name.rsplit("_", 1)[0] == trial])
+
+def test_resume_only_runs_outstanding_trials(tmp_path):
+    logs_folder = str(tmp_path / "logs")
+    journal = RunJournal(logs_folder)
+    journal.start(JOB)
+    make_scheduler(logs_folder, InterruptedBackend(logs_folder, interrupt_after=3), journal).run()
+
+    # A run that was interrupted before it was recorded leaves its folder behind
+    os.makedirs(os.path.join(logs_folder, "team0", "assembly_7"))
+
+    journal = RunJournal(logs_folder)
+    assert journal.check_resume(JOB)[0]
+    recorded = {(team, trial): journal.get_progress(team, trial).completed_runs for team in TEAMS for trial in TRIALS}
+    assert sum(recorded.values()) == 3
+    assert journal.outstanding(TEAMS, TRIALS)
+
+    backend = FakeContainerBackend(logs_folder, run_time=0.0)
+    results = make_scheduler(logs_folder, backend, journal).run()
+
+    assert backend.runs == len(TEAMS) * len(TRIALS) * JOB["iterations"] - sum(recorded.values())
+    assert not os.path.exists(os.path.join(logs_folder, "team0", "assembly_7"))
+    for team in TEAMS:
+        assert results[team].completed_runs == {trial: JOB["iterations"] for trial in TRIALS}
+        assert all(count_run_folders(logs_folder, team, trial) == JOB["iterations"] for trial in TRIALS)
+
+    # Everything is in the journal now, a third start runs nothing
+    journal = RunJournal(logs_folder)
+    assert journal.outstanding(TEAMS, TRIALS) == []
+    backend = FakeContainerBackend(logs_folder, run_time=0.0)
+    make_scheduler(logs_folder, backend, journal).run()
+    assert backend.runs == 0
+
+def test_check_resume_explains_why_not(tmp_path):
+    logs_folder = str(tmp_path / "logs")
+
+    resume, reason = RunJournal(logs_folder).check_resume(JOB)
+    assert not resume and "no run journal" in reason
+
+    journal = RunJournal(logs_folder)
+    journal.start(JOB)
+    assert RunJournal(logs_folder).check_resume(JOB) == (True, f"{journal.path} is from the same job")
+
+    resume, reason = RunJournal(logs_folder).check_resume(dict(JOB, iterations=5, trials=["kitting"]))
+    assert not resume and reason.endswith("different trials, iterations")
+
+    # The start line was cut short by a crash
+    with open(journal.path, "w") as file:
+        file.write(json.dumps({"event": "start", "job": JOB})[:30])
+    journal = RunJournal(logs_folder)
+    resume, reason = journal.check_resume(JOB)
+    assert not resume and "no readable job" in reason
+    assert journal.unreadable_lines == 1
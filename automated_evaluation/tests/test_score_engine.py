@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from structs import OrderInfo, OrderSubmission, TeamSubmission
+from score_engine import TrialScoreMatrix, sweep_weights
+
+TEAMS = ["team0", "team1", "team2", "team3"]
+
+def loop_scores(order_info: list[OrderInfo], submissions: dict[str, TeamSubmission], wc: float, wt: float) -> dict[str, float]:
+    # The per-order scoring loop score_trial used before the score engine
+    costs = [submission.sensor_cost for submission in submissions.values()
+             if sum(0 if order is None else order.raw_score for order in submission.order_submissions.values())]
+    average_cost = sum(costs) / len(costs) if costs else 0
+
+    average_durations = {}
+    for order in order_info:
+        durations = [submission.order_submissions[order.order_id].completion_duration for submission in submissions.values()
+                     if submission.order_submissions[order.order_id] is not None]
+        average_durations[order.order_id] = sum(durations) / len(durations) if durations else 0
+
+    scores = {}
+    for team, submission in submissions.items():
+        score = 0
+        for order in order_info:
+            order_submission = submission.order_submissions[order.order_id]
+            if order_submission is None or order_submission.completion_duration == 0:
+                continue
+            efficiency_factor = wt * (average_durations[order.order_id] / order_submission.completion_duration)
+            score += (3 if order.priority else 1) * efficiency_factor * order_submission.raw_score
+        scores[team] = score * wc * (average_cost / submission.sensor_cost)
+    return scores
+
+def make_trial(seed: int, teams: list[str] = TEAMS) -> tuple[list[OrderInfo], dict[str, TeamSubmission]]:
+    rng = random.Random(seed)
+    order_info = [OrderInfo(f"ORDER{i}", i == 1, 10) for i in range(3)]
+    submissions = {}
+    for team in teams:
+        order_submissions = {}
+        for order in order_info:
+            # Some orders are not submitted and some runs log a zero duration
+            if rng.random() < 0.2:
+                order_submissions[order.order_id] = None
+            else:
+                duration = 0.0 if rng.random() < 0.1 else rng.uniform(20, 200)
+                order_submissions[order.order_id] = OrderSubmission(rng.randint(0, 10), duration)
+        submissions[team] = TeamSubmission(order_submissions, rng.randint(500, 2000))
+    return order_info, submissions
+
+def test_zero_duration_and_missing_orders_match_loop():
+    order_info = [OrderInfo("ORDER0", False, 10), OrderInfo("ORDER1", True, 10)]
+    submissions = {
+        "team0": TeamSubmission({"ORDER0": OrderSubmission(8, 0.0), "ORDER1": OrderSubmission(10, 60.0)}, 1000),
+        "team1": TeamSubmission({"ORDER0": OrderSubmission(6, 40.0), "ORDER1": None}, 800),
+        "team2": TeamSubmission({"ORDER0": None, "ORDER1": None}, 1200)
+    }
+
+    scores = TrialScoreMatrix.from_submissions(order_info, submissions).score_dict(0.5, 2.0)
+
+    assert scores == pytest.approx(loop_scores(order_info, submissions, 0.5, 2.0))
+    assert scores["team2"] == 0
+
+@pytest.mark.parametrize("wc, wt", [(1.0, 1.0), (0.5, 2.0), (3.0, 0.25)])
+@pytest.mark.parametrize("seed", range(4))
+def test_score_dict_matches_loop(seed, wc, wt):
+    order_info, submissions = make_trial(seed)
+
+    scores = TrialScoreMatrix.from_submissions(order_info, submissions).score_dict(wc, wt)
+
+    assert scores == pytest.approx(loop_scores(order_info, submissions, wc, wt))
+
+def test_sweep_weights_matches_scoring_each_combination():
+    # team3 has no submission for the last trial and scores zero for it
+    trials = [make_trial(seed) for seed in range(3)] + [make_trial(3, TEAMS[:3])]
+    matrices = [TrialScoreMatrix.from_submissions(order_info, submissions) for order_info, submissions in trials]
+    wc = np.array([[0.5], [1.0], [2.0]])
+    wt = np.array([0.25, 1.0, 4.0, 8.0])
+
+    totals, rankings = sweep_weights(matrices, TEAMS, wc, wt)
+
+    assert totals.shape == rankings.shape == (3, 4, len(TEAMS))
+    for i in range(3):
+        for j in range(4):
+            expected = {team: 0.0 for team in TEAMS}
+            for order_info, submissions in trials:
+                for team, score in loop_scores(order_info, submissions, wc[i, 0], wt[j]).items():
+                    expected[team] += score
+            assert totals[i, j] == pytest.approx([expected[team] for team in TEAMS])
+            assert [TEAMS[k] for k in rankings[i, j]] == sorted(TEAMS, key=lambda team: -expected[team])
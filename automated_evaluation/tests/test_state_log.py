@@ -0,0 +1,131 @@
+import bz2
+import zlib
+import base64
+
+import pytest
+
+from state_log import decode_chunk, filter_state_log, iter_log_parts
+from seekable_log import SeekableStateLog, compress_state_log
+
+PROLOGUE = "<?xml version='1.0'?>\n<gazebo_log>\n<header><log_version>1.0</log_version></header>\n"
+
+# A world description that holds a <state> of its own, as worlds saved from Gazebo do
+WORLD = ('<sdf version="1.6"><world name="default"><physics type="ode"/>'
+         '<state world_name="default"><sim_time>0 0</sim_time><model name="box"><pose>0 0 0 0 0 0</pose></model></state>'
+         '<model name="box"><link name="link"/></model></world></sdf>')
+
+def make_model(name: str, x: float, full: bool) -> str:
+    pose = f"<pose>{x:.3f} 0 0 0 0 0</pose>"
+    extra_model = "<scale>1 1 1</scale>" if full else ""
+    extra_link = "<velocity>0 0 0 0 0 0</velocity><acceleration>0 0 0 0 0 0</acceleration><wrench>0 0 0 0 0 0</wrench>" if full else ""
+    return f'<model name="{name}">{pose}{extra_model}<link name="link">{pose}{extra_link}</link></model>'
+
+def make_state(step: int, full: bool, insertions: str = "", deletions: str = "") -> str:
+    # One step is 10ms of sim time
+    sec, nsec = divmod(step * 10_000_000, 1_000_000_000)
+    header = f"<sim_time>{sec} {nsec}</sim_time><real_time>{sec} {nsec}</real_time><wall_time>{sec} {nsec}</wall_time><iterations>{step}</iterations>"
+    changes = (f"<insertions>{insertions}</insertions>" if insertions else "") + (f"<deletions>{deletions}</deletions>" if deletions else "")
+    return f'<sdf version="1.6"><state world_name="default">{header}{changes}{make_model("box", step / 100, full)}</state></sdf>'
+
+def make_chunk(data: str, encoding: str) -> str:
+    if encoding == "zlib":
+        data = base64.b64encode(zlib.compress(data.encode())).decode()
+    elif encoding == "bz2":
+        data = base64.b64encode(bz2.compress(data.encode())).decode()
+    return f"<chunk encoding='{encoding}'><![CDATA[{data}]]></chunk>\n"
+
+def write_log(path: str, states: list[str], encoding: str, states_per_chunk: int = 3):
+    with open(path, "w") as file:
+        file.write(PROLOGUE)
+        file.write(make_chunk(WORLD, encoding))
+        for i in range(0, len(states), states_per_chunk):
+            file.write(make_chunk("".join(states[i:i + states_per_chunk]), encoding))
+        file.write("</gazebo_log>\n")
+
+def read_filtered(path: str) -> tuple[list[str], list[str]]:
+    chunks = []
+    with open(path, "rb") as file:
+        for kind, data in iter_log_parts(file):
+            if kind == "chunk":
+                chunks.append(decode_chunk(data))
+    states = []
+    for chunk in chunks[1:]:
+        states += ["<sdf" + block for block in chunk.split("<sdf")[1:]]
+    return chunks, states
+
+def test_log_parts_do_not_depend_on_block_size(tmp_path):
+    source = str(tmp_path / "state.log")
+    write_log(source, [make_state(step, True) for step in range(10)], "zlib", states_per_chunk=2)
+
+    with open(source, "rb") as file:
+        expected = list(iter_log_parts(file))
+    assert [kind for kind, _ in expected] == ["prologue"] + ["chunk"] * 6 + ["epilogue"]
+    assert expected[-1] == ("epilogue", b"</gazebo_log>")
+    # Chunk markers split across blocks
+    for block_size in (1, 7, 100):
+        with open(source, "rb") as file:
+            assert list(iter_log_parts(file, block_size)) == expected
+
+INSERTED = '<model name="part"><pose>1 1 0 0 0 0</pose><link name="link"><visual name="v" /></link></model>'
+
+@pytest.mark.parametrize("encoding", ["txt", "zlib", "bz2"])
+def test_filter_keeps_poses_of_every_state(tmp_path, encoding):
+    source, output = str(tmp_path / "state.log"), str(tmp_path / "filtered.log")
+    write_log(source, [make_state(step, True) for step in range(10)], encoding)
+
+    assert filter_state_log(source, output, hz=0) == (10, 10)
+
+    chunks, states = read_filtered(output)
+    assert chunks[0] == WORLD
+    assert states == [make_state(step, False) for step in range(10)]
+
+@pytest.mark.parametrize("encoding", ["txt", "zlib", "bz2"])
+def test_filter_resamples_and_keeps_insertions(tmp_path, encoding):
+    source, output = str(tmp_path / "state.log"), str(tmp_path / "filtered.log")
+    states = [make_state(step, True, insertions=INSERTED if step == 3 else "") for step in range(20)]
+    write_log(source, states, encoding)
+
+    # 100Hz down to 20Hz, the insertion is kept and the rate counts from it
+    assert filter_state_log(source, output, hz=20) == (20, 5)
+
+    chunks, states = read_filtered(output)
+    assert chunks[0] == WORLD
+    assert states == [make_state(step, False, insertions=INSERTED if step == 3 else "") for step in (0, 3, 8, 13, 18)]
+
+def make_window_states(full: bool) -> list[str]:
+    # The part is inserted at 30ms and the box of the world deleted at 50ms, both before the window
+    states = []
+    for step in range(20):
+        insertions = INSERTED if step == 3 and full else ""
+        deletions = "<name>box</name>" if step == 5 and full else ""
+        states.append(make_state(step, full, insertions, deletions))
+    return states
+
+@pytest.mark.parametrize("seekable", [False, True])
+def test_window_carries_changes_into_first_state(tmp_path, seekable):
+    source, output = str(tmp_path / "state.log"), str(tmp_path / "filtered.log")
+    write_log(source, make_window_states(True), "zlib", states_per_chunk=1)
+    if seekable:
+        compressed = source + ".sz"
+        # Small frames, so the frames holding the changes lie before the window
+        compress_state_log(source, compressed, frame_size=1024)
+        assert any(frame.end is not None and frame.end < 0.1 for frame in SeekableStateLog(compressed).frames)
+        source = compressed
+
+    assert filter_state_log(source, output, hz=0, start=0.1, end=0.155)[1] == 6
+
+    _, states = read_filtered(output)
+    expected = [make_state(step, False) for step in range(10, 16)]
+    expected[0] = make_state(10, False, insertions=INSERTED, deletions="<name>box</name>")
+    assert states == expected
+
+def test_window_drops_models_inserted_and_deleted_before_it(tmp_path):
+    source, output = str(tmp_path / "state.log"), str(tmp_path / "filtered.log")
+    states = [make_state(step, True, insertions=INSERTED if step == 2 else "", deletions="<name>part</name>" if step == 4 else "")
+              for step in range(10)]
+    write_log(source, states, "txt")
+
+    filter_state_log(source, output, hz=0, start=0.05)
+
+    _, states = read_filtered(output)
+    assert states == [make_state(step, False) for step in range(5, 10)]
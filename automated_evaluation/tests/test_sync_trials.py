@@ -0,0 +1,50 @@
+import io
+import tarfile
+import subprocess
+from typing import Optional
+
+import sync_trials
+from sync_trials import build_archive, sync_folder
+
+FOLDER = "/workspace/install/ariac_gazebo/share/ariac_gazebo/config/trials"
+
+def make_container_folder(files: dict[str, bytes]) -> bytes:
+    # docker cp puts the copied folder at the top of the tar stream
+    return build_archive({f"trials/{name}": data for name, data in files.items()})
+
+class FakeDocker():
+    def __init__(self, files: dict[str, bytes]):
+        self.folder = make_container_folder(files)
+        self.commands: list[list[str]] = []
+        self.copied: list[str] = []
+
+    def run(self, command: list[str], input: Optional[bytes] = None, capture_output: bool = False) -> subprocess.CompletedProcess:
+        self.commands.append(command)
+        stdout = b""
+        if command[:2] == ["docker", "cp"] and command[3] == "-":
+            stdout = self.folder
+        elif command[:2] == ["docker", "cp"]:
+            with tarfile.open(fileobj=io.BytesIO(input), mode="r:") as archive:
+                self.copied = archive.getnames()
+        return subprocess.CompletedProcess(command, 0, stdout, b"")
+
+def test_sync_folder_diffs_by_content(monkeypatch):
+    docker = FakeDocker({"kitting.yaml": b"order: 1\n", "assembly.yaml": b"order: 2\n", "old.yaml": b"order: 3\n"})
+    monkeypatch.setattr(sync_trials.subprocess, "run", docker.run)
+    host = {"kitting.yaml": b"order: 1\n", "assembly.yaml": b"order: 5\n", "combined.yaml": b"order: 4\n"}
+
+    changed, removed = sync_folder("team", FOLDER, host)
+
+    assert changed == ["assembly.yaml", "combined.yaml"]
+    assert removed == ["old.yaml"]
+    assert sorted(docker.copied) == ["assembly.yaml", "combined.yaml"]
+    assert docker.commands[-1] == ["docker", "exec", "team", "rm", "-f", f"{FOLDER}/old.yaml"]
+
+def test_sync_folder_dry_run_changes_nothing(monkeypatch):
+    docker = FakeDocker({"kitting.yaml": b"order: 1\n", "old.yaml": b"order: 3\n"})
+    monkeypatch.setattr(sync_trials.subprocess, "run", docker.run)
+
+    changed, removed = sync_folder("team", FOLDER, {"kitting.yaml": b"order: 2\n"}, dry_run=True)
+
+    assert (changed, removed) == (["kitting.yaml"], ["old.yaml"])
+    assert docker.commands == [["docker", "cp", f"team:{FOLDER}", "-"]]
@@ -0,0 +1,82 @@
+import os
+
+from conftest import make_trial_log
+from trial_scheduler import EarlyStopPolicy, FakeContainerBackend, ResourceBudget, TrialScheduler
+
+TEAMS = [f"team{i}" for i in range(6)]
+TRIALS = ["kitting", "assembly"]
+
+def make_scheduler(logs_folder: str, backend: FakeContainerBackend, num_iter: int = 2, max_iter: int = 4,
+                   max_parallel: int = 2, cpus: float = 4, capacity: float = 64, **kwargs) -> TrialScheduler:
+    budgets = {team: ResourceBudget(cpus, 8) for team in TEAMS}
+    return TrialScheduler(backend, TEAMS, TRIALS, num_iter, max_iter, max_parallel, budgets=budgets,
+                          capacity=ResourceBudget(capacity, 1024), logs_folder=logs_folder, log_timeout=0.5, **kwargs)
+
+def count_run_folders(logs_folder: str, team: str, trial: str) -> int:
+    team_folder = os.path.join(logs_folder, team)
+    if not os.path.isdir(team_folder):
+        return 0
+    return len([name for name in os.listdir(team_folder) if name.rsplit("_", 1)[0] == trial])
+
+def test_max_parallel_is_respected(tmp_path):
+    backend = FakeContainerBackend(str(tmp_path), run_time=0.05)
+    results = make_scheduler(str(tmp_path), backend, max_parallel=3).run()
+
+    assert backend.peak_running == 3
+    assert all(result.completed_runs == {trial: 2 for trial in TRIALS} for result in results.values())
+
+def test_resource_budgets_are_respected(tmp_path):
+    # Four slots, but only two teams fit in the CPUs of the host at once
+    backend = FakeContainerBackend(str(tmp_path), run_time=0.05)
+    make_scheduler(str(tmp_path), backend, max_parallel=4, cpus=4, capacity=8).run()
+
+    assert backend.peak_running == 2
+
+def test_team_larger_than_the_host_runs_alone(tmp_path):
+    backend = FakeContainerBackend(str(tmp_path), run_time=0.02)
+    results = make_scheduler(str(tmp_path), backend, max_parallel=4, cpus=16, capacity=8).run()
+
+    assert backend.peak_running == 1
+    assert all(sum(result.completed_runs.values()) == 4 for result in results.values())
+
+def test_failed_runs_are_retried_up_to_max_iter(tmp_path):
+    backend = FakeContainerBackend(str(tmp_path), run_time=0.0, failure_rate=0.4, seed=3)
+    results = make_scheduler(str(tmp_path), backend, num_iter=3, max_iter=5).run()
+
+    runs = 0
+    for team, result in results.items():
+        for trial in TRIALS:
+            completed, trial_runs = result.completed_runs[trial], result.trial_runs[trial]
+            # Failed runs are deleted, only the completed ones stay on disk
+            assert completed == count_run_folders(str(tmp_path), team, trial)
+            assert completed <= trial_runs <= 5
+            assert completed == 3 or trial_runs == 5
+            runs += trial_runs
+    assert runs == backend.runs
+    assert any(result.trial_runs[trial] > result.completed_runs[trial] for result in results.values() for trial in TRIALS)
+
+def test_trials_that_always_fail_stop_at_max_iter(tmp_path):
+    backend = FakeContainerBackend(str(tmp_path), run_time=0.0, failure_rate=1.0)
+    results = make_scheduler(str(tmp_path), backend, num_iter=2, max_iter=3).run()
+
+    for team, result in results.items():
+        assert result.completed_runs == {trial: 0 for trial in TRIALS}
+        assert result.trial_runs == {trial: 3 for trial in TRIALS}
+        assert all(count_run_folders(str(tmp_path), team, trial) == 0 for trial in TRIALS)
+
+def test_early_stop_keeps_run_counts(tmp_path, trial_max_score):
+    trial_max_score(10)
+    trial_log = tmp_path / "trial_log.txt"
+    trial_log.write_text(make_trial_log("kitting", 120.0, [10]))
+    logs_folder = str(tmp_path / "logs")
+
+    backend = FakeContainerBackend(logs_folder, run_time=0.0, trial_log=str(trial_log))
+    results = make_scheduler(logs_folder, backend, num_iter=5, max_iter=8, early_stop=EarlyStopPolicy()).run()
+
+    # Two max score runs with the same duration are enough to settle the best run
+    for team, result in results.items():
+        assert result.completed_runs == {trial: 2 for trial in TRIALS}
+        assert result.trial_runs == {trial: 2 for trial in TRIALS}
+        assert result.stopped_early == TRIALS
+        assert all(count_run_folders(logs_folder, team, trial) == 2 for trial in TRIALS)
+    assert backend.runs == len(TEAMS) * len(TRIALS) * 2
@@ -0,0 +1,569 @@
+import os
+import re
+import sys
+import json
+import shutil
+import random
+import subprocess
+import threading
+from time import sleep, time
+from typing import Optional
+
+import yaml
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring"))
+from log_parser import parse_trial_log
+from trial_manifest import get_trial_manifest
+from run_journal import RunJournal
+
+DEFAULT_CPUS = 4.0
+DEFAULT_MEMORY_GB = 8.0
+
+GAZEBO_MASTER_PORT = 11345
+
+# Run state of the previous trial, removed before a warm run
+WARM_RESET_PATHS = ["/tmp/trial_log.txt", "/tmp/sensor_cost.txt", "/tmp/state.log", "/tmp/readiness.json", "/root/.ros/log",
+                    "/root/.gazebo/log", "/dev/shm/fastrtps_*", "/dev/shm/sem.fastrtps_*"]
+
+print_lock = threading.Lock()
+
+class bcolors:
+    HEADER = "\033[95m"
+    OKBLUE = "\033[94m"
+    OKCYAN = "\033[96m"
+    OKGREEN = "\033[92m"
+    WARNING = "\033[93m"
+    FAIL = "\033[91m"
+    ENDC = "\033[0m"
+    BOLD = "\033[1m"
+    UNDERLINE = "\033[4m"
+
+def log(*args):
+    with print_lock:
+        print(*args, flush=True)
+
+def get_logs_folder() -> str:
+    return os.path.join(os.getcwd(), "logs")
+
+def trial_succeeded(trial_log: str) -> bool:
+    if os.path.exists(trial_log):
+        with open(trial_log, "r") as file:
+            if len(file.readlines()) > 1:
+                return True
+            else:
+                return False
+
+    log(bcolors.FAIL+"Unable to find most log file for most recent run"+bcolors.ENDC)
+    return False
+
+def get_most_recent_trial_log(team_name: str, trial_name: str, logs_folder: Optional[str] = None) -> str:
+    most_recent_trial_folder = get_most_recent_trial_folder(team_name, trial_name, logs_folder)
+
+    trial_log = os.path.join(most_recent_trial_folder, "trial_log.txt")
+
+    return trial_log
+
+def get_most_recent_trial_folder(team_name: str, trial_name: str, logs_folder: Optional[str] = None):
+    logs_folder = logs_folder if logs_folder is not None else get_logs_folder()
+    folders = [file.path for file in os.scandir(os.path.join(logs_folder, team_name))]
+
+    trial_folders = filter(lambda x: trial_name in x, folders)
+
+    return sorted(trial_folders, key=lambda x: int(x.split("_")[-1]))[-1]
+
+def wait_for_trial_log(team_name: str, trial_name: str, logs_folder: Optional[str] = None,
+                       timeout: float = 10.0, interval: float = 0.1) -> Optional[str]:
+
+    """Waits for the trial log of the most recent run to be copied out of the container
+
+    Args:
+        team_name (str): name of the team
+        trial_name (str): name of the trial
+        logs_folder (Optional[str]): logs folder with a folder per team
+        timeout (float): maximum time to wait in seconds
+        interval (float): time between checks in seconds
+
+    Returns:
+        Optional[str]: path of the trial log, None if the run has no log folder
+    """
+
+    deadline = time() + timeout
+    while True:
+        try:
+            trial_log = get_most_recent_trial_log(team_name, trial_name, logs_folder)
+        except (OSError, IndexError):
+            trial_log = None
+        if (trial_log is not None and os.path.exists(trial_log)) or time() >= deadline:
+            return trial_log
+        sleep(interval)
+
+def record_run_timings(trial_log: str, timings: dict[str, float]):
+    # Added to the readiness timings the container measured for the run
+    readiness_file = os.path.join(os.path.dirname(trial_log), "readiness.json")
+    try:
+        with open(readiness_file) as file:
+            readiness = json.load(file)
+    except (IOError, ValueError):
+        readiness = {}
+    readiness.update({name: round(value, 3) for name, value in timings.items()})
+    try:
+        with open(readiness_file, "w") as file:
+            json.dump(readiness, file)
+    except IOError as e:
+        log(bcolors.WARNING+f"Unable to write {readiness_file}: {e}"+bcolors.ENDC)
+
+def delete_most_recent_trial_folder(team_name: str, trial_name: str, logs_folder: Optional[str] = None):
+    try:
+        os.system(f"rm -rf {get_most_recent_trial_folder(team_name, trial_name, logs_folder)}")
+    except (OSError, IndexError):
+        pass
+
+class ResourceBudget():
+    def __init__(self, cpus: float, memory_gb: float):
+        self.cpus = cpus
+        self.memory_gb = memory_gb
+
+    def fits(self, used: "ResourceBudget", capacity: "ResourceBudget") -> bool:
+        return used.cpus + self.cpus <= capacity.cpus and used.memory_gb + self.memory_gb <= capacity.memory_gb
+
+    def __str__(self) -> str:
+        return f"{self.cpus:g} CPUs, {self.memory_gb:g} GB"
+
+def get_host_capacity() -> ResourceBudget:
+
+    """Get the CPUs and memory of the host
+
+    Returns:
+        ResourceBudget: number of CPUs and total memory in GB
+    """
+
+    cpus = float(os.cpu_count() or 1)
+    try:
+        memory_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1 << 30)
+    except (ValueError, OSError):
+        memory_gb = DEFAULT_MEMORY_GB
+    return ResourceBudget(cpus, memory_gb)
+
+def get_team_budget(team_name: str) -> ResourceBudget:
+
+    """Reads the resources a team declares in its configuration, e.g.
+
+        resources:
+          cpus: 8
+          memory_gb: 16
+
+    Args:
+        team_name (str): name of the team configuration
+
+    Returns:
+        ResourceBudget: declared resources, with defaults for anything not declared
+    """
+
+    try:
+        with open(os.path.join(os.getcwd(), "competitor_configs", team_name + ".yaml")) as file:
+            data = yaml.safe_load(file) or {}
+    except (IOError, yaml.YAMLError):
+        data = {}
+
+    resources = data.get("resources") or {}
+    try:
+        return ResourceBudget(float(resources.get("cpus", DEFAULT_CPUS)), float(resources.get("memory_gb", DEFAULT_MEMORY_GB)))
+    except (TypeError, ValueError):
+        log(bcolors.WARNING+f"Invalid resources for {team_name}, using the defaults"+bcolors.ENDC)
+        return ResourceBudget(DEFAULT_CPUS, DEFAULT_MEMORY_GB)
+
+def get_slot_environment(slot: int) -> dict[str, str]:
+
+    """Get the environment that keeps a trial from interfering with trials in
+    other slots. The containers share the host network, so each slot needs
+    its own ROS domain and Gazebo master port. Slot 0 uses the defaults.
+
+    Args:
+        slot (int): index of the slot the container runs in
+
+    Returns:
+        dict[str, str]: environment variables passed to run_trial.sh
+    """
+
+    return {
+        "ARIAC_ROS_DOMAIN_ID": str(slot),
+        "ARIAC_GAZEBO_MASTER_URI": f"http://localhost:{GAZEBO_MASTER_PORT + slot}"
+    }
+
+class ContainerBackend():
+    """Operations the scheduler needs on team containers"""
+
+    def restart(self, team_name: str):
+        raise NotImplementedError
+
+    def stop(self, team_name: str):
+        raise NotImplementedError
+
+    def run_trial(self, team_name: str, trial_name: str, env: dict[str, str]) -> int:
+        raise NotImplementedError
+
+    def reset(self, team_name: str) -> bool:
+
+        """Resets a running container to a clean state without restarting it
+
+        Args:
+            team_name (str): name of the team container
+
+        Returns:
+            bool: True if the container is clean, False if it needs a full restart
+        """
+
+        return False
+
+class DockerContainerBackend(ContainerBackend):
+    def __init__(self, containers: dict):
+        self.containers = containers
+
+    def restart(self, team_name: str):
+        self.containers[team_name].restart()
+
+    def stop(self, team_name: str):
+        self.containers[team_name].stop()
+
+    def _leftover_pids(self, container) -> list[str]:
+        # The containers run with --pid=host, so only the processes docker
+        # lists for this container may be killed, never a pkill by name
+        container.reload()
+        if container.status != "running":
+            return []
+        main_pid = str(container.attrs["State"]["Pid"])
+        top = container.top()
+        pid_column = top["Titles"].index("PID")
+        return [process[pid_column] for process in top["Processes"] or [] if process[pid_column] != main_pid]
+
+    def reset(self, team_name: str) -> bool:
+        container = self.containers[team_name]
+        try:
+            pids = self._leftover_pids(container)
+            if container.status != "running":
+                return False
+            if pids:
+                container.exec_run(["kill", "-9"] + pids)
+                sleep(0.5)
+
+            container.exec_run(["bash", "-c", "rm -rf " + " ".join(WARM_RESET_PATHS)])
+
+            # Verify nothing is left of the previous run
+            if self._leftover_pids(container):
+                return False
+            check = container.exec_run(["bash", "-c", " && ".join(f"! ls -d {path} >/dev/null 2>&1" for path in WARM_RESET_PATHS)])
+            return check.exit_code == 0
+        except Exception as e:
+            log(bcolors.WARNING+f"Unable to reset container {team_name}: {e}"+bcolors.ENDC)
+            return False
+
+    def run_trial(self, team_name: str, trial_name: str, env: dict[str, str]) -> int:
+        # Without a terminal on stdin, run_trial.sh runs docker exec without a tty
+        process = subprocess.Popen(["./run_trial.sh", team_name, trial_name], env=dict(os.environ, **env),
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, errors="replace")
+        for line in process.stdout:
+            log(f"[{team_name}] {line.rstrip()}")
+        return process.wait()
+
+class FakeContainerBackend(ContainerBackend):
+    """Backend that only writes trial logs, to test the scheduler without Docker"""
+
+    def __init__(self, logs_folder: str, run_time: float = 0.1, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 trial_log: Optional[str] = None, restart_time: float = 0.0, reset_time: float = 0.0, reset_failure_rate: float = 0.0):
+        self.logs_folder = logs_folder
+        self.trial_log = trial_log
+        self.restart_time = restart_time
+        self.reset_time = reset_time
+        self.reset_failure_rate = reset_failure_rate
+        self.run_time = run_time
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.running = 0
+        self.peak_running = 0
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def restart(self, team_name: str):
+        sleep(self.restart_time)
+
+    def stop(self, team_name: str):
+        pass
+
+    def reset(self, team_name: str) -> bool:
+        sleep(self.reset_time)
+        with self._lock:
+            return self.random.random() >= self.reset_failure_rate
+
+    def run_trial(self, team_name: str, trial_name: str, env: dict[str, str]) -> int:
+        with self._lock:
+            self.running += 1
+            self.runs += 1
+            self.peak_running = max(self.peak_running, self.running)
+            failed = self.random.random() < self.failure_rate
+
+        # Same folder numbering as run_trial.sh
+        j = 1
+        while os.path.exists(os.path.join(self.logs_folder, team_name, f"{trial_name}_{j}")):
+            j += 1
+        run_folder = os.path.join(self.logs_folder, team_name, f"{trial_name}_{j}")
+        os.makedirs(run_folder)
+
+        sleep(self.run_time)
+
+        if self.trial_log is not None and not failed:
+            shutil.copy(self.trial_log, os.path.join(run_folder, "trial_log.txt"))
+        else:
+            with open(os.path.join(run_folder, "trial_log.txt"), "w") as file:
+                file.write("Gazebo Crashed score not recorded\n" if failed else "Trial Name: fake\nTrial Duration: 0\n")
+
+        with self._lock:
+            self.running -= 1
+        return 0
+
+class EarlyStopPolicy():
+    """Stops iterating a team/trial once further runs can no longer change
+    the best run by score. The best run is picked by raw score, then by
+    duration, so once min_runs runs reach the trial's max score and their
+    durations agree within duration_tolerance, another run is not expected
+    to change the choice. A single max score run says nothing about how
+    much the duration varies, so at least two are always required.
+    """
+
+    def __init__(self, duration_tolerance: float = 0.05, min_runs: int = 2):
+        self.duration_tolerance = duration_tolerance
+        self.min_runs = max(2, min_runs)
+
+    def should_stop(self, team_name: str, trial_name: str, logs_folder: Optional[str] = None) -> bool:
+
+        """Checks the completed runs of a team/trial
+
+        Args:
+            team_name (str): name of the team
+            trial_name (str): name of the trial
+            logs_folder (Optional[str]): logs folder with a folder per team
+
+        Returns:
+            bool: True if more runs cannot change the best run
+        """
+
+        manifest = get_trial_manifest(trial_name)
+        if manifest is None or manifest.max_score <= 0:
+            return False
+
+        logs_folder = logs_folder if logs_folder is not None else get_logs_folder()
+        team_folder = os.path.join(logs_folder, team_name)
+        pattern = re.compile(re.escape(trial_name) + r"_\d+")
+
+        durations = []
+        try:
+            run_folders = [entry.path for entry in os.scandir(team_folder) if entry.is_dir() and pattern.fullmatch(entry.name)]
+        except OSError:
+            return False
+        for run_folder in run_folders:
+            trial_log = parse_trial_log(os.path.join(run_folder, "trial_log.txt"))
+            if trial_log is not None and trial_log.raw_score >= manifest.max_score:
+                durations.append(trial_log.trial_duration)
+
+        if len(durations) < self.min_runs:
+            return False
+
+        fastest = min(durations)
+        if fastest <= 0:
+            return False
+        return (max(durations) - fastest) / fastest <= self.duration_tolerance
+
+class TeamResult():
+    def __init__(self, team_name: str):
+        self.team_name = team_name
+        self.completed_runs: dict[str, int] = {}
+        self.trial_runs: dict[str, int] = {}
+        self.stopped_early: list[str] = []
+        self.restarts = 0
+        self.warm_runs = 0
+        self.overheads: list[float] = []
+        self.duration = 0.0
+
+    @property
+    def mean_overhead(self) -> float:
+        return sum(self.overheads) / len(self.overheads) if self.overheads else 0.0
+
+class TrialScheduler():
+    """Runs the trials of several teams at once. Each team's trials run one
+    after another in its own container, and teams are only started while
+    their declared resources fit in what is left of the host.
+    """
+
+    def __init__(self, backend: ContainerBackend, team_names: list[str], trial_names: list[str], num_iter: int, max_iter: int,
+                 max_parallel: int = 1, budgets: Optional[dict[str, ResourceBudget]] = None,
+                 capacity: Optional[ResourceBudget] = None, logs_folder: Optional[str] = None, log_timeout: float = 5.0,
+                 early_stop: Optional[EarlyStopPolicy] = None, warm: bool = False, journal: Optional[RunJournal] = None):
+        self.backend = backend
+        self.team_names = team_names
+        self.trial_names = trial_names
+        self.num_iter = num_iter
+        self.max_iter = max_iter
+        self.max_parallel = max(1, max_parallel)
+        self.budgets = budgets if budgets is not None else {team: get_team_budget(team) for team in team_names}
+        self.capacity = capacity if capacity is not None else get_host_capacity()
+        self.logs_folder = logs_folder
+        self.log_timeout = log_timeout
+        self.early_stop = early_stop
+        self.warm = warm
+        self.journal = journal
+
+        self.results = {team: TeamResult(team) for team in team_names}
+
+        self._condition = threading.Condition()
+        self._waiting = list(team_names)
+        self._used = ResourceBudget(0, 0)
+        self._free_slots = list(range(self.max_parallel - 1, -1, -1))
+
+    def run(self) -> dict[str, TeamResult]:
+        start = time()
+        threads = [threading.Thread(target=self._run_team, args=(team,)) for team in self.team_names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        log(bcolors.OKCYAN+f"Ran {len(self.team_names)} team(s) in {time() - start:.1f}s"+bcolors.ENDC)
+        if self.early_stop is not None:
+            total_runs = sum(sum(result.trial_runs.values()) for result in self.results.values())
+            stopped = sum(len(result.stopped_early) for result in self.results.values())
+            log(bcolors.OKCYAN+f"Stopped {stopped} team/trial(s) early, {total_runs} runs in total"+bcolors.ENDC)
+        for result in self.results.values():
+            log(bcolors.OKCYAN+f"{result.team_name}: {len(result.overheads)} runs, {result.mean_overhead:.1f}s mean overhead per run "
+                f"({result.warm_runs} warm, {result.restarts} restarts)"+bcolors.ENDC)
+        return self.results
+
+    def _acquire(self, team_name: str) -> int:
+        budget = self.budgets[team_name]
+        with self._condition:
+            while True:
+                if self._free_slots:
+                    running = self.max_parallel - len(self._free_slots)
+                    # Teams start in order, a later team only starts first if an earlier one does not fit
+                    candidates = [team for team in self._waiting if running == 0 or self.budgets[team].fits(self._used, self.capacity)]
+                    if candidates and candidates[0] == team_name:
+                        self._waiting.remove(team_name)
+                        self._used = ResourceBudget(self._used.cpus + budget.cpus, self._used.memory_gb + budget.memory_gb)
+                        # The next team in line may fit as well
+                        self._condition.notify_all()
+                        return self._free_slots.pop()
+                self._condition.wait()
+
+    def _release(self, team_name: str, slot: int):
+        budget = self.budgets[team_name]
+        with self._condition:
+            self._used = ResourceBudget(self._used.cpus - budget.cpus, self._used.memory_gb - budget.memory_gb)
+            self._free_slots.append(slot)
+            self._condition.notify_all()
+
+    def _run_team(self, team_name: str):
+        if self.journal is not None and not self.journal.outstanding([team_name], self.trial_names):
+            log(bcolors.OKCYAN+f"All trials of {team_name} are already in the run journal, skipping"+bcolors.ENDC)
+            with self._condition:
+                self._waiting.remove(team_name)
+                self._condition.notify_all()
+            return
+
+        slot = self._acquire(team_name)
+        result = self.results[team_name]
+        start = time()
+        log(bcolors.OKGREEN+f"Starting {team_name} in slot {slot} ({self.budgets[team_name]})"+bcolors.ENDC)
+        try:
+            env = get_slot_environment(slot)
+            for trial_name in self.trial_names:
+                self._run_trial(team_name, trial_name, env, result)
+        except Exception as e:
+            log(bcolors.FAIL+f"Unable to run trials for {team_name}: {e}"+bcolors.ENDC)
+        finally:
+            try:
+                self.backend.stop(team_name)
+            except Exception as e:
+                log(bcolors.FAIL+f"Unable to stop container {team_name}: {e}"+bcolors.ENDC)
+            result.duration = time() - start
+            self._release(team_name, slot)
+
+        log(bcolors.OKCYAN+"="*50)
+        log("Completed all trials for team: "+team_name)
+        log("="*50+bcolors.ENDC)
+
+    def _run_trial(self, team_name: str, trial_name: str, env: dict[str, str], result: TeamResult):
+        trial_runs = 0
+        completed_runs = 0
+        stopped_early = False
+
+        # Resume from the runs already in the journal
+        if self.journal is not None:
+            progress = self.journal.get_progress(team_name, trial_name)
+            if progress.done:
+                result.completed_runs[trial_name] = progress.completed_runs
+                result.trial_runs[trial_name] = 0
+                return
+            if self.journal.discard_unrecorded_runs(team_name, trial_name):
+                log(bcolors.WARNING+f"Removed interrupted runs of {team_name}/{trial_name}"+bcolors.ENDC)
+            completed_runs = progress.completed_runs
+            trial_runs = progress.trial_runs
+            if completed_runs or trial_runs:
+                log(bcolors.OKCYAN+f"Resuming {team_name}/{trial_name} after {completed_runs} completed of {trial_runs} run(s)"+bcolors.ENDC)
+
+        while completed_runs < self.num_iter and trial_runs < self.max_iter:
+            prepare_time = self._prepare_container(team_name, result)
+
+            # Start trial
+            log(bcolors.OKGREEN+f"On trial {trial_runs} of {self.max_iter} for "+team_name,bcolors.ENDC)
+            log(bcolors.OKGREEN+f"Completed runs: {completed_runs} out of {self.num_iter} for "+team_name,bcolors.ENDC)
+            self.backend.run_trial(team_name, trial_name, env)
+
+            wait_start = time()
+            most_recent_trial_log = wait_for_trial_log(team_name, trial_name, self.logs_folder, self.log_timeout)
+
+            if most_recent_trial_log is not None and os.path.exists(most_recent_trial_log):
+                record_run_timings(most_recent_trial_log, {"container_prepare": prepare_time, "host_log_wait": time() - wait_start})
+                if trial_succeeded(most_recent_trial_log):
+                    completed_runs+=1
+                    self._record_run(team_name, trial_name, os.path.dirname(most_recent_trial_log), True)
+                    if (self.early_stop is not None and completed_runs < self.num_iter
+                            and self.early_stop.should_stop(team_name, trial_name, self.logs_folder)):
+                        log(bcolors.OKCYAN+f"Best run of {team_name}/{trial_name} cannot improve, stopping after {completed_runs} run(s)"+bcolors.ENDC)
+                        result.stopped_early.append(trial_name)
+                        stopped_early = True
+                        trial_runs+=1
+                        break
+                else:
+                    log(bcolors.FAIL+"Trial did not run correctly. Trying again"+bcolors.ENDC)
+                    delete_most_recent_trial_folder(team_name, trial_name, self.logs_folder)
+                    self._record_run(team_name, trial_name, None, False)
+            else:
+                log(bcolors.FAIL+"Unable to find log file. Running again "+team_name,bcolors.ENDC)
+                delete_most_recent_trial_folder(team_name, trial_name, self.logs_folder)
+                self._record_run(team_name, trial_name, None, False)
+
+            trial_runs+=1
+
+        if self.journal is not None:
+            self.journal.record_trial_done(team_name, trial_name, stopped_early)
+
+        result.completed_runs[trial_name] = completed_runs
+        result.trial_runs[trial_name] = trial_runs
+
+    def _record_run(self, team_name: str, trial_name: str, run_folder: Optional[str], succeeded: bool):
+        if self.journal is not None:
+            self.journal.record_run(team_name, trial_name, run_folder, succeeded)
+
+    def _prepare_container(self, team_name: str, result: TeamResult) -> float:
+        # The first run always restarts, as the containers are stopped before scheduling
+        start = time()
+        if self.warm and result.restarts > 0 and self.backend.reset(team_name):
+            result.warm_runs += 1
+            log(bcolors.OKGREEN+"Reusing container",team_name,bcolors.ENDC)
+        else:
+            if self.warm and result.restarts > 0:
+                log(bcolors.WARNING+f"Container {team_name} is not clean, restarting it"+bcolors.ENDC)
+            log(bcolors.OKGREEN+"Restarting container",team_name,bcolors.ENDC)
+            self.backend.restart(team_name)
+            result.restarts += 1
+        result.overheads.append(time() - start)
+        return result.overheads[-1]
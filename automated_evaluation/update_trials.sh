@@ -7,6 +7,13 @@ fi
 
 teamName=$1
 
+# Copy only the changed trial configs into the installed share folder, no rebuild needed
+if python3 ./sync_trials.py $teamName; then
+    exit 0
+fi
+
+echo "==== Unable to sync trials for $teamName, rebuilding ariac_gazebo"
+
 # Run build script
 docker exec $teamName rm -rf src/ARIAC/ariac_gazebo/config/trials/
 